@@ -0,0 +1,160 @@
+import json
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from testasst import AsyncTools, toolRegistry, oaiClient, get_assistant_id
+from background import backgroundLoop, currentChannel, ProgressChannel
+from metrics import metricsRegistry
+
+##### SET VARIABLES
+TOOL_WORKERS = 8
+SPECULATIVE_MIN_CHARS = 400
+SUGGESTIONS_TIMEOUT = 10.0
+
+
+###### FUNCTIONS
+def format_tool_output(output):
+    """
+    Converts a tool's return value into the string the Assistants API expects as a tool output.
+    """
+    if isinstance(output, str):
+        return output
+    if isinstance(output, pd.DataFrame):
+        return output.to_json(orient="records")
+    return json.dumps(output, default=str)
+
+
+def call_tool(name: str, arguments: str):
+    """
+    Runs one tool call through the Tools dispatch table. Unknown tools, invalid arguments and tool errors are returned as the tool output so the run can continue.
+    """
+    try:
+        output = toolRegistry.dispatch(name, arguments)
+        return format_tool_output(output)
+    except Exception as e:
+        return f"Error: {type(e).__name__}: {e}"
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Run Driver
+class RunDriver:
+    """
+    Drives an assistant run over the streaming Assistants API.
+
+    Text deltas are yielded as they arrive. When the run stops on requires_action, the tool calls in that step run
+    concurrently (those whose tool is declared concurrent-safe) and all outputs go back in a single submit_tool_outputs_stream call, whose events are streamed the same way.
+    The client is injectable so the driver can run against a local stand-in for the OpenAI endpoint.
+    """
+    def __init__(self, client=None, assistant_id: str = None, call_tool=call_tool, max_workers: int = TOOL_WORKERS):
+        self.client = oaiClient if client is None else client
+        self.assistant_id = assistant_id
+        self.call_tool = call_tool
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool-calls")
+        self.step_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool-steps")
+        self.last_run = None
+
+    def run_tool_calls(self, tool_calls: list):
+        """
+        Runs the concurrent-safe tool calls of one step on the executor and the rest in order on this thread.
+        """
+        futures = {tool_call.id: self.executor.submit(contextvars.copy_context().run, self.call_tool, tool_call.function.name, tool_call.function.arguments) for tool_call in tool_calls if toolRegistry.is_concurrent_safe(tool_call.function.name)}
+        outputs = {tool_call.id: self.call_tool(tool_call.function.name, tool_call.function.arguments) for tool_call in tool_calls if tool_call.id not in futures}
+        return [{"tool_call_id": tool_call.id, "output": futures[tool_call.id].result() if tool_call.id in futures else outputs[tool_call.id]} for tool_call in tool_calls]
+
+    def run_tool_step(self, tool_calls: list, on_source_result=None):
+        """
+        Runs one step's tool calls. With on_source_result, the step runs on another thread with a progress channel in its context, and
+        on_source_result(source, response) is called on this thread for every search source as it finishes. If this thread stops
+        (for example because Streamlit interrupted the script), the searches still running are cancelled.
+        """
+        if on_source_result is None:
+            return self.run_tool_calls(tool_calls)
+        channel = ProgressChannel()
+        context = contextvars.copy_context()
+        context.run(currentChannel.set, channel)
+        step = self.step_executor.submit(context.run, self.run_tool_calls, tool_calls)
+        try:
+            for source, response in channel.iter_until(step):
+                on_source_result(source, response)
+            return step.result()
+        finally:
+            channel.cancel()
+
+    def stream_events(self, stream_manager, name: str = "runs.stream"):
+        """
+        Yields text deltas from one stream and returns the run that requires action, if any.
+        """
+        required_run = None
+        with metricsRegistry.span("openai", name), stream_manager as stream:
+            for event in stream:
+                if event.event == "thread.message.delta":
+                    for block in event.data.delta.content or []:
+                        if block.type == "text" and block.text and block.text.value:
+                            yield block.text.value
+                elif event.event == "thread.run.requires_action":
+                    required_run = event.data
+                elif event.event in ("thread.run.completed", "thread.run.failed", "thread.run.cancelled", "thread.run.expired"):
+                    self.last_run = event.data
+        return required_run
+
+    def stream_reply(self, thread_id: str, content: str, on_tool_outputs=None, on_source_result=None):
+        """
+        Adds the user message to the thread and yields the assistant's reply as it streams, handling tool calls until the run finishes.
+        on_tool_outputs(tool_calls, tool_outputs) is called after each tool step, before the outputs are submitted.
+        on_source_result(source, response) is called for each search source as soon as it finishes, while the tool step is still running.
+        """
+        assistant_id = self.assistant_id or get_assistant_id()
+        with metricsRegistry.span("openai", "messages.create"):
+            self.client.beta.threads.messages.create(thread_id=thread_id, role="user", content=content)
+        run = yield from self.stream_events(self.client.beta.threads.runs.stream(thread_id=thread_id, assistant_id=assistant_id))
+        while run is not None:
+            tool_calls = run.required_action.submit_tool_outputs.tool_calls
+            tool_outputs = self.run_tool_step(tool_calls, on_source_result)
+            if on_tool_outputs is not None:
+                on_tool_outputs(tool_calls, tool_outputs)
+            run = yield from self.stream_events(self.client.beta.threads.runs.submit_tool_outputs_stream(thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs), "runs.submit_tool_outputs_stream")
+
+
+#__________________________________________________________________________________________
+# 2. Speculative Suggestions
+class SpeculativeSuggestions:
+    """
+    Starts the suggest_prompts request while the main answer is still streaming, once enough of it has arrived to be representative.
+    The request runs on the background loop with the async OpenAI client, so cancel() aborts the HTTP request itself.
+    """
+    def __init__(self, user_prompt: str, min_chars: int = SPECULATIVE_MIN_CHARS, model: str = None):
+        self.user_prompt = user_prompt
+        self.min_chars = min_chars
+        self.model = model
+        self.response_text = ""
+        self.future = None
+
+    def start(self):
+        if self.future is None:
+            self.future = backgroundLoop.submit(AsyncTools.suggest_prompts(self.user_prompt, self.response_text, self.model))
+        return self.future
+
+    def wrap(self, chunks):
+        """
+        Passes the streamed answer through unchanged, starting the suggestion request once min_chars have arrived.
+        """
+        for chunk in chunks:
+            self.response_text += chunk
+            if self.future is None and len(self.response_text) >= self.min_chars:
+                self.start()
+            yield chunk
+
+    def result(self, timeout: float = SUGGESTIONS_TIMEOUT):
+        """
+        Returns the suggested prompts, starting the request now if the answer was too short to start it early. Returns None on failure or timeout.
+        """
+        try:
+            return self.start().result(timeout=timeout)
+        except Exception:
+            self.cancel()
+            return None
+
+    def cancel(self):
+        if self.future is not None and not self.future.done():
+            self.future.cancel()
@@ -0,0 +1,185 @@
+import asyncio
+import threading
+import weakref
+import streamlit as st
+from clients import clientRegistry, POOL_CONNECTIONS, HTTP_TIMEOUT, WEB_USER_AGENT
+
+##### SET VARIABLES
+ASYNC_POOL_MAXSIZE = 256
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+GOOGLE_PLACES_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+GOOGLE_ADDRESS_VALIDATION_URL = "https://addressvalidation.googleapis.com/v1:validateAddress"
+GOOGLE_OK_STATUSES = ("OK", "ZERO_RESULTS")
+YELP_API_URL = "https://api.yelp.com/v3"
+
+
+###### FUNCTIONS
+def http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def build_async_http():
+    return AsyncHttp()
+
+
+def build_tavily_async():
+    return AsyncTavily(clientRegistry.proxy("http_async"), st.secrets.tavily.api_key)
+
+
+def build_google_async():
+    return AsyncGoogleMaps(clientRegistry.proxy("http_async"), st.secrets.google.maps_api_key)
+
+
+def build_yelp_async():
+    return AsyncYelp(clientRegistry.proxy("http_async"), st.secrets.yelp.api_key)
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Provider Error
+class ProviderError(Exception):
+    """
+    A provider answered with an error. status_code and the provider's status string are kept so resilience.is_transient can classify it.
+    """
+    def __init__(self, provider: str, status_code: int, status: str = None, message: str = None):
+        super().__init__(f"{provider} {status_code}{f' {status}' if status else ''}{f': {message}' if message else ''}")
+        self.provider = provider
+        self.status_code = status_code
+        self.status = status
+
+
+#__________________________________________________________________________________________
+# 2. Async Http
+class AsyncHttp:
+    """
+    One pooled httpx.AsyncClient per event loop, negotiating HTTP/2 when the h2 package is installed.
+    httpx connections are bound to the loop that opened them; tools normally run on the one background loop, but asyncio.run callers
+    (testasync, the batch runner) each get their own client, which is dropped with its loop.
+    """
+    def __init__(self, max_connections: int = ASYNC_POOL_MAXSIZE, max_keepalive: int = POOL_CONNECTIONS, timeout: float = HTTP_TIMEOUT):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.timeout = timeout
+        self.http2 = http2_available()
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def client(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_keepalive)
+                client = self._clients[loop] = httpx.AsyncClient(http2=self.http2, limits=limits, timeout=self.timeout)
+        return client
+
+    async def request(self, provider: str, method: str, url: str, **kwargs):
+        """
+        Sends one request and returns the decoded JSON body; non-2xx answers raise ProviderError with the provider's own message.
+        """
+        response = await self.client().request(method, url, **kwargs)
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            body = body if isinstance(body, dict) else {}
+            error = body.get("error")
+            if isinstance(error, dict):
+                raise ProviderError(provider, response.status_code, error.get("code") or error.get("status"), error.get("description") or error.get("message"))
+            raise ProviderError(provider, response.status_code, message=str(error or body.get("detail") or response.reason_phrase))
+        return response.json()
+
+    async def fetch_text(self, url: str, content_types: tuple, max_bytes: int, timeout: float = None):
+        """
+        Downloads a web page, following redirects, and returns its decoded text, or None when its content type is not one of content_types.
+        The body is read up to max_bytes so a large download cannot stall the caller.
+        """
+        headers = {"User-Agent": WEB_USER_AGENT}
+        async with self.client().stream("GET", url, headers=headers, timeout=timeout or self.timeout, follow_redirects=True) as response:
+            response.raise_for_status()
+            if response.headers.get("Content-Type", "text/html").split(";")[0].strip().lower() not in content_types:
+                return None
+            body = bytearray()
+            async for block in response.aiter_bytes():
+                body.extend(block)
+                if len(body) >= max_bytes:
+                    break
+            return body.decode(response.encoding or "utf-8", errors="replace")
+
+
+#__________________________________________________________________________________________
+# 3. Async Tavily
+class AsyncTavily:
+    """
+    Async stand-in for TavilyClient.search; returns the same response dict.
+    """
+    def __init__(self, http: AsyncHttp, api_key: str):
+        self.http = http
+        self.api_key = api_key
+
+    async def search(self, query: str, search_depth: str = "basic", max_results: int = 5, include_answer: bool = False, include_raw_content: bool = False, **kwargs):
+        payload = {"query": query, "search_depth": search_depth, "max_results": max_results, "include_answer": include_answer, "include_raw_content": include_raw_content, **kwargs}
+        return await self.http.request("tavily", "POST", TAVILY_SEARCH_URL, json=payload, headers={"Authorization": f"Bearer {self.api_key}"})
+
+
+#__________________________________________________________________________________________
+# 4. Async Google Maps
+class AsyncGoogleMaps:
+    """
+    Async stand-ins for googlemaps' places, geocode and addressvalidation; each returns what the googlemaps function returns.
+    Web-service statuses other than OK and ZERO_RESULTS raise ProviderError, with OVER_QUERY_LIMIT in the message so it is retried.
+    """
+    def __init__(self, http: AsyncHttp, key: str):
+        self.http = http
+        self.key = key
+
+    async def get(self, url: str, params: dict):
+        body = await self.http.request("google", "GET", url, params={**params, "key": self.key})
+        if body.get("status") not in GOOGLE_OK_STATUSES:
+            raise ProviderError("google", 200, body.get("status"), body.get("error_message"))
+        return body
+
+    async def places(self, query: str, region: str = None):
+        return await self.get(GOOGLE_PLACES_URL, {"query": query, **({"region": region} if region else {})})
+
+    async def geocode(self, address, region: str = None):
+        address = ", ".join(address) if isinstance(address, (list, tuple)) else address
+        body = await self.get(GOOGLE_GEOCODE_URL, {"address": address, **({"region": region} if region else {})})
+        return body.get("results", [])
+
+    async def addressvalidation(self, addressLines: list, regionCode: str = None, locality: str = None, enableUspsCass: bool = None):
+        address = {"addressLines": addressLines, **({"regionCode": regionCode} if regionCode else {}), **({"locality": locality} if locality else {})}
+        payload = {"address": address, **({"enableUspsCass": enableUspsCass} if enableUspsCass is not None else {})}
+        return await self.http.request("google", "POST", GOOGLE_ADDRESS_VALIDATION_URL, params={"key": self.key}, json=payload)
+
+
+#__________________________________________________________________________________________
+# 5. Async Yelp
+class AsyncYelp:
+    """
+    Async stand-in for yelpapi's search_query; returns the same Fusion response dict.
+    """
+    def __init__(self, http: AsyncHttp, api_key: str):
+        self.http = http
+        self.api_key = api_key
+
+    async def get(self, path: str, params: dict = None):
+        return await self.http.request("yelp", "GET", f"{YELP_API_URL}{path}", params=params, headers={"Authorization": f"Bearer {self.api_key}"})
+
+    async def search_query(self, **kwargs):
+        return await self.get("/businesses/search", kwargs)
+
+
+##### SET REGISTRY
+clientRegistry.register("http_async", build_async_http)
+clientRegistry.register("tavily_async", build_tavily_async)
+clientRegistry.register("google_async", build_google_async)
+clientRegistry.register("yelp_async", build_yelp_async)
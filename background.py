@@ -0,0 +1,115 @@
+import asyncio
+import contextvars
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+##### SET VARIABLES
+MAX_WORKERS = 32
+POLL_INTERVAL = 0.05
+# The channel of the tool step running in the current context, if its caller wants progress
+currentChannel = contextvars.ContextVar("progress_channel", default=None)
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Background Loop
+class BackgroundLoop:
+    """
+    One long-lived event loop running on a daemon thread, shared by every tool call in the process.
+    Its default executor is sized explicitly, so `run_in_executor(None, ...)` calls from the async tools share one bounded thread pool.
+    """
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.max_workers = max_workers
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    loop.set_default_executor(ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tools"))
+                    self._thread = threading.Thread(target=loop.run_forever, name="tools-loop", daemon=True)
+                    self._thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def submit(self, coro):
+        """
+        Schedules a coroutine on the background loop and returns a concurrent.futures.Future for it.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: float = None):
+        """
+        Runs a coroutine on the background loop and blocks the calling thread until it finishes.
+        """
+        future = self.submit(coro)
+        try:
+            return future.result(timeout=timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+
+#__________________________________________________________________________________________
+# 2. Progress Channel
+class ProgressChannel:
+    """
+    Carries partial results from work running on other threads back to the thread that started it, and owns the background futures of that work.
+    publish() may be called from any thread (typically the background loop); the consumer reads with iter_until(). cancel() cancels every
+    coroutine started through run() that is still running, so a caller that goes away does not leave searches behind.
+    """
+    def __init__(self, loop: BackgroundLoop = None):
+        self.background = loop
+        self.items = queue.Queue()
+        self.futures = set()
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def publish(self, *item):
+        self.items.put(item)
+
+    def run(self, coro, timeout: float = None):
+        """
+        Runs a coroutine on the background loop like BackgroundLoop.run, tracking it so cancel() can stop it.
+        """
+        with self._lock:
+            if self.cancelled:
+                coro.close()
+                raise asyncio.CancelledError()
+            future = (self.background or backgroundLoop).submit(coro)
+            self.futures.add(future)
+        try:
+            return future.result(timeout=timeout)
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            with self._lock:
+                self.futures.discard(future)
+
+    def iter_until(self, future):
+        """
+        Yields published items until the given concurrent.futures.Future is done and everything it published has been read.
+        """
+        while True:
+            try:
+                yield self.items.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if future.done() and self.items.empty():
+                    return
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            futures, self.futures = self.futures, set()
+        for future in futures:
+            future.cancel()
+
+
+##### SET LOOP
+backgroundLoop = BackgroundLoop()
@@ -0,0 +1,194 @@
+"""
+Bulk address validation and geocoding.
+
+Streams addresses from a CSV or Parquet file, normalizes them and skips duplicates, then runs Google Address Validation
+and Geocoding on the async Google client with bounded concurrency under a per-provider QPS limit. Results are written to Parquet one part file per
+chunk; the keys of every written chunk are checkpointed so an interrupted run resumes where it stopped.
+
+Usage:
+    python batch_addresses.py addresses.csv out/ --columns address1,city,state,zip_code
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from testasst import asyncGoogClient
+from resilience import resiliencePolicies
+
+##### SET VARIABLES
+CHUNK_SIZE = 500
+CONCURRENCY = 16
+VALIDATION_QPS = 25.0
+GEOCODE_QPS = 40.0
+CHECKPOINT_FILE = "checkpoint.keys"
+ABBREVIATIONS = {
+    "STREET": "ST", "AVENUE": "AVE", "BOULEVARD": "BLVD", "DRIVE": "DR", "ROAD": "RD", "LANE": "LN",
+    "COURT": "CT", "PLACE": "PL", "PARKWAY": "PKWY", "HIGHWAY": "HWY", "SUITE": "STE", "APARTMENT": "APT",
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+}
+RESULT_SCHEMA = pa.schema([
+    ("key", pa.string()),
+    ("address_lines", pa.list_(pa.string())),
+    ("formatted_address", pa.string()),
+    ("validation_granularity", pa.string()),
+    ("address_complete", pa.bool_()),
+    ("latitude", pa.float64()),
+    ("longitude", pa.float64()),
+    ("place_id", pa.string()),
+    ("validation_json", pa.string()),
+    ("geocode_json", pa.string()),
+    ("error", pa.string()),
+])
+
+
+###### FUNCTIONS
+def normalize_address_line(line: str):
+    words = re.sub(r"[^\w\s#-]", " ", str(line).upper()).split()
+    return " ".join(ABBREVIATIONS.get(word, word) for word in words)
+
+
+def normalize_address(address_lines: list):
+    """
+    Returns (key, address_lines) with blank lines dropped; the key is the normalized address used for de-duplication and checkpointing.
+    """
+    lines = [str(line).strip() for line in address_lines if line is not None and not pd.isna(line) and str(line).strip()]
+    key = ", ".join(normalize_address_line(line) for line in lines)
+    return key, lines
+
+
+def read_address_chunks(path: str, columns: list, chunk_size: int = CHUNK_SIZE):
+    """
+    Yields lists of address_lines from a CSV or Parquet file without loading the whole file.
+    """
+    if path.endswith(".parquet"):
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()[columns].values.tolist()
+    else:
+        for chunk in pd.read_csv(path, usecols=columns, dtype=str, chunksize=chunk_size):
+            yield chunk[columns].values.tolist()
+
+
+def load_checkpoint(out_dir: str):
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def append_checkpoint(out_dir: str, keys: list):
+    with open(os.path.join(out_dir, CHECKPOINT_FILE), "a", encoding="utf-8") as f:
+        f.writelines(f"{key}\n" for key in keys)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def result_row(key: str, address_lines: list, validation: dict, geocode: list, error: str = None):
+    verdict = (validation or {}).get("result", {}).get("verdict", {})
+    postal = (validation or {}).get("result", {}).get("address", {})
+    location = geocode[0]["geometry"]["location"] if geocode else {}
+    return {
+        "key": key,
+        "address_lines": address_lines,
+        "formatted_address": postal.get("formattedAddress") or (geocode[0].get("formatted_address") if geocode else None),
+        "validation_granularity": verdict.get("validationGranularity"),
+        "address_complete": verdict.get("addressComplete"),
+        "latitude": location.get("lat"),
+        "longitude": location.get("lng"),
+        "place_id": geocode[0].get("place_id") if geocode else None,
+        "validation_json": json.dumps(validation) if validation is not None else None,
+        "geocode_json": json.dumps(geocode) if geocode is not None else None,
+        "error": error,
+    }
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Address Pipeline
+class AddressPipeline:
+    def __init__(self, out_dir: str, concurrency: int = CONCURRENCY, validation_qps: float = VALIDATION_QPS, geocode_qps: float = GEOCODE_QPS):
+        self.out_dir = out_dir
+        self.concurrency = concurrency
+        resiliencePolicies.configure_provider("google_address_validation", rate=validation_qps, burst=1)
+        resiliencePolicies.configure_provider("google_geocoding", rate=geocode_qps, burst=1)
+        self.stats = {"read": 0, "duplicates": 0, "skipped": 0, "processed": 0, "errors": 0}
+
+    async def call(self, tool: str, coro_func):
+        """
+        Awaits a Google call under the provider's QPS limit, retry policy and circuit breaker.
+        """
+        return await resiliencePolicies.call_async(tool, coro_func)
+
+    async def process_address(self, semaphore: asyncio.Semaphore, key: str, address_lines: list):
+        async with semaphore:
+            try:
+                validation, geocode = await asyncio.gather(
+                    self.call("google_address_validation", lambda: asyncGoogClient.addressvalidation(addressLines=address_lines, regionCode="US", enableUspsCass=True)),
+                    self.call("google_geocode", lambda: asyncGoogClient.geocode(address=", ".join(address_lines), region="US")),
+                )
+                return result_row(key, address_lines, validation, geocode)
+            except Exception as e:
+                self.stats["errors"] += 1
+                return result_row(key, address_lines, None, None, f"{type(e).__name__}: {e}")
+
+    def write_part(self, rows: list):
+        part_number = len([name for name in os.listdir(self.out_dir) if name.startswith("part-") and name.endswith(".parquet")])
+        path = os.path.join(self.out_dir, f"part-{part_number:05d}.parquet")
+        table = pa.Table.from_pylist(rows, schema=RESULT_SCHEMA)
+        pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        # Checkpoint only after the part file is in place, so a crash never records keys whose results were lost
+        append_checkpoint(self.out_dir, [row["key"] for row in rows])
+
+    async def run(self, chunks):
+        os.makedirs(self.out_dir, exist_ok=True)
+        done_keys = load_checkpoint(self.out_dir)
+        seen_keys = set()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        for chunk in chunks:
+            pending = []
+            for address_lines in chunk:
+                self.stats["read"] += 1
+                key, lines = normalize_address(address_lines)
+                if not key or key in seen_keys:
+                    self.stats["duplicates"] += 1
+                    continue
+                seen_keys.add(key)
+                if key in done_keys:
+                    self.stats["skipped"] += 1
+                    continue
+                pending.append((key, lines))
+            if not pending:
+                continue
+            rows = await asyncio.gather(*[self.process_address(semaphore, key, lines) for key, lines in pending])
+            self.write_part(rows)
+            self.stats["processed"] += len(rows)
+            print(json.dumps(self.stats), flush=True)
+        return self.stats
+
+
+###### MAIN
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or Parquet file of addresses.")
+    parser.add_argument("out_dir", help="Directory for Parquet part files and the checkpoint.")
+    parser.add_argument("--columns", default="address", help="Comma-separated columns that make up the address lines.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--validation-qps", type=float, default=VALIDATION_QPS)
+    parser.add_argument("--geocode-qps", type=float, default=GEOCODE_QPS)
+    args = parser.parse_args()
+
+    pipeline = AddressPipeline(args.out_dir, args.concurrency, args.validation_qps, args.geocode_qps)
+    chunks = read_address_chunks(args.input, args.columns.split(","), args.chunk_size)
+    stats = asyncio.run(pipeline.run(chunks))
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
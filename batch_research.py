@@ -0,0 +1,271 @@
+"""
+Headless portfolio research.
+
+Streams (business, zipcode) rows from a CSV or Parquet file and runs the AsyncTools.execute_all_tasks research bundle for each
+one under a global concurrency cap and an upstream call budget. Each row's responses, plus the Google Places and Yelp listings
+merged into one business list, are written incrementally as Parquet or JSONL part files. The keys of every written part are
+checkpointed so a crashed or budget-stopped run resumes where it stopped. Throughput and failure counts are printed as it goes.
+
+Usage:
+    python batch_research.py portfolio.csv out/ --query-column business --zipcode-column zipcode --format parquet --budget 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from cache import toolCache, normalize_argument
+from serialize import compact_entities, is_status, search_result_record
+from entities import resolve_responses
+from testasst import AsyncTools, SEARCH_DEADLINE
+
+##### SET VARIABLES
+CHUNK_SIZE = 200
+CONCURRENCY = 8
+REPORT_SECONDS = 30.0
+CHECKPOINT_FILE = "checkpoint.keys"
+SOURCES = ("internet_search", "internet_research", "google_places_search", "yelp_search")
+# execute_all_tasks calls these cached tools; a cache miss is one upstream request
+CACHED_TOOLS = ("internet_research", "google_places_search", "yelp_query_search")
+RESULT_SCHEMA = pa.schema([
+    ("key", pa.string()),
+    ("query", pa.string()),
+    ("zipcode", pa.string()),
+    ("research_answer", pa.string()),
+    ("businesses_json", pa.string()),
+    ("internet_search_json", pa.string()),
+    ("internet_research_json", pa.string()),
+    ("google_places_search_json", pa.string()),
+    ("yelp_search_json", pa.string()),
+    ("failed_sources", pa.list_(pa.string())),
+    ("error", pa.string()),
+    ("elapsed_seconds", pa.float64()),
+    ("finished_at", pa.float64()),
+])
+
+
+###### FUNCTIONS
+def row_key(query: str, zipcode: str):
+    return f"{normalize_argument(query)}|{normalize_argument(zipcode)}"
+
+
+def read_rows(path: str, columns: list, chunk_size: int = CHUNK_SIZE):
+    """
+    Yields (query, zipcode) pairs from a CSV or Parquet file without loading the whole file.
+    """
+    if path.endswith(".parquet"):
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns))
+    else:
+        chunks = pd.read_csv(path, usecols=columns, dtype=str, chunksize=chunk_size)
+    for chunk in chunks:
+        for query, zipcode in chunk[columns].itertuples(index=False, name=None):
+            yield query, zipcode
+
+
+def load_checkpoint(out_dir: str):
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def append_checkpoint(out_dir: str, keys: list):
+    with open(os.path.join(out_dir, CHECKPOINT_FILE), "a", encoding="utf-8") as f:
+        f.writelines(f"{key}\n" for key in keys)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def to_json(value):
+    if value is None:
+        return None
+    if isinstance(value, pd.DataFrame):
+        return value.to_json(orient="records")
+    return json.dumps(value, default=str)
+
+
+def result_row(key: str, query: str, zipcode: str, responses: dict, elapsed: float, error: str = None):
+    """
+    Flattens one execute_all_tasks result into an output row; each source is kept as JSON, failed or timed out sources are listed.
+    """
+    responses = responses or {}
+    research = responses.get("internet_research")
+    search = responses.get("internet_search")
+    if isinstance(search, list):
+        search = [search_result_record(result) for result in search]
+    businesses = compact_entities(resolve_responses(responses)) if responses else None
+    return {
+        "key": key,
+        "query": query,
+        "zipcode": zipcode,
+        "research_answer": research.get("answer") if isinstance(research, dict) and not is_status(research) else None,
+        "businesses_json": to_json(businesses),
+        "internet_search_json": to_json(search),
+        "internet_research_json": to_json(research),
+        "google_places_search_json": to_json(responses.get("google_places_search")),
+        "yelp_search_json": to_json(responses.get("yelp_search")),
+        "failed_sources": [source for source in SOURCES if is_status(responses.get(source)) or (error and source not in responses)],
+        "error": error,
+        "elapsed_seconds": elapsed,
+        "finished_at": time.time(),
+    }
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Research Batch
+class ResearchBatch:
+    """
+    Runs the research bundle over a stream of rows with at most `concurrency` rows in flight.
+
+    budget caps upstream provider requests for this run: cache misses of the cached research tools plus one uncached internet_search per row.
+    Every queued or running row reserves one request per source, so the cap holds without waiting for rows to finish (retries aside).
+    Once it is reached no more rows are queued; the rows already queued finish and are written, and the next run resumes after them.
+    """
+    def __init__(self, out_dir: str, output_format: str = "parquet", concurrency: int = CONCURRENCY, chunk_size: int = CHUNK_SIZE,
+                 budget: int = None, deadline: float = SEARCH_DEADLINE, report_seconds: float = REPORT_SECONDS):
+        self.out_dir = out_dir
+        self.output_format = output_format
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.budget = budget
+        self.deadline = deadline
+        self.report_seconds = report_seconds
+        self.buffer = []
+        self.stats = {"read": 0, "duplicates": 0, "skipped": 0, "processed": 0, "failed_rows": 0, "upstream_calls": 0,
+                      "source_failures": {source: 0 for source in SOURCES}, "rows_per_minute": 0.0, "stopped": None}
+        self.started = None
+        self.misses_at_start = 0
+        self.searches = 0
+        self.pending = 0
+
+    def upstream_calls(self):
+        misses = toolCache.stats()["tools"]
+        return sum(misses.get(tool, {}).get("misses", 0) for tool in CACHED_TOOLS) - self.misses_at_start + self.searches
+
+    def budget_left(self):
+        return self.budget is None or self.upstream_calls() + (self.pending + 1) * len(SOURCES) <= self.budget
+
+    async def process_row(self, key: str, query: str, zipcode: str):
+        start = time.perf_counter()
+        self.searches += 1
+        try:
+            responses = await AsyncTools.execute_all_tasks(query, zipcode, deadline=self.deadline)
+            row = result_row(key, query, zipcode, responses, time.perf_counter() - start)
+        except Exception as e:
+            row = result_row(key, query, zipcode, None, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+        self.pending -= 1
+        for source in row["failed_sources"]:
+            self.stats["source_failures"][source] += 1
+        if row["error"] or len(row["failed_sources"]) == len(SOURCES):
+            self.stats["failed_rows"] += 1
+        self.stats["processed"] += 1
+        self.buffer.append(row)
+        if len(self.buffer) >= self.chunk_size:
+            self.write_part()
+
+    def write_part(self):
+        rows, self.buffer = self.buffer, []
+        if not rows:
+            return
+        extension = "parquet" if self.output_format == "parquet" else "jsonl"
+        part_number = len([name for name in os.listdir(self.out_dir) if name.startswith("part-") and name.endswith(f".{extension}")])
+        path = os.path.join(self.out_dir, f"part-{part_number:05d}.{extension}")
+        if self.output_format == "parquet":
+            pq.write_table(pa.Table.from_pylist(rows, schema=RESULT_SCHEMA), path + ".tmp")
+        else:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(row) + "\n" for row in rows)
+        os.replace(path + ".tmp", path)
+        # Checkpoint only after the part file is in place, so a crash never records keys whose results were lost
+        append_checkpoint(self.out_dir, [row["key"] for row in rows])
+        self.report()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        self.stats["upstream_calls"] = self.upstream_calls()
+        self.stats["rows_per_minute"] = round(self.stats["processed"] / elapsed * 60, 1) if elapsed else 0.0
+        print(json.dumps(self.stats), flush=True)
+
+    async def reporter(self):
+        while True:
+            await asyncio.sleep(self.report_seconds)
+            self.report()
+
+    async def worker(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                await self.process_row(*item)
+            finally:
+                queue.task_done()
+
+    async def run(self, rows):
+        os.makedirs(self.out_dir, exist_ok=True)
+        done_keys = load_checkpoint(self.out_dir)
+        seen_keys = set()
+        self.started = time.perf_counter()
+        self.misses_at_start = self.upstream_calls()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.ensure_future(self.worker(queue)) for _ in range(self.concurrency)]
+        reporter = asyncio.ensure_future(self.reporter())
+        try:
+            for query, zipcode in rows:
+                self.stats["read"] += 1
+                if pd.isna(query) or not str(query).strip():
+                    continue
+                zipcode = "" if pd.isna(zipcode) else str(zipcode).strip()
+                key = row_key(query, zipcode)
+                if key in seen_keys:
+                    self.stats["duplicates"] += 1
+                    continue
+                seen_keys.add(key)
+                if key in done_keys:
+                    self.stats["skipped"] += 1
+                    continue
+                if not self.budget_left():
+                    self.stats["stopped"] = "budget"
+                    break
+                self.pending += 1
+                await queue.put((key, str(query).strip(), zipcode))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+            for task in workers:
+                task.cancel()
+            self.write_part()
+        self.report()
+        return self.stats
+
+
+###### MAIN
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or Parquet file with one business per row.")
+    parser.add_argument("out_dir", help="Directory for the part files and the checkpoint.")
+    parser.add_argument("--query-column", default="business")
+    parser.add_argument("--zipcode-column", default="zipcode")
+    parser.add_argument("--format", choices=("parquet", "jsonl"), default="parquet")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows per part file.")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Rows researched at the same time.")
+    parser.add_argument("--budget", type=int, default=None, help="Maximum upstream provider requests for this run.")
+    parser.add_argument("--deadline", type=float, default=SEARCH_DEADLINE, help="Seconds each row waits for its sources.")
+    parser.add_argument("--report-seconds", type=float, default=REPORT_SECONDS)
+    args = parser.parse_args()
+
+    batch = ResearchBatch(args.out_dir, args.format, args.concurrency, args.chunk_size, args.budget, args.deadline, args.report_seconds)
+    rows = read_rows(args.input, [args.query_column, args.zipcode_column], args.chunk_size)
+    stats = asyncio.run(batch.run(rows))
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
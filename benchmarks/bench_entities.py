@@ -0,0 +1,68 @@
+"""
+Micro-benchmark of cross-source entity resolution: Google Places and Yelp listings of the same synthetic businesses,
+with jittered coordinates, name variants and partial phone coverage, resolved with the grid index.
+
+Reports timings and how many of the true pairs were merged (recall) and how many entities hold listings of different businesses (false merges).
+
+Usage:
+    python -m benchmarks.bench_entities [--businesses 2000] [--repeat 5] [--spread 0.2]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from entities import resolve_entities
+
+SUFFIXES = ["", " Inc", " LLC", " Co."]
+TRADES = ["Roofing", "Plumbing", "Electric", "HVAC", "Construction", "Painting"]
+WORDS = ["Acme", "Summit", "Pacific", "Golden", "Liberty", "Pioneer", "Coastal", "Valley", "Premier", "Elite", "Apex", "Reliable"]
+
+
+def synthetic_records(businesses: int, spread: float, rng: random.Random):
+    """
+    Two listings per business, about 10-60 m apart, plus Yelp-only listings so not every record has a partner.
+    """
+    records = []
+    for k in range(businesses):
+        name = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(TRADES)}"
+        lat, lng = 34.0 + rng.random() * spread, -118.0 - rng.random() * spread
+        phone = f"+1310{k:07d}"
+        records.append({"source": "google_places", "source_id": f"g{k}", "name": name, "lat": lat, "lng": lng, "phone": phone if rng.random() < 0.3 else None, "truth": k})
+        records.append({"source": "yelp", "source_id": f"y{k}", "name": name + rng.choice(SUFFIXES), "lat": lat + rng.uniform(-4e-4, 4e-4), "lng": lng + rng.uniform(-4e-4, 4e-4),
+                        "phone": phone if rng.random() < 0.8 else None, "truth": k})
+    for k in range(businesses // 4):
+        records.append({"source": "yelp", "source_id": f"solo{k}", "name": f"{rng.choice(WORDS)} {rng.choice(TRADES)}", "lat": 34.0 + rng.random() * spread,
+                        "lng": -118.0 - rng.random() * spread, "truth": businesses + k})
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--businesses", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--spread", type=float, default=0.2, help="Side of the square the businesses are scattered over, in degrees")
+    args = parser.parse_args()
+
+    records = synthetic_records(args.businesses, args.spread, random.Random(0))
+    truth = {f"{record['source']}:{record['source_id']}": record["truth"] for record in records}
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        entities = resolve_entities(records)
+        timings.append(time.perf_counter() - start)
+
+    merged = sum(1 for source_ids in entities["source_ids"] if len(source_ids) == 2 and len({truth[source_id] for source_id in source_ids}) == 1)
+    false_merges = sum(1 for source_ids in entities["source_ids"] if len({truth[source_id] for source_id in source_ids}) > 1)
+    print(json.dumps({
+        "records": len(records),
+        "entities": len(entities),
+        "median_ms": statistics.median(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "recall": merged / args.businesses,
+        "false_merges": false_merges,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
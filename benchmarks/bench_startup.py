@@ -0,0 +1,82 @@
+"""
+Startup-time benchmark for the lazy client registry.
+
+Compares what a Streamlit rerun of testasst.py costs now (module body only, clients reused from the registry)
+with what it cost when every import built all five provider clients and created an assistant thread.
+
+Usage:
+    python -m benchmarks.bench_startup [--reruns 20] [--create-thread]
+"""
+import argparse
+import importlib
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+PROVIDERS = ["openai", "supabase", "yelp", "google", "tavily"]
+
+
+def cold_import_seconds(module: str):
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def rerun_seconds(module, reruns: int):
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        importlib.reload(module)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def client_build_seconds(registry):
+    build_times = {}
+    for name in PROVIDERS:
+        registry.reset(name)
+        try:
+            registry.get(name)
+            build_times[name] = registry.build_times[name]
+        except Exception as e:
+            build_times[name] = f"skipped ({type(e).__name__})"
+    return build_times
+
+
+def thread_create_seconds(testasst):
+    start = time.perf_counter()
+    testasst.start_thread()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--create-thread", action="store_true", help="Include one live threads.create round trip in the eager baseline.")
+    args = parser.parse_args()
+
+    cold_import = cold_import_seconds("testasst")
+    import testasst
+    from clients import clientRegistry
+
+    reruns = rerun_seconds(testasst, args.reruns)
+    build_times = client_build_seconds(clientRegistry)
+    eager_cost = sum(value for value in build_times.values() if isinstance(value, float))
+    if args.create_thread:
+        eager_cost += thread_create_seconds(testasst)
+
+    rerun_median = statistics.median(reruns)
+    results = {
+        "cold_import_s": cold_import,
+        "rerun_median_s": rerun_median,
+        "client_build_s": build_times,
+        "eager_rerun_estimate_s": rerun_median + eager_cost,
+        "saved_per_rerun_s": eager_cost,
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Offline benchmark suite for the research tools.
+
+Runs Tools.yelp_search, AsyncTools.execute_all_tasks, Tools.execute_all_searches and the result serialization against
+the local provider stand-ins in benchmarks/fakes.py, and writes latency percentiles and throughput to a JSON file
+named after the current commit so runs can be compared. Exits with status 1 when every call of a benchmark raised.
+
+Usage:
+    python -m benchmarks.bench_tools [--latency 0.1] [--jitter 0.05] [--error-rate 0.0] [--payload-size 20]
+                                     [--iterations 50] [--concurrency 4] [--output path.json] [--baseline earlier.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.fakes import FakeProfile, FakeGoogleMaps, FakeTavily, FakeYelp, fake_search, install_fakes
+
+PROVIDERS = ["tavily", "google", "yelp", "googlesearch", "web"]
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+
+def percentiles(timings: list):
+    ordered = sorted(timings)
+    def at(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {"p50_ms": at(0.50), "p90_ms": at(0.90), "p95_ms": at(0.95), "p99_ms": at(0.99), "mean_ms": statistics.fmean(ordered) * 1000}
+
+
+def run_threaded(func, iterations: int, concurrency: int, before_each=None):
+    """
+    Calls func iterations times from concurrency threads and returns latency percentiles, throughput and error count.
+    """
+    def one_call(i):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        try:
+            func(i)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, type(e).__name__
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(one_call, range(iterations)))
+    elapsed = time.perf_counter() - start
+    return summarize(outcomes, elapsed)
+
+
+def run_async(coro_func, iterations: int, concurrency: int, before_each=None):
+    """
+    Awaits coro_func(i) iterations times with at most concurrency in flight on one event loop.
+    """
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        async def one_call(i):
+            async with semaphore:
+                if before_each:
+                    before_each()
+                start = time.perf_counter()
+                try:
+                    await coro_func(i)
+                    return time.perf_counter() - start, None
+                except Exception as e:
+                    return time.perf_counter() - start, type(e).__name__
+        return await asyncio.gather(*[one_call(i) for i in range(iterations)])
+
+    start = time.perf_counter()
+    outcomes = asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    return summarize(outcomes, elapsed)
+
+
+def summarize(outcomes: list, elapsed: float):
+    errors = {}
+    for _, error in outcomes:
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+    failures = sum(errors.values())
+    # A benchmark whose every call raised only timed the error path
+    return {**percentiles([timing for timing, _ in outcomes]), "throughput_per_s": len(outcomes) / elapsed, "calls": len(outcomes), "errors": errors, "failed": bool(outcomes) and failures == len(outcomes)}
+
+
+def fake_responses(profile: FakeProfile):
+    """
+    One execute_all_tasks-shaped response built directly from the fakes, without latency or errors.
+    """
+    quiet = FakeProfile(latency=0, jitter=0, error_rate=0, payload_size=profile.payload_size, raw_content_chars=profile.raw_content_chars)
+    return {
+        "internet_search": list(fake_search(quiet)("roofing contractors", advanced=True)),
+        "internet_research": FakeTavily(quiet).search("roofing contractors", max_results=7, include_raw_content=True),
+        "google_places_search": FakeGoogleMaps(quiet).places("roofing contractors"),
+        "yelp_search": FakeYelp(quiet).search_query(term="roofing", location="90210")["businesses"],
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict):
+    """
+    Ratio of each benchmark's p50/p95 and throughput to the baseline run.
+    """
+    deltas = {}
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous:
+            deltas[name] = {metric: current[metric] / previous[metric] if previous[metric] else None for metric in ("p50_ms", "p95_ms", "throughput_per_s")}
+    return deltas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--payload-size", type=int, default=20)
+    parser.add_argument("--raw-content-chars", type=int, default=20000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warm-cache", action="store_true", help="Keep the response cache between calls instead of clearing it.")
+    parser.add_argument("--respect-limits", action="store_true", help="Keep the production per-provider rate limits.")
+    parser.add_argument("--output", help=f"Result file; defaults to {RESULTS_DIR}/<commit>.json.")
+    parser.add_argument("--baseline", help="An earlier result file to compare against.")
+    args = parser.parse_args()
+
+    from cache import toolCache
+    from resilience import resiliencePolicies
+    from search_index import searchIndex, HashingEmbedder
+    from semantic_cache import semanticCache
+
+    # Keep benchmark entries out of the real cache, index and semantic cache files, and embed locally instead of calling OpenAI
+    cache_dir = tempfile.mkdtemp(prefix="bench-cache-")
+    toolCache.path = os.path.join(cache_dir, "tool_cache.sqlite3")
+    searchIndex.path = os.path.join(cache_dir, "search_index.sqlite3")
+    searchIndex.embedder = HashingEmbedder()
+    semanticCache.path = os.path.join(cache_dir, "semantic_cache.sqlite3")
+    if not args.respect_limits:
+        for provider in list(resiliencePolicies.provider_limits):
+            resiliencePolicies.configure_provider(provider, rate=1e6, burst=10 ** 6)
+
+    profile_settings = {"latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate, "payload_size": args.payload_size, "raw_content_chars": args.raw_content_chars}
+    install_fakes({provider: FakeProfile(seed=seed, **profile_settings) for seed, provider in enumerate(PROVIDERS)})
+
+    from testasst import Tools, AsyncTools
+    from serialize import compact_search_results
+
+    clear_cache = None if args.warm_cache else toolCache.clear
+    responses = fake_responses(FakeProfile(**profile_settings))
+    benchmarks = {
+        "yelp_search": run_threaded(lambda i: Tools.yelp_search("roofing", f"{90210 + i % 10}"), args.iterations, args.concurrency, clear_cache),
+        "execute_all_tasks": run_async(lambda i: AsyncTools.execute_all_tasks("roofing contractors", f"{90210 + i % 10}"), args.iterations, args.concurrency, clear_cache),
+        "execute_all_searches": run_threaded(lambda i: Tools.execute_all_searches("roofing contractors", f"{90210 + i % 10}"), args.iterations, args.concurrency, clear_cache),
+        "serialization": run_threaded(lambda i: compact_search_results(responses), args.iterations, 1),
+    }
+
+    results = {
+        "commit": current_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": {**profile_settings, "iterations": args.iterations, "concurrency": args.concurrency, "warm_cache": args.warm_cache, "respect_limits": args.respect_limits},
+        "benchmarks": benchmarks,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            results["vs_baseline"] = compare(results, json.load(f))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Wrote {output}")
+    failed = [name for name, result in benchmarks.items() if result["failed"]]
+    if failed:
+        print(f"Every call failed in: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of the Yelp result builders: the legacy per-row dict assembly used by Tools.yelp_search
+against YelpFrameBuilder's typed columns, with and without Arrow-backed output.
+
+Usage:
+    python -m benchmarks.bench_yelp_frame [--rows 1000] [--repeat 20]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import pandas as pd
+from testasst import yelp_business_record
+from yelp_frame import YelpFrameBuilder
+
+CITIES = [("Beverly Hills", "CA", "90210"), ("Los Angeles", "CA", "90001"), ("Austin", "TX", "78701"), ("Chicago", "IL", "60601")]
+CATEGORIES = [("roofing", "Roofing"), ("contractors", "Contractors"), ("plumbing", "Plumbing"), ("electricians", "Electricians"), ("hvac", "Heating & Air Conditioning/HVAC")]
+
+
+def fake_business(i: int, rng: random.Random):
+    city, state, zip_code = rng.choice(CITIES)
+    categories = rng.sample(CATEGORIES, rng.randint(1, 3))
+    business = {
+        "id": f"business-{i}", "alias": f"business-{i}-{city.lower().replace(' ', '-')}", "name": f"Business {i}",
+        "image_url": f"https://s3-media.fl.yelpcdn.com/bphoto/{i}/o.jpg", "is_closed": False,
+        "url": f"https://www.yelp.com/biz/business-{i}?adjust_creative=abc&utm_campaign=yelp_api_v3",
+        "review_count": rng.randint(0, 900), "rating": rng.choice([3.0, 3.5, 4.0, 4.5, 5.0]),
+        "coordinates": {"latitude": 34.0 + rng.random(), "longitude": -118.0 - rng.random()},
+        "phone": "+13105550100", "display_phone": "(310) 555-0100", "distance": rng.random() * 10000,
+        "location": {"address1": f"{i} Main St", "address2": "", "address3": "", "city": city, "zip_code": zip_code, "country": "US", "state": state,
+                     "display_address": [f"{i} Main St", f"{city}, {state} {zip_code}"]},
+        "categories": [{"alias": alias, "title": title} for alias, title in categories],
+    }
+    detailed_info = {
+        "is_claimed": rng.random() > 0.3, "location": {"cross_streets": "Main St & 1st Ave"},
+        "photos": [f"https://s3-media.fl.yelpcdn.com/bphoto/{i}-{p}/o.jpg" for p in range(3)],
+        "hours": [{"open": [{"is_overnight": False, "start": "0800", "end": "1700", "day": day} for day in range(5)], "is_open_now": True}],
+        "transactions": rng.sample(["pickup", "delivery", "restaurant_reservation"], rng.randint(0, 2)),
+    }
+    return business, detailed_info
+
+
+def legacy_frame(pairs):
+    return pd.DataFrame([yelp_business_record(business, detailed_info) for business, detailed_info in pairs])
+
+
+def builder_frame(pairs, arrow: bool):
+    builder = YelpFrameBuilder(len(pairs))
+    for business, detailed_info in pairs:
+        builder.add(business, detailed_info)
+    return builder.to_frame(arrow=arrow)
+
+
+def measure(build, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = build()
+        timings.append(time.perf_counter() - start)
+    return {"median_ms": statistics.median(timings) * 1000, "min_ms": min(timings) * 1000, "memory_bytes": int(df.memory_usage(deep=True).sum())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pairs = [fake_business(i, rng) for i in range(args.rows)]
+    results = {
+        "rows": args.rows,
+        "legacy": measure(lambda: legacy_frame(pairs), args.repeat),
+        "typed": measure(lambda: builder_frame(pairs, arrow=False), args.repeat),
+        "arrow": measure(lambda: builder_frame(pairs, arrow=True), args.repeat),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Local stand-ins for every external provider used by testasst.py and testasync.py.
+
+Each fake sleeps for a configurable latency with jitter, fails at a configurable rate with a transient ConnectionError,
+and returns payloads shaped like the real API responses with a configurable number of results.
+install_fakes() swaps them into the client registry and the googlesearch `search` name, so Tools and AsyncTools run unchanged.
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field, replace
+from types import SimpleNamespace
+
+LOREM = "Licensed and insured roofing contractor serving the greater Los Angeles area since 1998. "
+
+
+@dataclass
+class FakeProfile:
+    latency: float = 0.1
+    jitter: float = 0.05
+    error_rate: float = 0.0
+    payload_size: int = 20
+    raw_content_chars: int = 20000
+    seed: int = 0
+    rng: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+
+    def wait(self, name: str):
+        """
+        Sleeps for latency +/- jitter and raises a transient error at error_rate.
+        """
+        time.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+        if self.rng.random() < self.error_rate:
+            raise ConnectionError(f"fake {name} connection reset")
+
+    async def wait_async(self, name: str):
+        """
+        wait() for the async fakes: sleeps on the event loop instead of blocking a thread.
+        """
+        await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+        if self.rng.random() < self.error_rate:
+            raise ConnectionError(f"fake {name} connection reset")
+
+    def instant(self):
+        """
+        A copy with no latency or errors, for building payloads after wait_async has already been awaited.
+        """
+        return replace(self, latency=0.0, jitter=0.0, error_rate=0.0)
+
+
+def fake_business(i: int, zipcode: str = "90210"):
+    return {
+        "id": f"fake-business-{i}", "alias": f"fake-business-{i}", "name": f"Fake Roofing {i}",
+        "image_url": f"https://example.com/{i}.jpg", "is_closed": False,
+        "url": f"https://www.yelp.com/biz/fake-business-{i}?adjust_creative=fake&utm_source=yelp_api_v3",
+        "review_count": 10 + i, "rating": 4.5, "coordinates": {"latitude": 34.07 + i * 1e-4, "longitude": -118.40 - i * 1e-4},
+        "phone": f"+1310555{i:04d}", "display_phone": f"(310) 555-{i:04d}", "distance": 100.0 * i,
+        "location": {"address1": f"{i} Wilshire Blvd", "address2": "", "address3": "", "city": "Beverly Hills", "zip_code": zipcode,
+                     "country": "US", "state": "CA", "display_address": [f"{i} Wilshire Blvd", f"Beverly Hills, CA {zipcode}"]},
+        "categories": [{"alias": "roofing", "title": "Roofing"}, {"alias": "contractors", "title": "Contractors"}],
+    }
+
+
+class FakeTavily:
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+
+    def search(self, query: str, max_results: int = 5, include_raw_content: bool = False, **kwargs):
+        self.profile.wait("tavily")
+        raw_content = (LOREM * (self.profile.raw_content_chars // len(LOREM) + 1))[:self.profile.raw_content_chars]
+        return {
+            "query": query, "answer": f"Fake answer for {query}.", "images": [], "follow_up_questions": None, "response_time": self.profile.latency,
+            "results": [{"title": f"Result {i} for {query}", "url": f"https://example.com/{i}", "content": LOREM * 3, "score": 1 - i / 10,
+                         "raw_content": raw_content if include_raw_content else None} for i in range(max_results)],
+        }
+
+
+class FakeGoogleMaps:
+    """
+    Implements the private _request hook used by the googlemaps module functions, plus the bound places() method.
+    """
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+
+    def _request(self, url: str, params: dict = None, **kwargs):
+        self.profile.wait("google")
+        if "place" in url:
+            return self.places_payload((params or {}).get("query", ""))
+        if "geocode" in url:
+            return {"status": "OK", "results": [{"formatted_address": "1 Wilshire Blvd, Beverly Hills, CA 90210, USA", "place_id": "fake-place",
+                                                 "geometry": {"location": {"lat": 34.07, "lng": -118.40}}}]}
+        return {"result": {"verdict": {"validationGranularity": "PREMISE", "addressComplete": True},
+                           "address": {"formattedAddress": "1 Wilshire Blvd, Beverly Hills, CA 90210-1234, USA"}}}
+
+    def places_payload(self, query: str):
+        return {"status": "OK", "html_attributions": [], "results": [
+            {"place_id": f"fake-place-{i}", "name": f"Fake Roofing {i}", "formatted_address": f"{i} Wilshire Blvd, Beverly Hills, CA 90210, USA",
+             "geometry": {"location": {"lat": 34.07 + i * 1e-4, "lng": -118.40 - i * 1e-4}, "viewport": {}}, "rating": 4.5, "user_ratings_total": 10 + i,
+             "business_status": "OPERATIONAL", "types": ["roofing_contractor", "point_of_interest", "establishment"],
+             "icon": "https://example.com/icon.png", "photos": [{"height": 1000, "width": 1000, "photo_reference": "x" * 200}], "reference": "x" * 200}
+            for i in range(self.profile.payload_size)]}
+
+    def places(self, query: str, **kwargs):
+        return self._request("/maps/api/place/textsearch/json", {"query": query})
+
+
+class FakeYelp:
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+
+    def search_query(self, term: str = None, location: str = None, limit: int = None, offset: int = 0, **kwargs):
+        self.profile.wait("yelp")
+        total = self.profile.payload_size
+        count = min(limit or 20, max(0, total - offset))
+        return {"total": total, "businesses": [fake_business(offset + i, location or "90210") for i in range(count)]}
+
+    def business_query(self, id: str, **kwargs):
+        self.profile.wait("yelp")
+        return {"id": id, "is_claimed": True, "location": {"cross_streets": "Wilshire Blvd & Rodeo Dr"},
+                "photos": [f"https://example.com/{id}/{p}.jpg" for p in range(3)], "transactions": [],
+                "hours": [{"open": [{"is_overnight": False, "start": "0800", "end": "1700", "day": day} for day in range(5)], "is_open_now": True}]}
+
+
+class FakeAsyncTavily:
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+        self.fake = FakeTavily(profile.instant())
+
+    async def search(self, query: str, **kwargs):
+        await self.profile.wait_async("tavily")
+        return self.fake.search(query, **kwargs)
+
+
+class FakeAsyncGoogleMaps:
+    """
+    Mirrors async_clients.AsyncGoogleMaps with the FakeGoogleMaps payloads.
+    """
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+        self.fake = FakeGoogleMaps(profile.instant())
+
+    async def places(self, query: str, **kwargs):
+        await self.profile.wait_async("google")
+        return self.fake.places(query)
+
+    async def geocode(self, address, **kwargs):
+        await self.profile.wait_async("google")
+        return self.fake._request("/maps/api/geocode/json")["results"]
+
+    async def addressvalidation(self, addressLines: list, **kwargs):
+        await self.profile.wait_async("google")
+        return self.fake._request("/v1:validateAddress")
+
+
+class FakeAsyncYelp:
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+        self.fake = FakeYelp(profile.instant())
+
+    async def search_query(self, **kwargs):
+        await self.profile.wait_async("yelp")
+        return self.fake.search_query(**kwargs)
+
+
+class FakeAsyncHttp:
+    """
+    Mirrors async_clients.AsyncHttp.fetch_text with a canned article page, so page passages are extracted without touching the network.
+    """
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+
+    async def fetch_text(self, url: str, content_types: tuple, max_bytes: int, timeout: float = None):
+        await self.profile.wait_async("web")
+        paragraphs = "".join(f"<p>{LOREM * 4}</p>" for _ in range(max(1, self.profile.raw_content_chars // (len(LOREM) * 4))))
+        return f"<html><head><title>{url}</title></head><body><article><h1>{url}</h1>{paragraphs}</article></body></html>"[:max_bytes]
+
+
+def fake_search(profile: FakeProfile):
+    def search(term: str, advanced: bool = False, num_results: int = 10, **kwargs):
+        profile.wait("googlesearch")
+        for i in range(num_results):
+            url = f"https://example.com/{i}" if i % 2 else f"https://other.example.com/{term.replace(' ', '-')}/{i}"
+            yield SimpleNamespace(url=url, title=f"Search result {i}", description=LOREM) if advanced else url
+    return search
+
+
+def install_fakes(profiles: dict):
+    """
+    Points the client registry and testasst/testasync's googlesearch `search` at fakes. profiles maps provider name to FakeProfile;
+    missing providers get a default profile.
+    """
+    import testasst
+    import testasync
+    from clients import clientRegistry
+
+    def profile(name: str):
+        return profiles.get(name) or FakeProfile()
+
+    clientRegistry.register("tavily", lambda: FakeTavily(profile("tavily")))
+    clientRegistry.register("google", lambda: FakeGoogleMaps(profile("google")))
+    clientRegistry.register("yelp", lambda: FakeYelp(profile("yelp")))
+    clientRegistry.register("tavily_async", lambda: FakeAsyncTavily(profile("tavily")))
+    clientRegistry.register("google_async", lambda: FakeAsyncGoogleMaps(profile("google")))
+    clientRegistry.register("yelp_async", lambda: FakeAsyncYelp(profile("yelp")))
+    clientRegistry.register("http_async", lambda: FakeAsyncHttp(profile("web")))
+    clientRegistry.reset()
+    testasst.search = fake_search(profile("googlesearch"))
+    testasync.search = testasst.search
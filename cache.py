@@ -0,0 +1,201 @@
+import sqlite3
+import json
+import time
+import hashlib
+import threading
+import functools
+import inspect
+import os
+import re
+from metrics import metricsRegistry, add_payload_bytes
+
+##### SET VARIABLES
+CACHE_PATH = os.path.join(".cache", "tool_cache.sqlite3")
+MAX_ENTRIES = 5000
+DEFAULT_TTL = 60 * 60
+TOOL_TTLS = {
+    "internet_research": 6 * 60 * 60,
+    "google_places_search": 24 * 60 * 60,
+    "yelp_query_search": 24 * 60 * 60,
+    "yelp_business_search": 24 * 60 * 60,
+    "google_geocode": 30 * 24 * 60 * 60,
+    "google_address_validation": 30 * 24 * 60 * 60,
+}
+
+
+###### FUNCTIONS
+def normalize_argument(value):
+    """
+    Normalizes a tool argument so equivalent calls share a cache key: strings are trimmed, whitespace-collapsed and casefolded, and containers are normalized recursively.
+    """
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value).strip().casefold()
+    if isinstance(value, (list, tuple)):
+        return [normalize_argument(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): normalize_argument(item) for key, item in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    return value
+
+
+def bind_arguments(func, args: tuple, kwargs: dict):
+    """
+    Binds positional and keyword arguments to the parameter names of func, with defaults applied.
+    """
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Tool Cache
+class ToolCache:
+    """
+    SQLite-backed response cache for external tool calls with a per-tool TTL and LRU eviction bounded by max_entries.
+    Entries are keyed on the tool name plus its normalized arguments, so hits survive Streamlit restarts and are shared by every caller in the process.
+    """
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = MAX_ENTRIES, ttls: dict = None, default_ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = dict(TOOL_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, tool TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def ttl(self, tool: str):
+        return self.ttls.get(tool, self.default_ttl)
+
+    @staticmethod
+    def make_key(tool: str, arguments: dict):
+        payload = json.dumps([tool, normalize_argument(arguments)], sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, tool: str, key: str):
+        """
+        Returns (hit, value) for the key. Expired entries count as a miss and are removed.
+        """
+        start = time.perf_counter()
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] > now:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self.hits[tool] = self.hits.get(tool, 0) + 1
+                value = json.loads(row[0])
+                metricsRegistry.record("cache", tool, time.perf_counter() - start, "hit", len(row[0]))
+                add_payload_bytes(len(row[0]))
+                return True, value
+            if row is not None:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                conn.commit()
+            self.misses[tool] = self.misses.get(tool, 0) + 1
+        metricsRegistry.record("cache", tool, time.perf_counter() - start, "miss")
+        return False, None
+
+    def contains(self, key: str):
+        """
+        Whether an unexpired entry exists for the key, without touching it or the hit/miss counters.
+        """
+        with self._lock:
+            row = self._connection().execute("SELECT 1 FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+        return row is not None
+
+    def set(self, tool: str, key: str, value, ttl: float = None):
+        """
+        Stores a JSON-serializable value and evicts the least recently used entries beyond max_entries.
+        Values that cannot be serialized are not cached.
+        """
+        try:
+            payload = json.dumps(value)
+        except (TypeError, ValueError):
+            return
+        add_payload_bytes(len(payload))
+        now = time.time()
+        expires_at = now + (self.ttl(tool) if ttl is None else ttl)
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO entries (key, tool, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)", (key, tool, payload, expires_at, now))
+            overflow = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute("DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at LIMIT ?)", (overflow,))
+            conn.commit()
+
+    def clear(self, tool: str = None):
+        with self._lock:
+            conn = self._connection()
+            if tool is None:
+                conn.execute("DELETE FROM entries")
+            else:
+                conn.execute("DELETE FROM entries WHERE tool = ?", (tool,))
+            conn.commit()
+
+    def stats(self):
+        """
+        Returns the hit/miss counters per tool along with totals and the number of stored entries.
+        """
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            tools = sorted(set(self.hits) | set(self.misses))
+            per_tool = {tool: {"hits": self.hits.get(tool, 0), "misses": self.misses.get(tool, 0)} for tool in tools}
+        hits = sum(counts["hits"] for counts in per_tool.values())
+        misses = sum(counts["misses"] for counts in per_tool.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": entries,
+            "tools": per_tool,
+        }
+
+    def cached(self, tool: str, ttl: float = None):
+        """
+        Decorator that serves calls to a sync or async tool function from the cache.
+        Sync and async implementations of the same tool share entries when they use the same tool name and parameter names.
+        """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    key = self.make_key(tool, bind_arguments(func, args, kwargs))
+                    hit, value = self.get(tool, key)
+                    if hit:
+                        return value
+                    value = await func(*args, **kwargs)
+                    self.set(tool, key, value, ttl)
+                    return value
+                # Copied up the decorator stack by functools.wraps, so toolspec.tool can tell a cached tool from above
+                async_wrapper.cached_tool = tool
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = self.make_key(tool, bind_arguments(func, args, kwargs))
+                hit, value = self.get(tool, key)
+                if hit:
+                    return value
+                value = func(*args, **kwargs)
+                self.set(tool, key, value, ttl)
+                return value
+            wrapper.cached_tool = tool
+            return wrapper
+        return decorator
+
+
+##### SET CACHE
+toolCache = ToolCache()
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import time
+import weakref
+import streamlit as st
+
+##### SET VARIABLES
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 32
+HTTP_TIMEOUT = 30
+WEB_USER_AGENT = "Mozilla/5.0 (compatible; fgs-research/1.0)"
+
+
+###### FUNCTIONS
+def pooled_requests_session():
+    """
+    Returns a requests session whose keep-alive pool is sized for the concurrent tool calls.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def build_openai():
+    import httpx
+    from openai import OpenAI as openai_client
+
+    http_client = httpx.Client(timeout=HTTP_TIMEOUT, limits=httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_CONNECTIONS))
+    return openai_client(api_key=st.secrets.openai.api_key, http_client=http_client)
+
+
+def openai_async_client():
+    import httpx
+    from openai import AsyncOpenAI as async_openai_client
+
+    http_client = httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_CONNECTIONS))
+    return async_openai_client(api_key=st.secrets.openai.api_key, http_client=http_client)
+
+
+def build_openai_async():
+    return PerLoopClient(openai_async_client)
+
+
+def build_supabase():
+    from supabase import create_client as supabase_client
+
+    return supabase_client(supabase_key=st.secrets.supabase.api_key_admin, supabase_url=st.secrets.supabase.url)
+
+
+def build_yelp():
+    from yelpapi import YelpAPI as yelp_client
+
+    client = yelp_client(api_key=st.secrets.yelp.api_key)
+    # yelpapi keeps one requests session per client; swap in the larger pool so concurrent detail lookups reuse connections
+    if hasattr(client, "_yelp_session"):
+        client._yelp_session = pooled_requests_session()
+    return client
+
+
+def build_google():
+    from googlemaps import Client as google_client
+
+    # Retries and quota backoff are handled by resilience.resiliencePolicies, so turn off the client's own long retry loop
+    return google_client(key=st.secrets.google.maps_api_key, requests_session=pooled_requests_session(), timeout=HTTP_TIMEOUT, retry_timeout=HTTP_TIMEOUT, retry_over_query_limit=False)
+
+
+def build_tavily():
+    from tavily import TavilyClient as tavily_client
+
+    return tavily_client(api_key=st.secrets.tavily.api_key)
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Client Registry
+class ClientRegistry:
+    """
+    Builds each provider client on first use and keeps it for the life of the process.
+    Streamlit re-executes page scripts but keeps imported modules, so one registry serves every rerun and every session.
+    """
+    def __init__(self):
+        self._factories = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+        self.build_times = {}
+
+    def register(self, name: str, factory):
+        self._factories[name] = factory
+
+    def get(self, name: str):
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None:
+                start = time.perf_counter()
+                client = self._factories[name]()
+                self.build_times[name] = time.perf_counter() - start
+                self._clients[name] = client
+        return client
+
+    def is_built(self, name: str):
+        return name in self._clients
+
+    def reset(self, name: str = None):
+        """
+        Drops built clients so the next access rebuilds them (used by benchmarks and after a secrets change).
+        """
+        with self._lock:
+            if name is None:
+                self._clients.clear()
+            else:
+                self._clients.pop(name, None)
+
+    def proxy(self, name: str):
+        return LazyClient(self, name)
+
+
+#__________________________________________________________________________________________
+# 2. Lazy Client
+class LazyClient:
+    """
+    Stand-in that resolves the named client from the registry on first attribute access, so modules can keep module-level client names without building anything at import.
+    """
+    __slots__ = ("_registry", "_name")
+
+    def __init__(self, registry: ClientRegistry, name: str):
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attr: str):
+        return getattr(self._registry.get(self._name), attr)
+
+    def __repr__(self):
+        state = "built" if self._registry.is_built(self._name) else "lazy"
+        return f"<LazyClient {self._name} ({state})>"
+
+
+#__________________________________________________________________________________________
+# 3. Per-Loop Client
+class PerLoopClient:
+    """
+    Stand-in for an async client whose connections are bound to the event loop that opened them (httpx.AsyncClient and the SDKs
+    built on it). Attribute access resolves to one client per running loop, built by factory on first use there and dropped with
+    its loop, so the background loop, a restarted background loop and asyncio.run callers never share connections.
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def client(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = self._clients[loop] = self._factory()
+        return client
+
+    def __getattr__(self, attr: str):
+        return getattr(self.client(), attr)
+
+
+##### SET REGISTRY
+clientRegistry = ClientRegistry()
+clientRegistry.register("openai", build_openai)
+clientRegistry.register("openai_async", build_openai_async)
+clientRegistry.register("supabase", build_supabase)
+clientRegistry.register("yelp", build_yelp)
+clientRegistry.register("google", build_google)
+clientRegistry.register("tavily", build_tavily)
@@ -0,0 +1,143 @@
+import asyncio
+import copy
+import functools
+import inspect
+import threading
+from concurrent.futures import Future
+from cache import ToolCache, bind_arguments
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Flight
+class Flight:
+    """
+    One in-flight call and everyone waiting on it. The result lives in a concurrent.futures.Future so sync callers on Streamlit threads
+    and async callers on the background loop can share the same call.
+    """
+    def __init__(self):
+        self.future = Future()
+        self.waiters = 1
+        self.task = None
+
+
+#__________________________________________________________________________________________
+# 2. Single Flight
+class SingleFlight:
+    """
+    Coalesces identical concurrent tool calls: while a call is in flight, callers with the same tool name and normalized arguments
+    wait on its result instead of issuing their own upstream request. Keys use the tool cache's normalization, so calls that would
+    share a cache entry also share a flight, across sessions and across the sync and async implementations of a tool.
+
+    Callers that joined a flight get a deep copy of its result, so no session can mutate another's.
+    An async flight is only cancelled once every caller waiting on it has been cancelled; one session leaving does not fail the others.
+    """
+    def __init__(self):
+        self.flights = {}
+        self.upstream = {}
+        self.joined = {}
+        self._lock = threading.Lock()
+
+    def join(self, tool: str, key: str):
+        """
+        Returns (flight, leader). The leader must run the call and finish the flight; everyone else waits on it.
+        """
+        with self._lock:
+            flight = self.flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.joined[tool] = self.joined.get(tool, 0) + 1
+                return flight, False
+            flight = self.flights[key] = Flight()
+            self.upstream[tool] = self.upstream.get(tool, 0) + 1
+            return flight, True
+
+    def finish(self, key: str, flight: Flight, value=None, error: BaseException = None, cancelled: bool = False):
+        with self._lock:
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+        if flight.future.done():
+            return
+        if cancelled:
+            flight.future.cancel()
+        elif error is not None:
+            flight.future.set_exception(error)
+        else:
+            flight.future.set_result(value)
+
+    def finish_task(self, key: str, flight: Flight, task: asyncio.Task):
+        if task.cancelled():
+            self.finish(key, flight, cancelled=True)
+        else:
+            self.finish(key, flight, task.result() if task.exception() is None else None, task.exception())
+
+    def leave(self, flight: Flight):
+        """
+        Called when an async waiter is cancelled; cancels the underlying call once nobody is waiting for it.
+        """
+        with self._lock:
+            flight.waiters -= 1
+            abandoned = flight.waiters == 0
+        if abandoned and flight.task is not None and not flight.task.done():
+            flight.task.get_loop().call_soon_threadsafe(flight.task.cancel)
+
+    def stats(self):
+        """
+        Returns how many calls went upstream and how many were coalesced onto an in-flight call, per tool and in total.
+        """
+        with self._lock:
+            tools = sorted(set(self.upstream) | set(self.joined))
+            per_tool = {tool: {"calls": self.upstream.get(tool, 0), "coalesced": self.joined.get(tool, 0)} for tool in tools}
+            in_flight = len(self.flights)
+        calls = sum(counts["calls"] for counts in per_tool.values())
+        coalesced = sum(counts["coalesced"] for counts in per_tool.values())
+        return {
+            "calls": calls,
+            "coalesced": coalesced,
+            "coalesced_rate": coalesced / (calls + coalesced) if calls + coalesced else 0.0,
+            "in_flight": in_flight,
+            "tools": per_tool,
+        }
+
+    def coalesced(self, tool: str):
+        """
+        Decorator that coalesces identical concurrent calls to a sync or async tool function.
+        Sync and async implementations of the same tool share flights when they use the same tool name and parameter names.
+        """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    key = ToolCache.make_key(tool, bind_arguments(func, args, kwargs))
+                    flight, leader = self.join(tool, key)
+                    if leader:
+                        flight.task = asyncio.ensure_future(func(*args, **kwargs))
+                        flight.task.add_done_callback(functools.partial(self.finish_task, key, flight))
+                    try:
+                        value = await asyncio.shield(asyncio.wrap_future(flight.future))
+                        return value if leader else copy.deepcopy(value)
+                    except asyncio.CancelledError:
+                        if not flight.future.done():
+                            self.leave(flight)
+                        raise
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = ToolCache.make_key(tool, bind_arguments(func, args, kwargs))
+                flight, leader = self.join(tool, key)
+                if not leader:
+                    return copy.deepcopy(flight.future.result())
+                try:
+                    value = func(*args, **kwargs)
+                except BaseException as e:
+                    self.finish(key, flight, error=e)
+                    raise
+                self.finish(key, flight, value)
+                return value
+            return wrapper
+        return decorator
+
+
+##### SET SINGLE FLIGHT
+singleFlight = SingleFlight()
@@ -0,0 +1,374 @@
+import re
+import zlib
+import numpy as np
+import pandas as pd
+
+##### SET VARIABLES
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = 111320.0
+MATCH_DISTANCE_M = 150.0
+NAME_THRESHOLD = 0.5
+# Listings this close are the same storefront unless the names clearly differ
+NEAR_DISTANCE_M = 25.0
+NEAR_NAME_THRESHOLD = 0.3
+# A shared phone number matches across this distance (geocodes of the same business can disagree by a few blocks)
+PHONE_DISTANCE_M = 5000.0
+NAME_SUFFIXES = {"inc", "incorporated", "llc", "llp", "ltd", "co", "corp", "corporation", "company", "the"}
+NAME_TOKEN = re.compile(r"[a-z0-9]+")
+MINHASH_PERMUTATIONS = 32
+MINHASH_PRIME = np.uint64((1 << 31) - 1)
+MINHASH_A = np.random.default_rng(0).integers(1, (1 << 31) - 1, MINHASH_PERMUTATIONS, dtype=np.uint64)
+MINHASH_B = np.random.default_rng(1).integers(0, (1 << 31) - 1, MINHASH_PERMUTATIONS, dtype=np.uint64)
+# Candidates whose estimated name similarity falls this far below the threshold are rejected without computing it exactly (~2 standard errors at 32 permutations)
+MINHASH_MARGIN = 0.15
+SOURCE_PRIORITY = ("google_places", "yelp")
+ENTITY_COLUMNS = [
+    "entity_id", "name", "address", "phone", "lat", "lng", "sources", "source_ids", "place_id", "yelp_id",
+    "google_rating", "google_ratings", "yelp_rating", "yelp_reviews", "business_status", "is_closed", "types", "categories", "url",
+    "match_distance_m", "name_similarity",
+]
+
+
+###### FUNCTIONS
+def normalize_name(name: str):
+    """
+    Lowercases, maps "&" to "and", drops punctuation and legal suffixes, and returns the remaining tokens.
+    """
+    tokens = NAME_TOKEN.findall((name or "").lower().replace("&", " and "))
+    return [token for token in tokens if token not in NAME_SUFFIXES]
+
+
+def normalize_phone(phone: str):
+    """
+    Keeps the last ten digits of a North American number; anything shorter is treated as missing.
+    """
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] if len(digits) >= 10 else ""
+
+
+def trigrams(tokens: list):
+    if not tokens:
+        return set()
+    text = f"  {' '.join(tokens)} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def minhash_signatures(gram_sets: list):
+    """
+    MinHash signatures (one row per non-empty trigram set) computed for all sets at once: every trigram hash goes through
+    MINHASH_PERMUTATIONS universal hash functions and np.minimum.reduceat takes the per-set minimum.
+    The fraction of equal signature entries between two rows estimates the Jaccard similarity of their sets.
+    """
+    lengths = np.array([len(grams) for grams in gram_sets], dtype=np.int64)
+    if len(lengths) == 0:
+        return np.zeros((0, MINHASH_PERMUTATIONS), dtype=np.uint64)
+    hashes = np.fromiter((zlib.crc32(gram.encode("utf-8")) for grams in gram_sets for gram in grams), dtype=np.uint64, count=int(lengths.sum()))
+    values = (MINHASH_A[:, None] * hashes[None, :] + MINHASH_B[:, None]) % MINHASH_PRIME
+    offsets = np.cumsum(lengths) - lengths
+    return np.minimum.reduceat(values, offsets, axis=1).T
+
+
+def name_similarity(tokens_a: list, tokens_b: list, trigrams_a: set, trigrams_b: set):
+    """
+    Character-trigram Jaccard similarity, raised to 0.9 when every token of a multi-word name appears in the other name
+    and zero when both names carry different numbers.
+    """
+    if not trigrams_a or not trigrams_b:
+        return 0.0
+    # Numbered locations of a chain ("Store 12" vs "Store 14") are different businesses however alike the rest of the name is
+    numbers_a, numbers_b = {token for token in tokens_a if token.isdigit()}, {token for token in tokens_b if token.isdigit()}
+    if numbers_a and numbers_b and numbers_a != numbers_b:
+        return 0.0
+    similarity = len(trigrams_a & trigrams_b) / len(trigrams_a | trigrams_b)
+    shorter, longer = sorted((set(tokens_a), set(tokens_b)), key=len)
+    if len(shorter) >= 2 and shorter <= longer:
+        similarity = max(similarity, 0.9)
+    return similarity
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in meters between arrays of coordinates given in degrees.
+    """
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def expand_ranges(starts: np.ndarray, ends: np.ndarray):
+    """
+    Returns (owner, position): for each i, every position in [starts[i], ends[i]) paired with i, without a Python loop.
+    """
+    counts = ends - starts
+    owner = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.cumsum(counts) - counts
+    position = np.arange(counts.sum()) - np.repeat(offsets, counts) + np.repeat(starts, counts)
+    return owner, position
+
+
+def grid_pairs(lat: np.ndarray, lng: np.ndarray, radius_m: float):
+    """
+    Candidate pairs (i < j) of points that may lie within radius_m of each other.
+
+    Points are bucketed into grid cells at least radius_m wide and each point is only compared with the 3x3 block of cells around it,
+    found by binary search over the sorted cell keys, so the work grows with the number of nearby points instead of n².
+    """
+    valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lng)))
+    if len(valid) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    cell_lat = radius_m / METERS_PER_DEGREE
+    # The widest longitude span per meter is at the highest latitude in the batch, so cells sized there are wide enough everywhere
+    cell_lng = radius_m / (METERS_PER_DEGREE * max(np.cos(np.radians(np.abs(lat[valid]).max())), 1e-6))
+    rows = np.floor(lat[valid] / cell_lat).astype(np.int64)
+    columns = np.floor(lng[valid] / cell_lng).astype(np.int64)
+    width = columns.max() - columns.min() + 3
+    keys = (rows - rows.min() + 1) * width + (columns - columns.min() + 1)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    pairs_i, pairs_j = [], []
+    for d_row in (-1, 0, 1):
+        for d_column in (-1, 0, 1):
+            targets = keys + d_row * width + d_column
+            starts = np.searchsorted(sorted_keys, targets, side="left")
+            ends = np.searchsorted(sorted_keys, targets, side="right")
+            owner, position = expand_ranges(starts, ends)
+            i, j = valid[owner], valid[order[position]]
+            keep = i < j
+            pairs_i.append(i[keep])
+            pairs_j.append(j[keep])
+    return np.concatenate(pairs_i), np.concatenate(pairs_j)
+
+
+def phone_pairs(phones: np.ndarray):
+    """
+    All pairs (i < j) of records sharing a normalized phone number.
+    """
+    groups = {}
+    for index, phone in enumerate(phones):
+        if phone:
+            groups.setdefault(phone, []).append(index)
+    pairs = [(a, b) for members in groups.values() if len(members) > 1 for k, a in enumerate(members) for b in members[k + 1:]]
+    if not pairs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pairs = np.array(pairs, dtype=np.int64)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def places_records(response: dict):
+    """
+    Flattens a Google Places text search response into source records.
+    """
+    records = []
+    for place in (response or {}).get("results", []):
+        location = (place.get("geometry") or {}).get("location") or {}
+        records.append({
+            "source": "google_places", "source_id": place.get("place_id"), "name": place.get("name"), "address": place.get("formatted_address"),
+            "lat": location.get("lat"), "lng": location.get("lng"), "phone": place.get("formatted_phone_number") or place.get("international_phone_number"),
+            "rating": place.get("rating"), "reviews": place.get("user_ratings_total"), "business_status": place.get("business_status"), "types": place.get("types"),
+        })
+    return records
+
+
+def yelp_records(response):
+    """
+    Flattens Yelp businesses into source records. Accepts the business list from the search API or a Tools.yelp_search frame.
+    """
+    records = []
+    if isinstance(response, pd.DataFrame):
+        for business in response.astype(object).where(response.notna(), None).to_dict("records"):
+            categories = business.get("categories_title")
+            records.append({
+                "source": "yelp", "source_id": business.get("id"), "name": business.get("name"),
+                "address": business.get("display_address") if isinstance(business.get("display_address"), str) else ", ".join(business.get("display_address") or []),
+                "lat": business.get("latitude"), "lng": business.get("longitude"), "phone": business.get("display_phone") or business.get("phone"),
+                "rating": business.get("rating"), "reviews": business.get("review_count"), "is_closed": business.get("is_closed"),
+                "categories": categories.split(", ") if isinstance(categories, str) else list(categories or []), "url": business.get("url"),
+            })
+        return records
+    for business in response or []:
+        location = business.get("location") or {}
+        coordinates = business.get("coordinates") or {}
+        records.append({
+            "source": "yelp", "source_id": business.get("id"), "name": business.get("name"), "address": ", ".join(location.get("display_address") or []),
+            "lat": coordinates.get("latitude"), "lng": coordinates.get("longitude"), "phone": business.get("display_phone") or business.get("phone"),
+            "rating": business.get("rating"), "reviews": business.get("review_count"), "is_closed": business.get("is_closed"),
+            "categories": [category.get("title") for category in business.get("categories", [])], "url": business.get("url"),
+        })
+    return records
+
+
+def match_pairs(records: list, max_distance: float = MATCH_DISTANCE_M, name_threshold: float = NAME_THRESHOLD, cross_source_only: bool = True):
+    """
+    Finds the record pairs that describe the same business.
+
+    Candidates come from the spatial grid (within max_distance) and from shared phone numbers. A candidate matches when the names are
+    similar enough at that distance, when the listings are within NEAR_DISTANCE_M with loosely similar names, or when the phone numbers
+    agree within PHONE_DISTANCE_M (or either side has no coordinates).
+
+    Returns:
+        tuple: Arrays (i, j, distance_m, name_similarity, score) of the matching pairs; score orders the pairs from strongest to weakest.
+    """
+    n = len(records)
+    lat = np.array([np.nan if record.get("lat") is None else record["lat"] for record in records], dtype=np.float64)
+    lng = np.array([np.nan if record.get("lng") is None else record["lng"] for record in records], dtype=np.float64)
+    phones = np.array([normalize_phone(record.get("phone")) for record in records], dtype=object)
+    sources = np.array([record["source"] for record in records], dtype=object)
+
+    grid_i, grid_j = grid_pairs(lat, lng, max(max_distance, NEAR_DISTANCE_M))
+    phone_i, phone_j = phone_pairs(phones)
+    # Grid pairs are already unique; only phone pairs the grid also found need dropping
+    new_phone = ~np.isin(phone_i * n + phone_j, grid_i * n + grid_j)
+    i, j = np.concatenate([grid_i, phone_i[new_phone]]), np.concatenate([grid_j, phone_j[new_phone]])
+    if cross_source_only:
+        keep = sources[i] != sources[j]
+        i, j = i[keep], j[keep]
+
+    distance = haversine(lat[i], lng[i], lat[j], lng[j])
+    same_phone = (phones[i] == phones[j]) & (phones[i] != "")
+    missing = np.isnan(distance)
+    phone_match = same_phone & (missing | (distance <= PHONE_DISTANCE_M))
+    keep = phone_match | (distance <= max_distance)
+    i, j, distance, same_phone, phone_match = i[keep], j[keep], distance[keep], same_phone[keep], phone_match[keep]
+
+    # Names are only tokenized for records that made it into a candidate pair
+    involved = np.unique(np.concatenate([i, j]))
+    tokens = {index: normalize_name(records[index].get("name")) for index in involved.tolist()}
+    grams = {index: trigrams(name_tokens) for index, name_tokens in tokens.items()}
+    named = np.array([bool(grams[index]) for index in involved.tolist()], dtype=bool)
+    signatures = np.zeros((n, MINHASH_PERMUTATIONS), dtype=np.uint64)
+    signatures[involved[named]] = minhash_signatures([grams[index] for index in involved[named].tolist()])
+    has_name = np.zeros(n, dtype=bool)
+    has_name[involved[named]] = True
+
+    # The MinHash estimate screens every candidate at once; the exact similarity is only computed for the plausible ones
+    estimate = (signatures[i] == signatures[j]).mean(axis=1) * (has_name[i] & has_name[j])
+    similarity = np.zeros(len(i), dtype=np.float64)
+    plausible = (estimate >= name_threshold - MINHASH_MARGIN) | ((distance <= NEAR_DISTANCE_M) & (estimate >= NEAR_NAME_THRESHOLD - MINHASH_MARGIN))
+    for k in np.flatnonzero(plausible).tolist():
+        a, b = int(i[k]), int(j[k])
+        similarity[k] = name_similarity(tokens[a], tokens[b], grams[a], grams[b])
+
+    matched = (
+        ((distance <= max_distance) & (similarity >= name_threshold))
+        | ((distance <= NEAR_DISTANCE_M) & (similarity >= NEAR_NAME_THRESHOLD))
+        | phone_match
+    )
+    score = similarity + 0.5 * same_phone - 0.2 * np.minimum(np.nan_to_num(distance, nan=0.0) / max_distance, 1.0)
+    return i[matched], j[matched], distance[matched], similarity[matched], score[matched]
+
+
+def cluster_pairs(records: list, pairs_i: np.ndarray, pairs_j: np.ndarray, scores: np.ndarray, cross_source_only: bool = True):
+    """
+    Greedy union-find over the matched pairs, strongest first; returns a cluster label per record.
+    With cross_source_only an entity holds at most one record per source, so a chain of look-alike listings cannot collapse into one entity.
+    """
+    parent = list(range(len(records)))
+    cluster_sources = [{record["source"]} for record in records]
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for k in np.argsort(-scores, kind="stable").tolist():
+        root_a, root_b = find(int(pairs_i[k])), find(int(pairs_j[k]))
+        if root_a == root_b or (cross_source_only and cluster_sources[root_a] & cluster_sources[root_b]):
+            continue
+        root, child = min(root_a, root_b), max(root_a, root_b)
+        parent[child] = root
+        cluster_sources[root] |= cluster_sources[child]
+    return np.array([find(x) for x in range(len(records))])
+
+
+def typed_entities(df: pd.DataFrame):
+    """
+    Casts the entity columns to nullable dtypes so missing ratings and counts stay missing instead of becoming NaN floats.
+    """
+    return df.astype({
+        "entity_id": "int64", "lat": "float64", "lng": "float64", "google_rating": "Float32", "google_ratings": "Int32",
+        "yelp_rating": "Float32", "yelp_reviews": "Int32", "is_closed": "boolean", "match_distance_m": "Float32", "name_similarity": "Float32",
+    })
+
+
+def resolve_entities(records: list, max_distance: float = MATCH_DISTANCE_M, name_threshold: float = NAME_THRESHOLD, cross_source_only: bool = True):
+    """
+    Merges source records that describe the same business into one row per entity.
+
+    Args:
+        records (list): Source records from places_records() and yelp_records().
+        max_distance (float): The largest distance in meters at which two similarly named listings are merged.
+        name_threshold (float): The smallest name similarity (0-1) for listings within max_distance.
+        cross_source_only (bool): Whether to merge only listings from different sources.
+
+    Returns:
+        pd.DataFrame: One row per entity with the preferred name, address and coordinates, per-source ratings and ids,
+        `sources`/`source_ids` provenance, and the distance and name similarity of the weakest match that joined it.
+    """
+    records = [record for record in records if record.get("source_id")]
+    if not records:
+        return typed_entities(pd.DataFrame(columns=ENTITY_COLUMNS))
+    pairs_i, pairs_j, distances, similarities, scores = match_pairs(records, max_distance, name_threshold, cross_source_only)
+    labels = cluster_pairs(records, pairs_i, pairs_j, scores, cross_source_only)
+
+    weakest = {}
+    for a, b, distance, similarity in zip(pairs_i.tolist(), pairs_j.tolist(), distances.tolist(), similarities.tolist()):
+        label = labels[a]
+        if label != labels[b]:
+            continue
+        current = weakest.get(label)
+        if current is None or similarity < current[1]:
+            weakest[label] = (distance, similarity)
+
+    members = {}
+    for index, label in enumerate(labels.tolist()):
+        members.setdefault(label, []).append(records[index])
+
+    rows = []
+    for entity_id, (label, group) in enumerate(members.items()):
+        group = sorted(group, key=lambda record: SOURCE_PRIORITY.index(record["source"]) if record["source"] in SOURCE_PRIORITY else len(SOURCE_PRIORITY))
+        by_source = {}
+        for record in group:
+            by_source.setdefault(record["source"], record)
+        google, yelp = by_source.get("google_places", {}), by_source.get("yelp", {})
+        located = [record for record in group if pd.notna(record.get("lat")) and pd.notna(record.get("lng"))]
+        distance, similarity = weakest.get(label, (None, None))
+        rows.append({
+            "entity_id": entity_id,
+            "name": group[0].get("name"),
+            "address": next((record["address"] for record in group if record.get("address")), None),
+            "phone": next((record["phone"] for record in group if record.get("phone")), None),
+            "lat": sum(record["lat"] for record in located) / len(located) if located else None,
+            "lng": sum(record["lng"] for record in located) / len(located) if located else None,
+            "sources": sorted({record["source"] for record in group}),
+            "source_ids": [f"{record['source']}:{record['source_id']}" for record in group],
+            "place_id": google.get("source_id"),
+            "yelp_id": yelp.get("source_id"),
+            "google_rating": google.get("rating"),
+            "google_ratings": google.get("reviews"),
+            "yelp_rating": yelp.get("rating"),
+            "yelp_reviews": yelp.get("reviews"),
+            "business_status": google.get("business_status"),
+            "is_closed": yelp.get("is_closed"),
+            "types": google.get("types"),
+            "categories": yelp.get("categories"),
+            "url": yelp.get("url"),
+            "match_distance_m": None if distance is None or np.isnan(distance) else round(distance, 1),
+            "name_similarity": None if similarity is None else round(similarity, 3),
+        })
+    return typed_entities(pd.DataFrame(rows, columns=ENTITY_COLUMNS))
+
+
+def resolve_responses(responses: dict, **options):
+    """
+    Runs resolve_entities over the google_places_search and yelp_search entries of an execute_all_tasks result, skipping sources that timed out or failed.
+    """
+    records = []
+    places = responses.get("google_places_search")
+    if isinstance(places, dict) and "results" in places:
+        records += places_records(places)
+    yelp = responses.get("yelp_search")
+    if isinstance(yelp, (list, pd.DataFrame)):
+        records += yelp_records(yelp)
+    return resolve_entities(records, **options)
@@ -0,0 +1,255 @@
+import asyncio
+import atexit
+import functools
+import math
+import multiprocessing
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+##### SET VARIABLES
+ENCODING_NAME = "o200k_base"
+CHUNK_TOKENS = 200
+CHUNK_OVERLAP = 30
+PASSAGE_TOKEN_BUDGET = 3000
+MAX_PASSAGES_PER_URL = 3
+MAX_PAGE_CHARS = 2_000_000
+EXTRACT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+DROP_TAGS = ["script", "style", "noscript", "svg", "iframe", "form", "nav", "header", "footer", "aside", "button"]
+HTML_MARKER = re.compile(r"<\s*(html|head|body|div|p|span|a|table|ul|br|h[1-6])\b", re.IGNORECASE)
+TERM_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is", "it", "its", "of", "on", "or", "that", "the",
+    "this", "to", "was", "were", "will", "with", "what", "who", "how", "does", "do", "about",
+}
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+###### FUNCTIONS
+@functools.lru_cache(maxsize=1)
+def get_encoding():
+    import tiktoken
+    return tiktoken.get_encoding(ENCODING_NAME)
+
+
+def html_to_text(content: str):
+    """
+    Converts an HTML page to readable markdown-ish text; content that is already text (as Tavily's raw_content usually is) only has its whitespace normalized.
+    Scripts, styles, navigation, headers, footers and forms are removed with BeautifulSoup before html2text renders the rest.
+    """
+    content = (content or "")[:MAX_PAGE_CHARS]
+    if HTML_MARKER.search(content):
+        import html2text
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(content, "html.parser")
+        for tag in soup(DROP_TAGS):
+            tag.decompose()
+        converter = html2text.HTML2Text()
+        converter.ignore_links = True
+        converter.ignore_images = True
+        converter.ignore_emphasis = True
+        converter.body_width = 0
+        content = converter.handle(str(soup))
+    lines = (re.sub(r"[ \t ]+", " ", line).strip() for line in content.splitlines())
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP):
+    """
+    Splits text into chunks of at most max_tokens tokens along paragraph boundaries. Paragraphs longer than a chunk are cut
+    into token windows that overlap by `overlap` tokens, so a sentence on a boundary is kept whole in one of them.
+    """
+    encoding = get_encoding()
+    chunks = []
+    current, current_tokens = [], 0
+    for paragraph in text.split("\n\n"):
+        tokens = encoding.encode(paragraph, disallowed_special=())
+        if not tokens:
+            continue
+        if len(tokens) > max_tokens:
+            if current:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            step = max(1, max_tokens - overlap)
+            for start in range(0, len(tokens), step):
+                chunks.append(encoding.decode(tokens[start:start + max_tokens]))
+                if start + max_tokens >= len(tokens):
+                    break
+            continue
+        if current_tokens + len(tokens) > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += len(tokens)
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def extract_page(url: str, content: str, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP):
+    """
+    Worker entry point: one page's HTML or text in, its text chunks out. Runs in the extraction processes, so it only uses this module.
+    """
+    return [{"url": url, "text": chunk} for chunk in chunk_text(html_to_text(content), max_tokens, overlap)]
+
+
+def terms(text: str):
+    return [term for term in TERM_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+def select_passages(query: str, chunks: list, token_budget: int = PASSAGE_TOKEN_BUDGET, max_per_url: int = MAX_PASSAGES_PER_URL):
+    """
+    Ranks chunks against the query with BM25 and keeps the best ones that fit token_budget, at most max_per_url per page.
+    Chunks sharing no term with the query are never selected.
+
+    Returns:
+        list: {"url", "text", "score"} passages, best first.
+    """
+    if not chunks:
+        return []
+    scores = BM25([chunk["text"] for chunk in chunks]).scores(query)
+    encoding = get_encoding()
+    passages = []
+    per_url = Counter()
+    remaining = token_budget
+    for index in sorted(range(len(chunks)), key=lambda index: scores[index], reverse=True):
+        chunk = chunks[index]
+        if scores[index] <= 0 or remaining <= 0:
+            break
+        if per_url[chunk["url"]] >= max_per_url:
+            continue
+        tokens = len(encoding.encode(chunk["text"], disallowed_special=()))
+        if tokens > remaining:
+            continue
+        passages.append({"url": chunk["url"], "text": chunk["text"], "score": round(scores[index], 3)})
+        per_url[chunk["url"]] += 1
+        remaining -= tokens
+    return passages
+
+
+def research_passages(query: str, response: dict, token_budget: int = PASSAGE_TOKEN_BUDGET):
+    """
+    Replaces the raw_content of a Tavily response with the passages most relevant to the query.
+    The answer and each result's title, url and content are kept; the raw pages are extracted and chunked on the extraction pool.
+
+    Returns:
+        dict: The response without raw_content and with a top-level "passages" list.
+    """
+    pages = [(result["url"], result["raw_content"]) for result in response.get("results", []) if result.get("url") and result.get("raw_content")]
+    chunks = [chunk for page_chunks in extractionPool.iter_chunks(pages) for chunk in page_chunks]
+    results = [{key: value for key, value in result.items() if key != "raw_content"} for result in response.get("results", [])]
+    return {**response, "results": results, "passages": select_passages(query, chunks, token_budget)}
+
+
+async def research_passages_async(query: str, response: dict, token_budget: int = PASSAGE_TOKEN_BUDGET):
+    """
+    research_passages for the event loop: pages are awaited on the extraction pool without holding a thread per page.
+    """
+    pages = [(result["url"], result["raw_content"]) for result in response.get("results", []) if result.get("url") and result.get("raw_content")]
+    chunks = [chunk for page_chunks in await asyncio.gather(*(extractionPool.extract_async(url, content) for url, content in pages)) for chunk in page_chunks]
+    results = [{key: value for key, value in result.items() if key != "raw_content"} for result in response.get("results", [])]
+    return {**response, "results": results, "passages": select_passages(query, chunks, token_budget)}
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. BM25
+class BM25:
+    """
+    Okapi BM25 over a small in-memory corpus, rebuilt per query batch; enough to rank a few hundred chunks in milliseconds.
+    """
+    def __init__(self, documents: list, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.frequencies = [Counter(terms(document)) for document in documents]
+        self.lengths = [sum(frequency.values()) for frequency in self.frequencies]
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        document_frequency = Counter(term for frequency in self.frequencies for term in frequency)
+        count = len(documents)
+        self.idf = {term: math.log(1 + (count - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+    def scores(self, query: str):
+        query_terms = set(terms(query))
+        scores = []
+        for frequency, length in zip(self.frequencies, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.average_length) if self.average_length else self.k1
+            scores.append(sum(self.idf[term] * frequency[term] * (self.k1 + 1) / (frequency[term] + norm) for term in query_terms if term in frequency))
+        return scores
+
+
+#__________________________________________________________________________________________
+# 2. Extraction Pool
+class ExtractionPool:
+    """
+    Process pool for HTML parsing and tokenization, so BeautifulSoup and html2text never hold the GIL of the Streamlit server.
+    Workers are spawned (not forked from the threaded server) on first use and reused. If the pool breaks, extraction falls back to the calling thread.
+    """
+    def __init__(self, max_workers: int = EXTRACT_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+                    atexit.register(self.shutdown)
+        return self._executor
+
+    def submit(self, url: str, content: str):
+        return self.executor.submit(extract_page, url, content)
+
+    def extract(self, url: str, content: str):
+        try:
+            return self.submit(url, content).result()
+        except BrokenProcessPool:
+            self.reset()
+            return extract_page(url, content)
+
+    async def extract_async(self, url: str, content: str):
+        """
+        Awaitable extract for the background event loop; the page is handed to the pool as soon as it is fetched.
+        """
+        try:
+            return await asyncio.wrap_future(self.submit(url, content))
+        except BrokenProcessPool:
+            self.reset()
+            return await asyncio.get_running_loop().run_in_executor(None, extract_page, url, content)
+
+    def iter_chunks(self, pages: list):
+        """
+        Yields each page's chunks as soon as that page is done, in completion order.
+        """
+        done = set()
+        try:
+            futures = {self.submit(url, content): index for index, (url, content) in enumerate(pages)}
+            for future in as_completed(futures):
+                chunks = future.result()
+                done.add(futures[future])
+                yield chunks
+        except BrokenProcessPool:
+            self.reset()
+            for index, (url, content) in enumerate(pages):
+                if index not in done:
+                    yield extract_page(url, content)
+
+    def reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+##### SET POOL
+extractionPool = ExtractionPool()
@@ -0,0 +1,258 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+##### SET VARIABLES
+# Log-spaced latency bucket upper bounds from 1 ms to ~2 min
+BUCKET_BOUNDS = [0.001 * 1.5 ** i for i in range(30)]
+WINDOW_SECONDS = 300
+SLICE_SECONDS = 10
+RECENT_SPANS = 500
+METRIC_PREFIX = "fgs"
+# Size slot of the innermost timed call; see add_payload_bytes
+payloadSlot = contextvars.ContextVar("payload_slot", default=None)
+
+
+###### FUNCTIONS
+def payload_bytes(result):
+    """
+    Size of a result when it is free to know: string/bytes length or shallow DataFrame memory, otherwise 0.
+    Dicts and lists are not re-serialized to measure them; their size comes from add_payload_bytes instead.
+    """
+    if isinstance(result, (str, bytes)):
+        return len(result)
+    memory_usage = getattr(result, "memory_usage", None)
+    if callable(memory_usage):
+        return int(memory_usage(deep=False).sum())
+    return 0
+
+
+def add_payload_bytes(size: int):
+    """
+    Credits size bytes to the enclosing timed call. Called by layers that already hold a serialized form of the result (the tool cache's JSON,
+    an OpenAI response's text), and by each timed call for the one it ran under, so an aggregate such as execute_all_tasks reports its sources' total.
+    """
+    slot = payloadSlot.get()
+    if slot is not None:
+        slot[0] += size
+
+
+def escape_label(value: str):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Rolling Histogram
+class RollingHistogram:
+    """
+    Latency histogram over fixed log-spaced buckets, kept both cumulatively (for Prometheus) and as a ring of time slices
+    covering the last WINDOW_SECONDS (for live percentiles). Recording is one bisect and a few integer increments under a lock.
+    """
+    def __init__(self, window_seconds: int = WINDOW_SECONDS, slice_seconds: int = SLICE_SECONDS):
+        self.slice_seconds = slice_seconds
+        self.slice_count = max(1, window_seconds // slice_seconds)
+        self.slices = [[0] * (len(BUCKET_BOUNDS) + 1) for _ in range(self.slice_count)]
+        self.slice_errors = [0] * self.slice_count
+        self.slice_ids = [-1] * self.slice_count
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.outcomes = {}
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, outcome: str = "ok", size: int = 0, now: float = None):
+        bucket = bisect.bisect_left(BUCKET_BOUNDS, latency)
+        slice_id = int((time.time() if now is None else now) // self.slice_seconds)
+        index = slice_id % self.slice_count
+        with self._lock:
+            if self.slice_ids[index] != slice_id:
+                self.slices[index] = [0] * (len(BUCKET_BOUNDS) + 1)
+                self.slice_errors[index] = 0
+                self.slice_ids[index] = slice_id
+            self.slices[index][bucket] += 1
+            if outcome == "error":
+                self.slice_errors[index] += 1
+            self.buckets[bucket] += 1
+            self.count += 1
+            self.sum += latency
+            self.bytes += size
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def window(self, now: float = None):
+        """
+        Returns (bucket_counts, errors) merged over the slices still inside the rolling window.
+        """
+        current = int((time.time() if now is None else now) // self.slice_seconds)
+        merged = [0] * (len(BUCKET_BOUNDS) + 1)
+        errors = 0
+        with self._lock:
+            for index, slice_id in enumerate(self.slice_ids):
+                if current - slice_id < self.slice_count:
+                    merged = [a + b for a, b in zip(merged, self.slices[index])]
+                    errors += self.slice_errors[index]
+        return merged, errors
+
+    @staticmethod
+    def percentile(buckets: list, q: float):
+        """
+        Estimates a quantile from bucket counts by linear interpolation inside the bucket that holds it.
+        """
+        total = sum(buckets)
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(buckets):
+            if seen + count >= rank and count:
+                lower = BUCKET_BOUNDS[index - 1] if index > 0 else 0.0
+                upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else BUCKET_BOUNDS[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return BUCKET_BOUNDS[-1]
+
+    def summary(self, now: float = None):
+        buckets, errors = self.window(now)
+        calls = sum(buckets)
+        return {
+            "calls": calls,
+            "p50": self.percentile(buckets, 0.50),
+            "p95": self.percentile(buckets, 0.95),
+            "p99": self.percentile(buckets, 0.99),
+            "error_rate": errors / calls if calls else 0.0,
+            "total_calls": self.count,
+            "total_bytes": self.bytes,
+        }
+
+
+#__________________________________________________________________________________________
+# 2. Metrics Registry
+class MetricsRegistry:
+    """
+    Per-(kind, name) rolling histograms plus a ring buffer of the most recent spans.
+    Kinds are "tool" for Tools calls, "async_tool" for AsyncTools calls, "openai" for OpenAI requests, "cache" for cache lookups and "db" for chat history writes.
+    """
+    def __init__(self):
+        self.histograms = {}
+        self.spans = deque(maxlen=RECENT_SPANS)
+        self._lock = threading.Lock()
+
+    def histogram(self, kind: str, name: str):
+        key = (kind, name)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, RollingHistogram())
+        return histogram
+
+    def record(self, kind: str, name: str, latency: float, outcome: str = "ok", size: int = 0):
+        self.histogram(kind, name).record(latency, outcome, size)
+        self.spans.append({"kind": kind, "name": name, "latency": latency, "bytes": size, "outcome": outcome, "at": time.time()})
+
+    @contextmanager
+    def span(self, kind: str, name: str):
+        """
+        Times the enclosed block; an exception is recorded as an error outcome and re-raised.
+        """
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            self.record(kind, name, time.perf_counter() - start, outcome)
+
+    def timed(self, name: str, kind: str = "tool"):
+        """
+        Decorator that records latency, payload bytes and outcome of each call to a sync or async function.
+        The payload size is payload_bytes(result), or what the layers under it credited through add_payload_bytes when that is 0.
+        """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    slot = [0]
+                    token = payloadSlot.set(slot)
+                    try:
+                        result = await func(*args, **kwargs)
+                    except asyncio.CancelledError:
+                        self.record(kind, name, time.perf_counter() - start, "cancelled")
+                        raise
+                    except BaseException:
+                        self.record(kind, name, time.perf_counter() - start, "error")
+                        raise
+                    finally:
+                        payloadSlot.reset(token)
+                    size = payload_bytes(result) or slot[0]
+                    add_payload_bytes(size)
+                    self.record(kind, name, time.perf_counter() - start, "ok", size)
+                    return result
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                slot = [0]
+                token = payloadSlot.set(slot)
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException:
+                    self.record(kind, name, time.perf_counter() - start, "error")
+                    raise
+                finally:
+                    payloadSlot.reset(token)
+                size = payload_bytes(result) or slot[0]
+                add_payload_bytes(size)
+                self.record(kind, name, time.perf_counter() - start, "ok", size)
+                return result
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """
+        Returns one row per (kind, name) with windowed p50/p95/p99 (seconds), error rate and lifetime totals.
+        """
+        with self._lock:
+            items = list(self.histograms.items())
+        return [{"kind": kind, "name": name, **histogram.summary()} for (kind, name), histogram in sorted(items)]
+
+    def prometheus(self):
+        """
+        Renders the lifetime histograms and counters in the Prometheus text exposition format.
+        """
+        with self._lock:
+            items = sorted(self.histograms.items())
+        latency = f"{METRIC_PREFIX}_call_latency_seconds"
+        calls = f"{METRIC_PREFIX}_calls_total"
+        payload = f"{METRIC_PREFIX}_payload_bytes_total"
+        lines = [f"# HELP {latency} Latency of tool, OpenAI and cache calls.", f"# TYPE {latency} histogram"]
+        call_lines = [f"# HELP {calls} Calls by outcome.", f"# TYPE {calls} counter"]
+        payload_lines = [f"# HELP {payload} Bytes returned by calls: string length, DataFrame memory, or the serialized size of a cached or aggregated result.", f"# TYPE {payload} counter"]
+        for (kind, name), histogram in items:
+            labels = f'kind="{escape_label(kind)}",name="{escape_label(name)}"'
+            with histogram._lock:
+                buckets = list(histogram.buckets)
+                total, count, size, outcomes = histogram.sum, histogram.count, histogram.bytes, dict(histogram.outcomes)
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKET_BOUNDS, buckets):
+                cumulative += bucket_count
+                lines.append(f'{latency}_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{latency}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{latency}_sum{{{labels}}} {total}")
+            lines.append(f"{latency}_count{{{labels}}} {count}")
+            for outcome, outcome_count in sorted(outcomes.items()):
+                call_lines.append(f'{calls}{{{labels},outcome="{escape_label(outcome)}"}} {outcome_count}')
+            payload_lines.append(f"{payload}{{{labels}}} {size}")
+        return "\n".join(lines + call_lines + payload_lines) + "\n"
+
+
+##### SET REGISTRY
+metricsRegistry = MetricsRegistry()
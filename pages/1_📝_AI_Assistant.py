@@ -1 +1,118 @@
+import uuid
 import streamlit as st
+import pandas as pd
+from testasst import start_thread
+from serialize import search_result_field
+from assistant import RunDriver, SpeculativeSuggestions
+from persistence import ConversationLog
+from result_store import resultStore
+
+##### SET DRIVER
+@st.cache_resource
+def get_run_driver():
+    return RunDriver()
+
+##### SET SESSION STATE
+if "threadid" not in st.session_state:
+    st.session_state.threadid = None
+if "messages" not in st.session_state:
+    st.session_state.messages = []
+if "suggestions" not in st.session_state:
+    st.session_state.suggestions = {}
+if "pending_prompt" not in st.session_state:
+    st.session_state.pending_prompt = None
+if "conversation" not in st.session_state:
+    st.session_state.conversation = None
+if "result_session" not in st.session_state:
+    # Full source results live in the shared result store under this key; messages only keep their ids
+    st.session_state.result_session = uuid.uuid4().hex
+
+SOURCE_LABELS = {
+    "internet_search": "Web search",
+    "internet_research": "Web research",
+    "google_places_search": "Google Places",
+    "yelp_search": "Yelp"
+}
+
+###### FUNCTIONS
+def source_frame(source: str, response):
+    """
+    A small table of the listings a search source returned, for the progress panel.
+    """
+    if source == "internet_search":
+        return pd.DataFrame([{"url": result if isinstance(result, str) else search_result_field(result, "url"), "title": None if isinstance(result, str) else search_result_field(result, "title")} for result in response])
+    if source == "internet_research":
+        return pd.DataFrame([{"title": result.get("title"), "url": result.get("url")} for result in response.get("results", [])])
+    if source == "google_places_search":
+        return pd.DataFrame([{"name": result.get("name"), "address": result.get("formatted_address"), "rating": result.get("rating")} for result in response.get("results", [])])
+    return pd.DataFrame([{"name": business.get("name"), "rating": business.get("rating"), "reviews": business.get("review_count")} for business in response])
+
+
+def render_source_result(container, source: str, response):
+    """
+    Shows one search source as soon as it finishes, while the others are still running.
+    """
+    label = SOURCE_LABELS.get(source, source)
+    if isinstance(response, dict) and response.get("status") in ("timed_out", "failed"):
+        container.caption(f"{label}: {response['status'].replace('_', ' ')}")
+        return
+    with container.expander(f"{label} ✓"):
+        if source == "internet_research" and response.get("answer"):
+            st.markdown(response["answer"])
+        st.dataframe(source_frame(source, response), hide_index=True, use_container_width=True)
+
+##### PAGE
+st.title("AI Assistant")
+
+for index, message in enumerate(st.session_state.messages):
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+        # Results of earlier turns may have been spilled to disk; they are only reloaded when the user opens them
+        if message.get("results") and st.toggle("Show sources", key=f"sources_{index}"):
+            for source, result_id in message["results"]:
+                result = resultStore.get(st.session_state.result_session, result_id)
+                if result is None:
+                    st.caption(f"{SOURCE_LABELS.get(source, source)}: no longer available")
+                else:
+                    render_source_result(st.container(), source, result)
+
+prompt = st.chat_input("Ask about a business or zipcode") or st.session_state.pending_prompt
+st.session_state.pending_prompt = None
+
+if prompt:
+    # The assistant thread is only created once the conversation actually starts
+    if st.session_state.threadid is None:
+        st.session_state.threadid = start_thread()
+        st.session_state.conversation = ConversationLog(st.session_state.threadid)
+    conversation = st.session_state.conversation
+    # Writes go through the write-behind queue, so persisting a turn never waits on the database
+    conversation.add_message("user", prompt)
+    reply_seq = conversation.reserve_seq()
+    st.session_state.messages.append({"role": "user", "content": prompt})
+    st.session_state.suggestions = {}
+    with st.chat_message("user"):
+        st.markdown(prompt)
+
+    suggestions = SpeculativeSuggestions(prompt)
+    try:
+        with st.chat_message("assistant"):
+            # Search sources appear here one by one as they finish; leaving the page stops the script and cancels the ones still running
+            sources_container = st.container()
+            source_results = []
+
+            def on_source_result(source, result):
+                source_results.append((source, resultStore.put(st.session_state.result_session, result)))
+                render_source_result(sources_container, source, result)
+
+            response = st.write_stream(suggestions.wrap(get_run_driver().stream_reply(st.session_state.threadid, prompt, conversation.tool_output_recorder(reply_seq), on_source_result)))
+        st.session_state.messages.append({"role": "assistant", "content": response, "results": source_results})
+        conversation.add_message("assistant", response if isinstance(response, str) else "".join(map(str, response)), reply_seq)
+        st.session_state.suggestions = suggestions.result() or {}
+    finally:
+        # Streamlit stops the script when the user navigates away or reruns; drop the suggestion request with it
+        suggestions.cancel()
+
+for key, suggested_prompt in st.session_state.suggestions.items():
+    if st.button(suggested_prompt, key=f"suggestion_{key}"):
+        st.session_state.pending_prompt = suggested_prompt
+        st.rerun()
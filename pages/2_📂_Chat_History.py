@@ -0,0 +1,118 @@
+import streamlit as st
+from persistence import chatWriter
+from search_index import searchIndex, INDEXED_TOOLS
+
+CONVERSATION_PAGE_SIZE = 20
+MESSAGE_PAGE_SIZE = 50
+SEARCH_RESULTS = 10
+FLUSH_TIMEOUT = 2.0
+
+##### SET SESSION STATE
+def reset_history():
+    st.session_state.history_conversations = []
+    st.session_state.history_cursor = None
+    st.session_state.history_exhausted = False
+    st.session_state.history_selected = None
+    st.session_state.history_messages = {}
+
+if "history_conversations" not in st.session_state:
+    reset_history()
+
+
+###### FUNCTIONS
+def load_conversations():
+    """
+    Fetches the next page of conversations after the last (updated_at, id) seen.
+    """
+    rows = chatWriter.store.list_conversations(CONVERSATION_PAGE_SIZE, st.session_state.history_cursor)
+    st.session_state.history_conversations.extend(rows)
+    if rows:
+        st.session_state.history_cursor = (rows[-1]["updated_at"], rows[-1]["id"])
+    st.session_state.history_exhausted = len(rows) < CONVERSATION_PAGE_SIZE
+
+
+def load_messages(conversation_id: str):
+    """
+    Fetches the next page of messages of one conversation after the last seq seen.
+    """
+    state = st.session_state.history_messages.setdefault(conversation_id, {"rows": [], "after_seq": -1, "exhausted": False})
+    rows = chatWriter.store.list_messages(conversation_id, MESSAGE_PAGE_SIZE, state["after_seq"])
+    state["rows"].extend(rows)
+    if rows:
+        state["after_seq"] = rows[-1]["seq"]
+    state["exhausted"] = len(rows) < MESSAGE_PAGE_SIZE
+    return state
+
+
+##### PAGE
+st.title("Chat History")
+
+refresh_column, reindex_column = st.columns(2)
+if refresh_column.button("Refresh"):
+    reset_history()
+if reindex_column.button("Rebuild search index"):
+    searchIndex.executor.submit(searchIndex.backfill, chatWriter.store)
+    st.toast("Indexing stored conversations in the background.")
+
+if not st.session_state.history_conversations and not st.session_state.history_exhausted:
+    # Make this session's most recent turns visible before the first read
+    try:
+        chatWriter.flush(FLUSH_TIMEOUT)
+    except Exception:
+        pass
+    try:
+        load_conversations()
+    except Exception as e:
+        st.error(f"Could not load chat history: {type(e).__name__}: {e}")
+        st.stop()
+
+search_query = st.text_input("Search past conversations and research", placeholder="Business name, address or topic")
+if search_query:
+    kinds = st.multiselect("Sources", ("message",) + INDEXED_TOOLS, default=("message",) + INDEXED_TOOLS)
+    for index, result in enumerate(searchIndex.search(search_query, k=SEARCH_RESULTS, kinds=tuple(kinds))):
+        with st.container(border=True):
+            st.markdown(f"**{result['title']}** · {result['kind']}")
+            st.markdown(result["snippet"])
+            if result["kind"] == "message":
+                if st.button("Open conversation", key=f"search_result_{index}"):
+                    st.session_state.history_selected = result["ref"]
+            elif result["ref"]:
+                st.caption(result["ref"])
+
+conversations = st.session_state.history_conversations
+if not conversations:
+    st.info("No conversations yet.")
+    st.stop()
+
+list_column, messages_column = st.columns([1, 2])
+
+with list_column:
+    for conversation in conversations:
+        label = conversation["title"] or "Untitled conversation"
+        if st.button(label, key=f"conversation_{conversation['id']}", help=conversation["updated_at"], use_container_width=True):
+            st.session_state.history_selected = conversation["id"]
+    if not st.session_state.history_exhausted and st.button("Load older conversations"):
+        load_conversations()
+        st.rerun()
+
+with messages_column:
+    conversation_id = st.session_state.history_selected
+    if conversation_id is None:
+        st.caption("Select a conversation to load its messages.")
+    else:
+        # Messages are only fetched for the selected conversation, one page at a time
+        state = st.session_state.history_messages.get(conversation_id) or load_messages(conversation_id)
+        tool_outputs = {}
+        if state["rows"] and st.toggle("Show tool outputs", key=f"tool_outputs_{conversation_id}"):
+            for row in chatWriter.store.list_tool_outputs(conversation_id, state["rows"][0]["seq"], state["rows"][-1]["seq"]):
+                tool_outputs.setdefault(row["message_seq"], []).append(row)
+        for message in state["rows"]:
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+                for row in tool_outputs.get(message["seq"], []):
+                    with st.expander(f"{row['name']} ({row['tool_call_id']})"):
+                        st.code(row["arguments"] or "", language="json")
+                        st.text(row["output"] or "")
+        if not state["exhausted"] and st.button("Load more messages"):
+            load_messages(conversation_id)
+            st.rerun()
@@ -0,0 +1,79 @@
+import pandas as pd
+import streamlit as st
+from metrics import metricsRegistry, WINDOW_SECONDS
+from cache import toolCache
+from coalesce import singleFlight
+from semantic_cache import semanticCache
+from resilience import resiliencePolicies
+from serialize import serializationStats
+from persistence import chatWriter
+from result_store import resultStore
+
+REFRESH_SECONDS = 5
+
+##### PAGE
+st.title("Settings")
+st.caption(f"Live metrics for this server process over the last {WINDOW_SECONDS // 60} minutes, refreshed every {REFRESH_SECONDS}s.")
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def live_metrics():
+    rows = [row for row in metricsRegistry.summary() if row["total_calls"]]
+    st.subheader("Latency by call")
+    if rows:
+        df = pd.DataFrame(rows)
+        for column in ("p50", "p95", "p99"):
+            df[column] = df[column] * 1000
+        df = df.rename(columns={"p50": "p50 (ms)", "p95": "p95 (ms)", "p99": "p99 (ms)", "calls": "calls (window)"})
+        st.dataframe(df, hide_index=True, use_container_width=True, column_config={
+            "p50 (ms)": st.column_config.NumberColumn(format="%.1f"),
+            "p95 (ms)": st.column_config.NumberColumn(format="%.1f"),
+            "p99 (ms)": st.column_config.NumberColumn(format="%.1f"),
+            "error_rate": st.column_config.NumberColumn("error rate", format="%.2f"),
+        })
+    else:
+        st.info("No calls recorded yet.")
+
+    cache_stats = toolCache.stats()
+    column1, column2, column3 = st.columns(3)
+    column1.metric("Cache hit rate", f"{cache_stats['hit_rate']:.0%}")
+    column2.metric("Cache entries", cache_stats["entries"])
+    column3.metric("Serialized token reduction", f"{serializationStats.summary()['token_reduction']:.0%}", help=f"Measured on a {serializationStats.sample_rate:.0%} sample of searches.")
+
+    flight_stats = singleFlight.stats()
+    column1, column2, column3 = st.columns(3)
+    column1.metric("Upstream tool calls", flight_stats["calls"])
+    column2.metric("Coalesced tool calls", flight_stats["coalesced"])
+    column3.metric("Coalesced rate", f"{flight_stats['coalesced_rate']:.0%}")
+
+    semantic_stats = semanticCache.stats()
+    column1, column2, column3 = st.columns(3)
+    column1.metric("Semantic cache hit rate", f"{semantic_stats['hit_rate']:.0%}", help="Share of new phrasings answered with the cached result of a similar query.")
+    column2.metric("Semantic cache hits", f"{semantic_stats['hits']} / {semantic_stats['lookups']}")
+    column3.metric("Semantic cache queries", semantic_stats["queries"])
+
+    writer_stats = chatWriter.stats()
+    column1, column2, column3 = st.columns(3)
+    column1.metric("History rows written", writer_stats["written"])
+    column2.metric("History rows pending", writer_stats["pending"])
+    column3.metric("History rows failed", writer_stats["failed"] + writer_stats["dropped"])
+    if writer_stats["last_error"]:
+        st.caption(f"Last history write error: {writer_stats['last_error']}")
+
+    store_stats = resultStore.stats()
+    st.subheader("Session results")
+    column1, column2, column3 = st.columns(3)
+    column1.metric("In memory", f"{store_stats['memory_bytes'] / 2**20:.1f} MB", help=f"Budget {store_stats['memory_budget'] / 2**20:.0f} MB")
+    column2.metric("Spilled to disk", f"{store_stats['disk_bytes'] / 2**20:.1f} MB")
+    column3.metric("Spills / reloads", f"{store_stats['spills']} / {store_stats['reloads']}")
+    if store_stats["sessions"]:
+        st.dataframe(pd.DataFrame(store_stats["sessions"]), hide_index=True, use_container_width=True)
+
+    st.subheader("Providers")
+    st.json(resiliencePolicies.stats(), expanded=False)
+
+    st.subheader("Recent spans")
+    st.dataframe(pd.DataFrame(list(metricsRegistry.spans)[-50:][::-1]), hide_index=True, use_container_width=True)
+
+    st.download_button("Export Prometheus metrics", metricsRegistry.prometheus(), file_name="metrics.prom", mime="text/plain")
+
+live_metrics()
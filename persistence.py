@@ -0,0 +1,385 @@
+import asyncio
+import atexit
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+import streamlit as st
+from clients import clientRegistry
+from background import backgroundLoop
+from resilience import resiliencePolicies
+from metrics import metricsRegistry
+
+##### SET VARIABLES
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 0.5
+MAX_PENDING = 10000
+SHUTDOWN_FLUSH_TIMEOUT = 5.0
+# Parents are written before children so a batch never references a conversation that is still queued
+TABLE_ORDER = ("conversations", "messages", "tool_outputs")
+TITLE_CHARS = 80
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    thread_id TEXT,
+    title TEXT,
+    created_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS conversations_updated_at_id ON conversations (updated_at DESC, id DESC);
+CREATE TABLE IF NOT EXISTS messages (
+    conversation_id TEXT NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (conversation_id, seq)
+);
+CREATE TABLE IF NOT EXISTS tool_outputs (
+    conversation_id TEXT NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,
+    message_seq INTEGER NOT NULL,
+    tool_call_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    arguments TEXT,
+    output TEXT,
+    created_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (conversation_id, tool_call_id)
+);
+CREATE INDEX IF NOT EXISTS tool_outputs_message_seq ON tool_outputs (conversation_id, message_seq);
+"""
+
+
+###### FUNCTIONS
+def utc_now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def row_key(table: str, row: dict):
+    """
+    Primary key of a row, used to collapse repeated writes of the same row within one batch.
+    """
+    if table == "conversations":
+        return row["id"]
+    if table == "messages":
+        return (row["conversation_id"], row["seq"])
+    return (row["conversation_id"], row["tool_call_id"])
+
+
+def build_chat_store():
+    """
+    Uses a local Postgres when secrets define postgres.dsn, otherwise the Supabase project.
+    """
+    postgres = st.secrets.get("postgres")
+    if postgres and postgres.get("dsn"):
+        return PostgresStore(postgres["dsn"])
+    return SupabaseStore(clientRegistry.get("supabase"))
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Supabase Store
+class SupabaseStore:
+    """
+    Chat history tables in Supabase. Conversations page newest-first on (updated_at, id) and messages page on seq,
+    so every read is an index range scan of one page instead of a full table pull.
+    """
+    def __init__(self, client):
+        self.client = client
+
+    def insert(self, table: str, rows: list):
+        if table == "conversations":
+            self.client.table(table).upsert(rows, on_conflict="id").execute()
+        else:
+            self.client.table(table).upsert(rows, ignore_duplicates=True).execute()
+
+    def list_conversations(self, limit: int, before: tuple = None):
+        query = self.client.table("conversations").select("id,thread_id,title,created_at,updated_at")
+        if before is not None:
+            updated_at, conversation_id = before
+            query = query.or_(f'updated_at.lt."{updated_at}",and(updated_at.eq."{updated_at}",id.lt."{conversation_id}")')
+        return query.order("updated_at", desc=True).order("id", desc=True).limit(limit).execute().data
+
+    def list_messages(self, conversation_id: str, limit: int, after_seq: int = -1):
+        query = self.client.table("messages").select("seq,role,content,created_at").eq("conversation_id", conversation_id).gt("seq", after_seq)
+        return query.order("seq").limit(limit).execute().data
+
+    def list_tool_outputs(self, conversation_id: str, first_seq: int, last_seq: int):
+        query = self.client.table("tool_outputs").select("message_seq,tool_call_id,name,arguments,output").eq("conversation_id", conversation_id)
+        return query.gte("message_seq", first_seq).lte("message_seq", last_seq).order("message_seq").execute().data
+
+
+#__________________________________________________________________________________________
+# 2. Postgres Store
+class PostgresStore:
+    """
+    The same tables on a plain Postgres server (e.g. a local container), for development and tests without a Supabase project.
+    Requires psycopg; create_schema() creates the tables and indexes.
+    """
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None:
+            import psycopg
+            from psycopg.rows import dict_row
+
+            self._conn = psycopg.connect(self.dsn, autocommit=True, row_factory=dict_row)
+        return self._conn
+
+    def create_schema(self):
+        with self._lock:
+            self._connection().execute(SCHEMA_SQL)
+
+    def _fetch(self, sql: str, params: tuple):
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+        return [{key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()} for row in rows]
+
+    def insert(self, table: str, rows: list):
+        columns = list(rows[0])
+        placeholders = ", ".join(["%s"] * len(columns))
+        if table == "conversations":
+            conflict = "ON CONFLICT (id) DO UPDATE SET " + ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column != "id")
+        else:
+            conflict = "ON CONFLICT DO NOTHING"
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) {conflict}"
+        with self._lock:
+            with self._connection().cursor() as cursor:
+                cursor.executemany(sql, [tuple(row[column] for column in columns) for row in rows])
+
+    def list_conversations(self, limit: int, before: tuple = None):
+        sql = "SELECT id, thread_id, title, created_at, updated_at FROM conversations"
+        params = ()
+        if before is not None:
+            sql += " WHERE (updated_at, id) < (%s::timestamptz, %s)"
+            params = tuple(before)
+        return self._fetch(sql + " ORDER BY updated_at DESC, id DESC LIMIT %s", params + (limit,))
+
+    def list_messages(self, conversation_id: str, limit: int, after_seq: int = -1):
+        sql = "SELECT seq, role, content, created_at FROM messages WHERE conversation_id = %s AND seq > %s ORDER BY seq LIMIT %s"
+        return self._fetch(sql, (conversation_id, after_seq, limit))
+
+    def list_tool_outputs(self, conversation_id: str, first_seq: int, last_seq: int):
+        sql = "SELECT message_seq, tool_call_id, name, arguments, output FROM tool_outputs WHERE conversation_id = %s AND message_seq BETWEEN %s AND %s ORDER BY message_seq"
+        return self._fetch(sql, (conversation_id, first_seq, last_seq))
+
+
+#__________________________________________________________________________________________
+# 3. Memory Store
+class MemoryStore:
+    """
+    In-process stand-in with the same interface and ordering, for tests and benchmarks. Every insert call is counted,
+    so a test can check how many round trips a burst of writes was batched into.
+    """
+    def __init__(self):
+        self.tables = {table: {} for table in TABLE_ORDER}
+        self.insert_calls = []
+        self._lock = threading.Lock()
+
+    def insert(self, table: str, rows: list):
+        with self._lock:
+            self.insert_calls.append((table, len(rows)))
+            for row in rows:
+                key = row_key(table, row)
+                if table == "conversations":
+                    self.tables[table][key] = {**self.tables[table].get(key, {}), **row}
+                else:
+                    self.tables[table].setdefault(key, dict(row))
+
+    def list_conversations(self, limit: int, before: tuple = None):
+        with self._lock:
+            rows = sorted(self.tables["conversations"].values(), key=lambda row: (row["updated_at"], row["id"]), reverse=True)
+        if before is not None:
+            rows = [row for row in rows if (row["updated_at"], row["id"]) < tuple(before)]
+        return [dict(row) for row in rows[:limit]]
+
+    def list_messages(self, conversation_id: str, limit: int, after_seq: int = -1):
+        with self._lock:
+            rows = [row for (cid, seq), row in self.tables["messages"].items() if cid == conversation_id and seq > after_seq]
+        return [dict(row) for row in sorted(rows, key=lambda row: row["seq"])[:limit]]
+
+    def list_tool_outputs(self, conversation_id: str, first_seq: int, last_seq: int):
+        with self._lock:
+            rows = [row for row in self.tables["tool_outputs"].values() if row["conversation_id"] == conversation_id and first_seq <= row["message_seq"] <= last_seq]
+        return [dict(row) for row in sorted(rows, key=lambda row: row["message_seq"])]
+
+
+#__________________________________________________________________________________________
+# 4. Write-Behind Queue
+class WriteBehindQueue:
+    """
+    Non-blocking writes to the chat store. put() appends to an in-memory queue and returns immediately;
+    a task on the background loop drains it every flush_interval (or as soon as batch_size rows are waiting),
+    groups the rows by table and writes each group with one bulk insert per batch_size rows, off the event loop.
+
+    Failed batches are retried under resiliencePolicies and then dropped and counted. When more than max_pending rows
+    are waiting (e.g. the database is down), the oldest are dropped so memory stays bounded.
+    """
+    def __init__(self, store=None, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL, max_pending: int = MAX_PENDING):
+        self._store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.counts = {"queued": 0, "written": 0, "batches": 0, "failed": 0, "dropped": 0}
+        self.last_error = None
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._task = None
+        self._wakeup = None
+        self._flush_lock = None
+
+    @property
+    def store(self):
+        return clientRegistry.get("chat_store") if self._store is None else self._store
+
+    def _start(self):
+        if self._task is None:
+            with self._lock:
+                if self._task is None:
+                    self._task = backgroundLoop.submit(self._run())
+                    atexit.register(self.flush, SHUTDOWN_FLUSH_TIMEOUT)
+
+    def subscribe(self, listener):
+        """
+        Registers listener(table, rows), called on the background loop after each batch is written. Listeners must not block.
+        """
+        self.listeners.append(listener)
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def put(self, table: str, row: dict):
+        with self._lock:
+            if len(self.pending) >= self.max_pending:
+                self.pending.popleft()
+                self.counts["dropped"] += 1
+            self.pending.append((table, row))
+            self.counts["queued"] += 1
+            full = len(self.pending) >= self.batch_size
+        self._start()
+        if full:
+            backgroundLoop.loop.call_soon_threadsafe(self._wake)
+
+    async def _run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            # A batch that filled up before this task created the event woke nobody, so check before waiting
+            with self._lock:
+                full = len(self.pending) >= self.batch_size
+            if not full:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            await self.flush_async()
+
+    async def flush_async(self):
+        """
+        Writes everything queued so far. Flushes are serialized, so rows reach the store in the order they were put.
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            with self._lock:
+                rows = list(self.pending)
+                self.pending.clear()
+            if not rows:
+                return
+            # Each turn re-upserts its conversation; only the latest version of a row is sent, since one upsert cannot touch a row twice
+            tables = {table: {} for table in TABLE_ORDER}
+            for table, row in rows:
+                tables.setdefault(table, {})[row_key(table, row)] = row
+            loop = asyncio.get_running_loop()
+            for table, keyed_rows in tables.items():
+                table_rows = list(keyed_rows.values())
+                for start in range(0, len(table_rows), self.batch_size):
+                    batch = table_rows[start:start + self.batch_size]
+                    await self._write(loop, table, batch)
+
+    async def _write(self, loop, table: str, batch: list):
+        started = time.perf_counter()
+        try:
+            store = self.store
+            await resiliencePolicies.call_async("persist_batch", lambda: loop.run_in_executor(None, store.insert, table, batch))
+        except Exception as e:
+            metricsRegistry.record("db", f"insert.{table}", time.perf_counter() - started, "error")
+            with self._lock:
+                self.counts["failed"] += len(batch)
+                self.last_error = f"{type(e).__name__}: {e}"
+            return
+        metricsRegistry.record("db", f"insert.{table}", time.perf_counter() - started, "ok")
+        with self._lock:
+            self.counts["written"] += len(batch)
+            self.counts["batches"] += 1
+        for listener in self.listeners:
+            try:
+                listener(table, batch)
+            except Exception:
+                pass
+
+    def flush(self, timeout: float = None):
+        """
+        Blocks until everything queued so far is written. Used on shutdown and before reading history back.
+        """
+        backgroundLoop.run(self.flush_async(), timeout)
+
+    def stats(self):
+        with self._lock:
+            return {**self.counts, "pending": len(self.pending), "last_error": self.last_error}
+
+
+#__________________________________________________________________________________________
+# 5. Conversation Log
+class ConversationLog:
+    """
+    Records one chat session through the write-behind queue. Message sequence numbers are assigned here,
+    so a reply's seq is known before it streams and its tool outputs can point at it.
+    """
+    def __init__(self, thread_id: str = None, conversation_id: str = None, writer: WriteBehindQueue = None):
+        self.conversation_id = conversation_id or str(uuid.uuid4())
+        self.thread_id = thread_id
+        self.writer = chatWriter if writer is None else writer
+        self.title = None
+        self.created_at = utc_now()
+        self.next_seq = 0
+
+    def _touch(self, title: str = None):
+        if self.title is None and title:
+            self.title = title[:TITLE_CHARS]
+        self.writer.put("conversations", {"id": self.conversation_id, "thread_id": self.thread_id, "title": self.title, "created_at": self.created_at, "updated_at": utc_now()})
+
+    def reserve_seq(self):
+        seq = self.next_seq
+        self.next_seq += 1
+        return seq
+
+    def add_message(self, role: str, content: str, seq: int = None):
+        seq = self.reserve_seq() if seq is None else seq
+        self._touch(content if role == "user" else None)
+        self.writer.put("messages", {"conversation_id": self.conversation_id, "seq": seq, "role": role, "content": content, "created_at": utc_now()})
+        return seq
+
+    def add_tool_outputs(self, message_seq: int, tool_calls: list, tool_outputs: list):
+        """
+        Queues the outputs of one requires_action step, matched to their calls by tool_call_id.
+        """
+        outputs = {item["tool_call_id"]: item["output"] for item in tool_outputs}
+        for tool_call in tool_calls:
+            self.writer.put("tool_outputs", {
+                "conversation_id": self.conversation_id, "message_seq": message_seq, "tool_call_id": tool_call.id,
+                "name": tool_call.function.name, "arguments": tool_call.function.arguments, "output": outputs.get(tool_call.id), "created_at": utc_now(),
+            })
+
+    def tool_output_recorder(self, message_seq: int):
+        return lambda tool_calls, tool_outputs: self.add_tool_outputs(message_seq, tool_calls, tool_outputs)
+
+
+##### SET WRITER
+clientRegistry.register("chat_store", build_chat_store)
+chatWriter = WriteBehindQueue()
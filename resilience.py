@@ -0,0 +1,305 @@
+import asyncio
+import functools
+import inspect
+import random
+import threading
+import time
+
+##### SET VARIABLES
+PROVIDER_LIMITS = {
+    "googlesearch": {"rate": 1.0, "burst": 2},
+    "tavily": {"rate": 5.0, "burst": 5},
+    "google_places": {"rate": 10.0, "burst": 10},
+    "google_geocoding": {"rate": 40.0, "burst": 40},
+    "google_address_validation": {"rate": 25.0, "burst": 25},
+    "yelp": {"rate": 8.0, "burst": 16},
+    "openai": {"rate": 10.0, "burst": 10},
+    "supabase": {"rate": 20.0, "burst": 20},
+}
+TOOL_PROVIDERS = {
+    "internet_search": "googlesearch",
+    "internet_research": "tavily",
+    "google_places_search": "google_places",
+    "google_geocode": "google_geocoding",
+    "google_address_validation": "google_address_validation",
+    "yelp_query_search": "yelp",
+    "yelp_business_search": "yelp",
+    "suggest_prompts": "openai",
+    "persist_batch": "supabase",
+}
+DEFAULT_POLICY = {"retries": 2, "base_delay": 0.25, "max_delay": 4.0}
+TOOL_POLICIES = {
+    "internet_search": {"retries": 1, "base_delay": 1.0},
+    "suggest_prompts": {"retries": 1},
+}
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30.0
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = {
+    "Timeout", "ConnectTimeout", "ReadTimeout", "ConnectionError", "TransportError", "_OverQueryLimit",
+    "APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError", "TimeoutException", "NetworkError",
+}
+TRANSIENT_MESSAGES = ("OVER_QUERY_LIMIT", "TOO_MANY_REQUESTS", "RATE_LIMIT", "INTERNAL_ERROR", "SERVICE_UNAVAILABLE")
+
+
+###### FUNCTIONS
+def is_transient(error: BaseException):
+    """
+    Returns True for errors worth retrying: timeouts, connection failures, 429/5xx responses and provider quota errors.
+    The SDK exception types are matched by name so this module does not import any provider SDK.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    if any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    response = getattr(error, "response", None)
+    status_code = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status_code in TRANSIENT_STATUS_CODES:
+        return True
+    message = str(error).upper()
+    return any(marker in message for marker in TRANSIENT_MESSAGES)
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float):
+    """
+    Full-jitter exponential backoff: a random delay up to base_delay * 2**attempt, capped at max_delay.
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Token Bucket
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by threads and coroutines. Each acquire reserves a token under a short lock and then waits outside it,
+    with time.sleep on threads or asyncio.sleep on the event loop.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes one token and returns how long the caller must wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+#__________________________________________________________________________________________
+# 2. Circuit Breaker
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transient failures and fails fast until reset_timeout has passed,
+    then lets a single trial call through (half-open) and closes again if it succeeds.
+    """
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half_open" and self.trial_in_flight):
+                raise CircuitOpenError(f"{self.name} circuit is open; failing fast")
+            if state == "half_open":
+                self.trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def release(self):
+        """
+        Ends a half-open trial that failed for a non-transient reason or was cancelled, without changing the breaker state.
+        """
+        with self._lock:
+            self.trial_in_flight = False
+
+
+#__________________________________________________________________________________________
+# 3. Resilience Policies
+class ResiliencePolicies:
+    """
+    Per-tool retry policy plus the shared per-provider token bucket and circuit breaker.
+    Tools of the same provider share one bucket and one breaker, so a Yelp outage seen by yelp_search also fails yelp_business_search fast.
+    """
+    def __init__(self, provider_limits: dict = None, tool_providers: dict = None, tool_policies: dict = None):
+        self.provider_limits = {name: dict(limits) for name, limits in (PROVIDER_LIMITS if provider_limits is None else provider_limits).items()}
+        self.tool_providers = dict(TOOL_PROVIDERS if tool_providers is None else tool_providers)
+        self.tool_policies = {name: dict(policy) for name, policy in (TOOL_POLICIES if tool_policies is None else tool_policies).items()}
+        self.buckets = {}
+        self.breakers = {}
+        self.retries = {}
+        self._lock = threading.Lock()
+
+    def configure_tool(self, tool: str, provider: str = None, **policy):
+        """
+        Overrides the retry policy (retries, base_delay, max_delay) and optionally the provider of one tool.
+        """
+        if provider is not None:
+            self.tool_providers[tool] = provider
+        self.tool_policies.setdefault(tool, {}).update(policy)
+
+    def configure_provider(self, provider: str, rate: float = None, burst: int = None):
+        limits = self.provider_limits.setdefault(provider, {"rate": 10.0, "burst": 10})
+        if rate is not None:
+            limits["rate"] = rate
+        if burst is not None:
+            limits["burst"] = burst
+        with self._lock:
+            self.buckets.pop(provider, None)
+
+    def policy(self, tool: str):
+        return {**DEFAULT_POLICY, **self.tool_policies.get(tool, {})}
+
+    def provider(self, tool: str):
+        return self.tool_providers.get(tool, tool)
+
+    def bucket(self, provider: str):
+        with self._lock:
+            if provider not in self.buckets:
+                limits = self.provider_limits.get(provider, {"rate": 10.0, "burst": 10})
+                self.buckets[provider] = TokenBucket(limits["rate"], limits["burst"])
+            return self.buckets[provider]
+
+    def breaker(self, provider: str):
+        with self._lock:
+            if provider not in self.breakers:
+                self.breakers[provider] = CircuitBreaker(provider)
+            return self.breakers[provider]
+
+    def _count_retry(self, tool: str):
+        with self._lock:
+            self.retries[tool] = self.retries.get(tool, 0) + 1
+
+    def call(self, tool: str, func):
+        """
+        Runs a blocking call under the tool's rate limit, retry policy and circuit breaker.
+        """
+        policy = self.policy(tool)
+        provider = self.provider(tool)
+        bucket = self.bucket(provider)
+        breaker = self.breaker(provider)
+        for attempt in range(policy["retries"] + 1):
+            # Wait for the token before claiming a half-open trial, so a call interrupted while it waits holds no trial
+            bucket.acquire()
+            breaker.before_call()
+            try:
+                result = func()
+            except Exception as e:
+                if not is_transient(e):
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if attempt == policy["retries"]:
+                    raise
+                self._count_retry(tool)
+                time.sleep(backoff_delay(attempt, policy["base_delay"], policy["max_delay"]))
+            except BaseException:
+                breaker.release()
+                raise
+            else:
+                breaker.record_success()
+                return result
+
+    async def call_async(self, tool: str, coro_func):
+        """
+        Awaits coro_func() under the tool's rate limit, retry policy and circuit breaker; coro_func is called again for each retry.
+        """
+        policy = self.policy(tool)
+        provider = self.provider(tool)
+        bucket = self.bucket(provider)
+        breaker = self.breaker(provider)
+        for attempt in range(policy["retries"] + 1):
+            await bucket.acquire_async()
+            breaker.before_call()
+            try:
+                result = await coro_func()
+            except Exception as e:
+                if not is_transient(e):
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if attempt == policy["retries"]:
+                    raise
+                self._count_retry(tool)
+                await asyncio.sleep(backoff_delay(attempt, policy["base_delay"], policy["max_delay"]))
+            except BaseException:
+                # Cancellation by a per-source timeout or the search deadline ends the trial without counting against the provider
+                breaker.release()
+                raise
+            else:
+                breaker.record_success()
+                return result
+
+    def resilient(self, tool: str):
+        """
+        Decorator form of call/call_async for sync and async tool functions.
+        """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    return await self.call_async(tool, lambda: func(*args, **kwargs))
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return self.call(tool, lambda: func(*args, **kwargs))
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            breakers = {name: {"state": breaker.state, "failures": breaker.failures} for name, breaker in self.breakers.items()}
+            retries = dict(self.retries)
+        return {"breakers": breakers, "retries": retries}
+
+
+##### SET POLICIES
+resiliencePolicies = ResiliencePolicies()
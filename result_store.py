@@ -0,0 +1,310 @@
+import json
+import mmap
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+##### SET VARIABLES
+SPILL_DIR = os.path.join(".cache", "session_results")
+MEMORY_BUDGET_BYTES = 256 * 1024 * 1024
+SESSION_IDLE_SECONDS = 6 * 60 * 60
+ZSTD_LEVEL = 3
+
+
+###### FUNCTIONS
+def result_bytes(value):
+    """
+    Approximate in-memory size of a stored result: deep DataFrame memory, Arrow buffer size, or the JSON length of anything else.
+    """
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        return int(memory_usage(deep=True).sum())
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def compress_json(value):
+    """
+    Returns (codec, payload): zstd when the zstandard package is installed, zlib otherwise.
+    Raises TypeError for values that are not plain JSON rather than storing their repr.
+    """
+    data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    try:
+        import zstandard
+        return "zst", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    except ImportError:
+        return "gz", zlib.compress(data, 6)
+
+
+def process_alive(pid: int):
+    """
+    Whether a process with this id is running. Only checked on POSIX; os.kill would terminate the process on Windows, so there it is assumed alive.
+    """
+    if sys.platform == "win32":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def decompress_json(codec: str, buffer):
+    if codec == "zst":
+        import zstandard
+        return json.loads(zstandard.ZstdDecompressor().decompress(buffer))
+    return json.loads(zlib.decompress(buffer))
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Stored Result
+class StoredResult:
+    __slots__ = ("session_id", "result_id", "value", "nbytes", "path", "kind", "spilled_bytes", "spilling", "pinned")
+
+    def __init__(self, session_id: str, result_id: str, value, nbytes: int):
+        self.session_id = session_id
+        self.result_id = result_id
+        self.value = value
+        self.nbytes = nbytes
+        self.path = None
+        self.kind = None
+        self.spilled_bytes = 0
+        self.spilling = False
+        self.pinned = False
+
+
+#__________________________________________________________________________________________
+# 2. Result Store
+class ResultStore:
+    """
+    Per-session store for full tool results under one memory budget shared by every session on the server.
+
+    Results are kept in memory in least-recently-used order. When the budget is exceeded the oldest ones are spilled to disk:
+    DataFrames and Arrow tables as Arrow IPC files, memory-mapped when read back, and everything else as zstd-compressed JSON
+    (zlib if zstandard is not installed), decompressed straight from a memory map. A spilled result is reloaded on get() and becomes
+    the most recent again; its file is kept, so results are treated as immutable and spilling it again costs nothing.
+    Spill victims are chosen under the lock but written outside it, so one session spilling never blocks another session's put/get.
+    Results that are neither frames nor plain JSON cannot be spilled without losing data, so they stay in memory until their session ends.
+    Sessions idle for longer than session_idle_seconds are dropped with their files. Each process spills into its own directory,
+    and directories left by processes that are no longer running are removed on startup.
+    """
+    def __init__(self, spill_dir: str = SPILL_DIR, memory_budget: int = MEMORY_BUDGET_BYTES, session_idle_seconds: float = SESSION_IDLE_SECONDS):
+        self.spill_dir = spill_dir
+        self.process_dir = os.path.join(spill_dir, str(os.getpid()))
+        self.memory_budget = memory_budget
+        self.session_idle_seconds = session_idle_seconds
+        self.results = OrderedDict()
+        self.sessions = {}
+        self.last_seen = {}
+        self.memory_bytes = 0
+        self.spilling_bytes = 0
+        self.spills = 0
+        self.reloads = 0
+        self.spill_errors = 0
+        self._lock = threading.Lock()
+        self.sweep_orphans()
+
+    def sweep_orphans(self):
+        """
+        Removes spill directories of earlier processes; their results can no longer be reached by any session.
+        """
+        if not os.path.isdir(self.spill_dir):
+            return
+        for name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, name)
+            if path == self.process_dir or not os.path.isdir(path):
+                continue
+            if name.isdigit() and process_alive(int(name)):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+
+    def put(self, session_id: str, value):
+        """
+        Stores a result for the session and returns its id.
+        """
+        result_id = uuid.uuid4().hex
+        entry = StoredResult(session_id, result_id, value, result_bytes(value))
+        with self._lock:
+            self.sessions.setdefault(session_id, {})[result_id] = entry
+            self.results[(session_id, result_id)] = entry
+            self.memory_bytes += entry.nbytes
+            self.touch(session_id)
+        self.enforce_budget()
+        self.expire_sessions()
+        return result_id
+
+    def get(self, session_id: str, result_id: str):
+        """
+        Returns a stored result, reloading it from disk if it was spilled, or None if it is unknown or its session expired.
+        """
+        with self._lock:
+            entry = self.sessions.get(session_id, {}).get(result_id)
+            if entry is None:
+                return None
+            self.touch(session_id)
+            if entry.value is not None:
+                # A result being spilled right now is still in memory but no longer in the LRU order
+                if not entry.spilling:
+                    self.results.move_to_end((session_id, result_id))
+                return entry.value
+        value = self.load(entry)
+        with self._lock:
+            if entry.value is None and self.sessions.get(session_id, {}).get(result_id) is entry:
+                entry.value = value
+                self.results[(session_id, result_id)] = entry
+                self.memory_bytes += entry.nbytes
+                self.reloads += 1
+        self.enforce_budget(keep=(session_id, result_id))
+        return value
+
+    def touch(self, session_id: str):
+        self.last_seen[session_id] = time.monotonic()
+
+    def choose_victims(self, keep: tuple = None):
+        """
+        Takes least recently used results out of the LRU order until what stays in memory fits the budget. Called with the lock held.
+        """
+        victims = []
+        for key in list(self.results):
+            if self.memory_bytes - self.spilling_bytes <= self.memory_budget:
+                break
+            if key == keep or self.results[key].pinned:
+                continue
+            entry = self.results.pop(key)
+            entry.spilling = True
+            self.spilling_bytes += entry.nbytes
+            victims.append(entry)
+        return victims
+
+    def enforce_budget(self, keep: tuple = None):
+        """
+        Spills least recently used results until the in-memory total fits the budget. Victims are chosen under the lock, their
+        files written without it, and the entries swapped to their on-disk form under the lock again.
+        """
+        with self._lock:
+            victims = self.choose_victims(keep)
+        for entry in victims:
+            error = None
+            if entry.path is None:
+                try:
+                    self.spill(entry)
+                except Exception as e:
+                    error = e
+            with self._lock:
+                entry.spilling = False
+                self.spilling_bytes -= entry.nbytes
+                if error is not None:
+                    # Keep it in memory rather than lose it: as the next victim after a write error, for good if it is not JSON
+                    self.spill_errors += 1
+                    entry.pinned = isinstance(error, (TypeError, ValueError))
+                    if self.sessions.get(entry.session_id, {}).get(entry.result_id) is entry:
+                        self.results[(entry.session_id, entry.result_id)] = entry
+                        self.results.move_to_end((entry.session_id, entry.result_id), last=False)
+                    else:
+                        self.memory_bytes -= entry.nbytes
+                    continue
+                entry.value = None
+                self.memory_bytes -= entry.nbytes
+                dropped = self.sessions.get(entry.session_id, {}).get(entry.result_id) is not entry
+            if dropped:
+                # The session was dropped while its result was being written
+                self.remove_file(entry)
+
+    def spill(self, entry: StoredResult):
+        directory = os.path.join(self.process_dir, entry.session_id)
+        os.makedirs(directory, exist_ok=True)
+        value = entry.value
+        if hasattr(value, "memory_usage") or hasattr(value, "schema"):
+            import pyarrow as pa
+
+            table = value if hasattr(value, "schema") else pa.Table.from_pandas(value, preserve_index=False)
+            path = os.path.join(directory, f"{entry.result_id}.arrow")
+            with pa.OSFile(path + ".tmp", "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            kind = "arrow_table" if hasattr(value, "schema") else "arrow_frame"
+        else:
+            codec, payload = compress_json(value)
+            path = os.path.join(directory, f"{entry.result_id}.json.{codec}")
+            with open(path + ".tmp", "wb") as f:
+                f.write(payload)
+            kind = codec
+        os.replace(path + ".tmp", path)
+        spilled_bytes = os.path.getsize(path)
+        with self._lock:
+            entry.kind = kind
+            entry.path = path
+            entry.spilled_bytes = spilled_bytes
+            self.spills += 1
+
+    @staticmethod
+    def remove_file(entry: StoredResult):
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+    def load(self, entry: StoredResult):
+        if entry.kind in ("arrow_table", "arrow_frame"):
+            import pyarrow as pa
+
+            table = pa.ipc.open_file(pa.memory_map(entry.path, "r")).read_all()
+            return table if entry.kind == "arrow_table" else table.to_pandas()
+        with open(entry.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return decompress_json(entry.kind, buffer)
+
+    def drop_session(self, session_id: str):
+        with self._lock:
+            entries = self.sessions.pop(session_id, {})
+            self.last_seen.pop(session_id, None)
+            for result_id, entry in entries.items():
+                # Results being spilled are accounted for when their write finishes
+                if self.results.pop((session_id, result_id), None) is not None:
+                    self.memory_bytes -= entry.nbytes
+        shutil.rmtree(os.path.join(self.process_dir, session_id), ignore_errors=True)
+
+    def expire_sessions(self):
+        now = time.monotonic()
+        with self._lock:
+            idle = [session_id for session_id, seen in self.last_seen.items() if now - seen > self.session_idle_seconds]
+        for session_id in idle:
+            self.drop_session(session_id)
+
+    def stats(self):
+        """
+        Returns memory and disk use per session plus the totals against the budget.
+        """
+        with self._lock:
+            per_session = []
+            for session_id, entries in self.sessions.items():
+                per_session.append({
+                    "session": session_id,
+                    "results": len(entries),
+                    "memory_bytes": sum(entry.nbytes for entry in entries.values() if entry.value is not None),
+                    "spilled_results": sum(1 for entry in entries.values() if entry.value is None),
+                    "disk_bytes": sum(entry.spilled_bytes for entry in entries.values()),
+                })
+            return {
+                "memory_bytes": self.memory_bytes,
+                "memory_budget": self.memory_budget,
+                "disk_bytes": sum(session["disk_bytes"] for session in per_session),
+                "spills": self.spills,
+                "spill_errors": self.spill_errors,
+                "reloads": self.reloads,
+                "sessions": sorted(per_session, key=lambda session: session["memory_bytes"], reverse=True),
+            }
+
+
+##### SET STORE
+resultStore = ResultStore()
@@ -0,0 +1,437 @@
+import functools
+import hashlib
+import inspect
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from clients import clientRegistry
+from cache import bind_arguments
+from metrics import metricsRegistry
+from persistence import chatWriter
+from serialize import compact_places, compact_yelp
+
+##### SET VARIABLES
+INDEX_PATH = os.path.join(".cache", "search_index.sqlite3")
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 256
+EMBEDDING_BATCH = 64
+EMBEDDING_CHARS = 4000
+CANDIDATES = 50
+RRF_K = 60
+# Semantic candidates below this cosine similarity are not considered matches
+MIN_SIMILARITY = 0.25
+SNIPPET_CHARS = 240
+QUERY_VECTOR_CACHE = 256
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+INDEXED_TOOLS = ("internet_research", "google_places_search", "yelp_search")
+
+
+###### FUNCTIONS
+def document(kind: str, key: str, title: str, body: str, ref: str = None, source: str = None, zipcode: str = None, query: str = None):
+    return {"key": f"{kind}:{key}", "kind": kind, "title": title or "", "body": body or "", "ref": ref, "source": source, "zipcode": zipcode, "query": query}
+
+
+def join_fields(*values):
+    """
+    Joins the non-empty values into one line, flattening lists.
+    """
+    parts = []
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(item) for item in value if item)
+        if value not in (None, ""):
+            parts.append(str(value))
+    return " · ".join(parts)
+
+
+def research_documents(arguments: dict, response: dict):
+    """
+    One document per Tavily result (keyed by URL) plus one for the answer to the query.
+    """
+    query = arguments.get("query")
+    documents = []
+    if response.get("answer"):
+        documents.append(document("internet_research", f"answer:{query}", f"Research: {query}", response["answer"], source="tavily", query=query))
+    passages = {}
+    for passage in response.get("passages", []):
+        passages.setdefault(passage["url"], []).append(passage["text"])
+    for result in response.get("results", []):
+        if result.get("url"):
+            page_text = result.get("raw_content") or "\n\n".join(passages.get(result["url"], []))
+            body = join_fields(result.get("content"), page_text[:EMBEDDING_CHARS])
+            documents.append(document("internet_research", result["url"], result.get("title"), body, ref=result["url"], source="tavily", query=query))
+    return documents
+
+
+def places_documents(arguments: dict, response: dict):
+    documents = []
+    for place in compact_places(response):
+        if place.get("place_id"):
+            zipcode = re.search(r"\b(\d{5})(?:-\d{4})?\b", place.get("address", ""))
+            body = join_fields(place.get("address"), place.get("types"), place.get("business_status"), f"rating {place.get('rating')} ({place.get('ratings')} ratings)" if place.get("rating") else None)
+            documents.append(document("google_places_search", place["place_id"], place.get("name"), body, ref=place["place_id"], source="google_places", zipcode=zipcode.group(1) if zipcode else None, query=arguments.get("query")))
+    return documents
+
+
+def yelp_documents(arguments: dict, response):
+    """
+    Accepts the business list from AsyncTools.yelp_search or any of the Tools.yelp_search frames.
+    """
+    if hasattr(response, "to_dict"):
+        records = [{key: value.tolist() if hasattr(value, "tolist") else value for key, value in record.items()} for record in response.to_dict("records")]
+        rows = [{"id": record.get("id"), "name": record.get("name"), "address": join_fields(record.get("display_address")), "zip_code": record.get("zip_code"),
+                 "phone": record.get("display_phone"), "rating": record.get("rating"), "reviews": record.get("review_count"),
+                 "categories": record.get("categories_title"), "url": record.get("url")} for record in records]
+    else:
+        rows = [{**business, "zip_code": ((source.get("location") or {}).get("zip_code"))} for business, source in zip(compact_yelp(response), response)]
+    documents = []
+    for row in rows:
+        if row.get("id"):
+            body = join_fields(row.get("address"), row.get("categories"), row.get("phone"), f"rating {row.get('rating')} ({row.get('reviews')} reviews)" if row.get("rating") else None, row.get("url"))
+            documents.append(document("yelp_search", row["id"], row.get("name"), body, ref=row.get("url"), source="yelp", zipcode=row.get("zip_code") or arguments.get("zipcode"), query=arguments.get("query")))
+    return documents
+
+
+TOOL_DOCUMENTS = {
+    "internet_research": research_documents,
+    "google_places_search": places_documents,
+    "yelp_search": yelp_documents,
+}
+
+
+def fts_query(text: str):
+    """
+    Quotes every word so user input can never be parsed as FTS5 syntax, and ORs them so bm25 ranks partial matches.
+    """
+    return " OR ".join(f'"{token}"' for token in TOKEN_PATTERN.findall(text.lower()))
+
+
+def normalize_rows(matrix: np.ndarray):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Embedders
+class OpenAIEmbedder:
+    """
+    OpenAI embeddings shortened to `dimensions`, so the in-memory matrix stays small.
+    """
+    def __init__(self, model: str = EMBEDDING_MODEL, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.model = model
+        self.dimensions = dimensions
+        self.name = f"openai:{model}:{dimensions}"
+
+    def __call__(self, texts: list):
+        with metricsRegistry.span("openai", "embeddings.create"):
+            response = clientRegistry.get("openai").embeddings.create(model=self.model, input=texts, dimensions=self.dimensions)
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+
+class HashingEmbedder:
+    """
+    Local feature-hashed word and word-pair vectors. No network and deterministic across processes, for offline use and benchmarks;
+    it only captures shared vocabulary, not meaning.
+    """
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.name = f"hashing:{dimensions}"
+
+    def __call__(self, texts: list):
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = TOKEN_PATTERN.findall(text.lower())
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                digest = zlib.crc32(feature.encode("utf-8"))
+                matrix[row, digest % self.dimensions] += 1.0 if digest & 0x80000000 else -1.0
+        return matrix
+
+
+#__________________________________________________________________________________________
+# 2. Search Index
+class SearchIndex:
+    """
+    Local hybrid index over chat messages and past research results.
+
+    Documents live in SQLite with an FTS5 table for keyword search; their embeddings are stored next to them and kept in memory
+    as one normalized float32 matrix, so a semantic lookup is a single matrix-vector product. search() fuses the bm25 and cosine
+    rankings with reciprocal rank fusion.
+
+    Updates are incremental: documents are keyed (URL, place id, Yelp id, conversation/seq), unchanged documents are skipped by digest,
+    and all writes and embedding calls run on one worker thread so callers never wait on them.
+    """
+    def __init__(self, path: str = INDEX_PATH, embedder=None):
+        self.path = path
+        self.embedder = OpenAIEmbedder() if embedder is None else embedder
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+        self.conversation_titles = {}
+        self._lock = threading.RLock()
+        self._conn = None
+        self._matrix = None
+        self._ids = None
+        self._positions = None
+        self._size = 0
+        self._query_vectors = {}
+
+    def _connection(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, kind TEXT NOT NULL, title TEXT, body TEXT, ref TEXT, source TEXT, zipcode TEXT, query TEXT, digest TEXT NOT NULL, updated_at REAL NOT NULL)")
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(title, body, content='documents', content_rowid='id', tokenize='porter unicode61')")
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (doc_id INTEGER NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL, PRIMARY KEY (doc_id, model))")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _load_vectors(self):
+        """
+        Loads the stored embeddings of the current embedder into the in-memory matrix (once).
+        """
+        if self._matrix is not None:
+            return
+        with self._lock:
+            if self._matrix is not None:
+                return
+            rows = self._connection().execute("SELECT doc_id, vector FROM embeddings WHERE model = ? ORDER BY doc_id", (self.embedder.name,)).fetchall()
+            capacity = max(1024, len(rows) * 2)
+            self._matrix = np.zeros((capacity, self.embedder.dimensions), dtype=np.float32)
+            self._ids = np.zeros(capacity, dtype=np.int64)
+            self._positions = {}
+            for position, (doc_id, vector) in enumerate(rows):
+                self._matrix[position] = np.frombuffer(vector, dtype=np.float32)
+                self._ids[position] = doc_id
+                self._positions[doc_id] = position
+            self._size = len(rows)
+
+    def _store_vectors(self, doc_ids: list, vectors: np.ndarray):
+        vectors = normalize_rows(vectors.astype(np.float32))
+        with self._lock:
+            conn = self._connection()
+            conn.executemany("INSERT OR REPLACE INTO embeddings (doc_id, model, vector) VALUES (?, ?, ?)", [(doc_id, self.embedder.name, vector.tobytes()) for doc_id, vector in zip(doc_ids, vectors)])
+            conn.commit()
+            for doc_id, vector in zip(doc_ids, vectors):
+                position = self._positions.get(doc_id)
+                if position is None:
+                    if self._size == len(self._ids):
+                        self._matrix = np.concatenate([self._matrix, np.zeros_like(self._matrix)])
+                        self._ids = np.concatenate([self._ids, np.zeros_like(self._ids)])
+                    position = self._size
+                    self._size += 1
+                    self._positions[doc_id] = position
+                    self._ids[position] = doc_id
+                self._matrix[position] = vector
+
+    def _embed(self, doc_ids: list, texts: list):
+        for start in range(0, len(texts), EMBEDDING_BATCH):
+            batch = [text[:EMBEDDING_CHARS] for text in texts[start:start + EMBEDDING_BATCH]]
+            self._store_vectors(doc_ids[start:start + EMBEDDING_BATCH], self.embedder(batch))
+
+    def add_documents(self, documents: list):
+        """
+        Inserts new documents and updates changed ones, then embeds them. Returns the number of documents written.
+        If embedding fails the documents are still keyword-searchable; embed_missing() fills the gap later.
+        """
+        self._load_vectors()
+        changed = []
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            for doc in documents:
+                digest = hashlib.sha1(f"{doc['title']}\n{doc['body']}".encode("utf-8")).hexdigest()
+                existing = conn.execute("SELECT id, digest, title, body FROM documents WHERE key = ?", (doc["key"],)).fetchone()
+                if existing is not None and existing[1] == digest:
+                    continue
+                values = (doc["kind"], doc["title"], doc["body"], doc.get("ref"), doc.get("source"), doc.get("zipcode"), doc.get("query"), digest, now)
+                if existing is None:
+                    doc_id = conn.execute("INSERT INTO documents (kind, title, body, ref, source, zipcode, query, digest, updated_at, key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values + (doc["key"],)).lastrowid
+                else:
+                    doc_id = existing[0]
+                    conn.execute("INSERT INTO documents_fts (documents_fts, rowid, title, body) VALUES ('delete', ?, ?, ?)", (doc_id, existing[2], existing[3]))
+                    conn.execute("UPDATE documents SET kind = ?, title = ?, body = ?, ref = ?, source = ?, zipcode = ?, query = ?, digest = ?, updated_at = ? WHERE id = ?", values + (doc_id,))
+                conn.execute("INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)", (doc_id, doc["title"], doc["body"]))
+                changed.append((doc_id, f"{doc['title']}\n{doc['body']}"))
+            conn.commit()
+        if changed:
+            try:
+                self._embed([doc_id for doc_id, _ in changed], [text for _, text in changed])
+            except Exception:
+                pass
+        return len(changed)
+
+    def embed_missing(self):
+        """
+        Embeds every document that has no vector for the current embedder, e.g. after an embedding outage or an embedder change.
+        """
+        self._load_vectors()
+        with self._lock:
+            rows = self._connection().execute("SELECT id, title, body FROM documents WHERE id NOT IN (SELECT doc_id FROM embeddings WHERE model = ?)", (self.embedder.name,)).fetchall()
+        self._embed([row[0] for row in rows], [f"{row[1]}\n{row[2]}" for row in rows])
+        return len(rows)
+
+    def submit(self, documents: list):
+        return self.executor.submit(self.add_documents, documents)
+
+    def submit_result(self, tool: str, arguments: dict, result):
+        """
+        Indexes a tool result in the background. Empty results (including empty DataFrames) and status placeholders from execute_all_tasks are ignored.
+        """
+        if result is None or len(result) == 0 or (isinstance(result, dict) and result.get("status") in ("timed_out", "failed")):
+            return None
+        return self.executor.submit(lambda: self.add_documents(TOOL_DOCUMENTS[tool](arguments, result)))
+
+    def indexed(self, tool: str):
+        """
+        Decorator that indexes the results of a sync or async research tool after it returns, without delaying the caller.
+        """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    result = await func(*args, **kwargs)
+                    self.submit_result(tool, bind_arguments(func, args, kwargs), result)
+                    return result
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                result = func(*args, **kwargs)
+                self.submit_result(tool, bind_arguments(func, args, kwargs), result)
+                return result
+            return wrapper
+        return decorator
+
+    def index_rows(self, table: str, rows: list):
+        """
+        chatWriter listener: indexes messages as they are saved, titled with their conversation's title.
+        """
+        if table == "conversations":
+            self.conversation_titles.update({row["id"]: row.get("title") for row in rows})
+        elif table == "messages":
+            self.submit([self.message_document(row) for row in rows])
+
+    def message_document(self, row: dict):
+        title = self.conversation_titles.get(row["conversation_id"]) or "Conversation"
+        return document("message", f"{row['conversation_id']}:{row['seq']}", f"{title} ({row['role']})", row["content"], ref=row["conversation_id"], source=row["role"])
+
+    def backfill(self, store, page_size: int = 100):
+        """
+        Indexes every stored conversation, paging through the store by key. Already-indexed messages are skipped by digest.
+        """
+        count = 0
+        before = None
+        while True:
+            conversations = store.list_conversations(page_size, before)
+            for conversation in conversations:
+                self.conversation_titles[conversation["id"]] = conversation.get("title")
+                after_seq = -1
+                while True:
+                    messages = store.list_messages(conversation["id"], page_size, after_seq)
+                    count += self.add_documents([self.message_document({**message, "conversation_id": conversation["id"]}) for message in messages])
+                    if len(messages) < page_size:
+                        break
+                    after_seq = messages[-1]["seq"]
+            if len(conversations) < page_size:
+                return count
+            before = (conversations[-1]["updated_at"], conversations[-1]["id"])
+
+    def query_vector(self, query: str):
+        vector = self._query_vectors.get(query)
+        if vector is None:
+            vector = normalize_rows(self.embedder([query]))[0]
+            if len(self._query_vectors) >= QUERY_VECTOR_CACHE:
+                self._query_vectors.pop(next(iter(self._query_vectors)))
+            self._query_vectors[query] = vector
+        return vector
+
+    def keyword_candidates(self, query: str, kinds: tuple = None):
+        match = fts_query(query)
+        if not match:
+            return {}
+        sql = "SELECT documents_fts.rowid, snippet(documents_fts, 1, '**', '**', '…', 16) FROM documents_fts JOIN documents ON documents.id = documents_fts.rowid WHERE documents_fts MATCH ?"
+        params = [match]
+        if kinds:
+            sql += f" AND documents.kind IN ({', '.join('?' * len(kinds))})"
+            params += list(kinds)
+        with self._lock:
+            rows = self._connection().execute(sql + " ORDER BY bm25(documents_fts) LIMIT ?", params + [CANDIDATES]).fetchall()
+        return {doc_id: snippet for doc_id, snippet in rows}
+
+    def semantic_candidates(self, query: str):
+        self._load_vectors()
+        with self._lock:
+            size = self._size
+            matrix = self._matrix[:size]
+            ids = self._ids[:size]
+        if size == 0:
+            return []
+        scores = matrix @ self.query_vector(query)
+        top = np.argpartition(-scores, min(CANDIDATES, size) - 1)[:CANDIDATES]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[position]), float(scores[position])) for position in top if scores[position] >= MIN_SIMILARITY]
+
+    def search(self, query: str, k: int = 8, kinds: tuple = None, semantic: bool = True):
+        """
+        Hybrid lookup: bm25 and cosine candidates merged by reciprocal rank fusion.
+
+        Args:
+            query (str): Free-text query.
+            k (int): Number of results to return.
+            kinds (tuple): Restricts results to these kinds ("message" or one of INDEXED_TOOLS).
+            semantic (bool): Whether to include embedding similarity; keyword-only lookups make no network call.
+
+        Returns:
+            list: Result dicts with kind, title, snippet, ref, source, zipcode, query, similarity, score and updated_at, best first.
+        """
+        start = time.perf_counter()
+        keyword = self.keyword_candidates(query, kinds)
+        similarities = {}
+        if semantic:
+            try:
+                similarities = dict(self.semantic_candidates(query))
+            except Exception:
+                similarities = {}
+        scores = {}
+        for rank, doc_id in enumerate(keyword):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+        for rank, doc_id in enumerate(similarities):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+        if not scores:
+            metricsRegistry.record("index", "search", time.perf_counter() - start)
+            return []
+
+        candidate_ids = sorted(scores, key=scores.get, reverse=True)
+        sql = f"SELECT id, kind, title, body, ref, source, zipcode, query, updated_at FROM documents WHERE id IN ({', '.join('?' * len(candidate_ids))})"
+        with self._lock:
+            rows = {row[0]: row for row in self._connection().execute(sql, candidate_ids).fetchall()}
+        results = []
+        for doc_id in candidate_ids:
+            row = rows.get(doc_id)
+            if row is None or (kinds and row[1] not in kinds):
+                continue
+            results.append({
+                "kind": row[1], "title": row[2], "snippet": keyword.get(doc_id) or row[3][:SNIPPET_CHARS], "ref": row[4], "source": row[5], "zipcode": row[6],
+                "query": row[7], "similarity": similarities.get(doc_id), "score": scores[doc_id], "updated_at": row[8],
+            })
+            if len(results) == k:
+                break
+        metricsRegistry.record("index", "search", time.perf_counter() - start, "ok", len(results))
+        return results
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._connection().execute("SELECT kind, COUNT(*) FROM documents GROUP BY kind").fetchall())
+        return {"documents": counts, "vectors": self._size, "embedder": self.embedder.name}
+
+
+##### SET INDEX
+searchIndex = SearchIndex()
+chatWriter.subscribe(searchIndex.index_rows)
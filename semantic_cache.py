@@ -0,0 +1,308 @@
+import asyncio
+import functools
+import inspect
+import os
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+from cache import ToolCache, toolCache, bind_arguments
+from search_index import searchIndex, normalize_rows
+
+##### SET VARIABLES
+SEMANTIC_CACHE_PATH = os.path.join(".cache", "semantic_cache.sqlite3")
+SIMILARITY_THRESHOLD = 0.9
+TOOL_THRESHOLDS = {
+    "google_places_search": 0.92,
+}
+TOP_K = 5
+PURGE_INTERVAL = 10 * 60
+ZIPCODE_PATTERN = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+
+
+###### FUNCTIONS
+def split_zipcode(query: str, zipcode: str = None):
+    """
+    Returns (normalized query, zipcode). A zipcode inside the query text is taken out of it and used as the scope when none is given,
+    so "roofing contractors in 90210" and "roofers 90210" are compared as "roofing contractors in" and "roofers" within 90210.
+    The zipcode is "" when there is none; such queries have no location scope and are never answered semantically.
+    """
+    found = ZIPCODE_PATTERN.search(query or "")
+    if zipcode is None and found:
+        zipcode = found.group(1)
+    text = ZIPCODE_PATTERN.sub(" ", query or "") if zipcode else (query or "")
+    return re.sub(r"\s+", " ", text).strip().casefold(), (str(zipcode).strip() if zipcode else "")
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Scope
+class Scope:
+    """
+    The queries cached for one (tool, zipcode): a float16 matrix of normalized query vectors with their tool cache keys and expiry times.
+    """
+    def __init__(self, dimensions: int):
+        self.matrix = np.zeros((0, dimensions), dtype=np.float16)
+        self.keys = []
+        self.texts = []
+        self.expires_at = np.zeros(0, dtype=np.float64)
+
+    def add(self, text: str, vector: np.ndarray, key: str, expires_at: float):
+        if text in self.texts:
+            position = self.texts.index(text)
+            self.matrix[position] = vector
+            self.keys[position] = key
+            self.expires_at[position] = expires_at
+            return
+        self.matrix = np.vstack([self.matrix, vector.astype(np.float16)[None, :]])
+        self.keys.append(key)
+        self.texts.append(text)
+        self.expires_at = np.append(self.expires_at, expires_at)
+
+    def vector(self, text: str):
+        return self.matrix[self.texts.index(text)].astype(np.float32) if text in self.texts else None
+
+    def drop_expired(self, now: float):
+        keep = self.expires_at > now
+        if keep.all():
+            return 0
+        self.matrix = self.matrix[keep]
+        self.keys = [key for key, kept in zip(self.keys, keep) if kept]
+        self.texts = [text for text, kept in zip(self.texts, keep) if kept]
+        self.expires_at = self.expires_at[keep]
+        return int((~keep).sum())
+
+    def nearest(self, vector: np.ndarray, now: float, top_k: int = TOP_K):
+        """
+        Returns (similarity, text, key, expires_at) of the top_k most similar unexpired queries, best first.
+        """
+        if not self.keys:
+            return []
+        scores = (self.matrix @ vector.astype(np.float16)).astype(np.float32)
+        scores[self.expires_at <= now] = -1.0
+        top = np.argpartition(-scores, min(top_k, len(scores)) - 1)[:top_k]
+        return [(float(scores[position]), self.texts[position], self.keys[position], float(self.expires_at[position])) for position in top[np.argsort(-scores[top])] if scores[position] > -1.0]
+
+
+#__________________________________________________________________________________________
+# 2. Semantic Cache
+class SemanticCache:
+    """
+    Serves rephrased queries from the tool cache: "roofers 90210" is answered with the cached result of "roofing contractors in 90210".
+
+    Each normalized query is embedded once; its vector is kept with the tool cache key of its result in a per-(tool, zipcode) float16
+    matrix, persisted in SQLite. A lookup is one matrix-vector product over that scope, and a neighbour at or above the tool's similarity
+    threshold is answered from the tool cache under the neighbour's key. Entries expire with the tool's cache TTL, and a neighbour whose
+    tool cache entry has been evicted counts as a miss, so a semantic hit is never older than an exact one could be.
+
+    Queries without a zipcode are passed straight through: "joe's pizza boston" and "joe's pizza chicago" are close in embedding space
+    but are different businesses, and only a location scope keeps them apart.
+    """
+    def __init__(self, path: str = SEMANTIC_CACHE_PATH, embedder=None, threshold: float = SIMILARITY_THRESHOLD, tool_thresholds: dict = None):
+        self.path = path
+        self._embedder = embedder
+        self.threshold = threshold
+        self.tool_thresholds = dict(TOOL_THRESHOLDS if tool_thresholds is None else tool_thresholds)
+        self.scopes = None
+        self.lookups = {}
+        self.hits = {}
+        self.errors = 0
+        self.last_purge = time.time()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def embedder(self):
+        # Same embedder as the search index unless one is given, so both share the configured model
+        return self._embedder or searchIndex.embedder
+
+    def _connection(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS queries (tool TEXT NOT NULL, zipcode TEXT NOT NULL, text TEXT NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL, key TEXT NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (tool, zipcode, text, model))")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _load(self):
+        """
+        Loads the unexpired queries of the current embedder into per-scope matrices (once). Called with the lock held.
+        """
+        if self.scopes is not None:
+            return
+        conn = self._connection()
+        conn.execute("DELETE FROM queries WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+        self.scopes = {}
+        for tool, zipcode, text, vector, key, expires_at in conn.execute("SELECT tool, zipcode, text, vector, key, expires_at FROM queries WHERE model = ?", (self.embedder.name,)):
+            self.scope(tool, zipcode).add(text, np.frombuffer(vector, dtype=np.float16), key, expires_at)
+
+    def scope(self, tool: str, zipcode: str):
+        scope = self.scopes.get((tool, zipcode))
+        if scope is None:
+            scope = self.scopes[(tool, zipcode)] = Scope(self.embedder.dimensions)
+        return scope
+
+    def purge(self, now: float):
+        """
+        Drops expired queries from memory and SQLite at most once per PURGE_INTERVAL. Called with the lock held.
+        """
+        if now - self.last_purge < PURGE_INTERVAL:
+            return
+        self.last_purge = now
+        for scope in self.scopes.values():
+            scope.drop_expired(now)
+        conn = self._connection()
+        conn.execute("DELETE FROM queries WHERE expires_at <= ?", (now,))
+        conn.commit()
+
+    def query_vector(self, tool: str, zipcode: str, text: str):
+        """
+        The normalized embedding of a query; queries already in the scope reuse their stored vector instead of being embedded again.
+        """
+        with self._lock:
+            self._load()
+            vector = self.scope(tool, zipcode).vector(text)
+        return normalize_rows(self.embedder([text]))[0] if vector is None else vector
+
+    def lookup(self, tool: str, zipcode: str, text: str, vector: np.ndarray, key: str):
+        """
+        Returns (hit, value) for the most similar cached query of the scope that is above the tool's threshold and still has a tool cache entry.
+
+        A query already cached under its own key is left to the tool cache, so exact repeats are counted there and not here.
+        A rephrasing that hits is remembered as an alias of its neighbour, so repeating it skips the embedding and the search.
+        """
+        now = time.time()
+        threshold = self.tool_thresholds.get(tool, self.threshold)
+        with self._lock:
+            self._load()
+            self.purge(now)
+            neighbours = self.scope(tool, zipcode).nearest(vector, now)
+            if neighbours and neighbours[0][1] == text and neighbours[0][2] == key:
+                return False, None
+            self.lookups[tool] = self.lookups.get(tool, 0) + 1
+        for similarity, neighbour, neighbour_key, expires_at in neighbours:
+            if similarity < threshold:
+                break
+            hit, value = toolCache.get(tool, neighbour_key)
+            if hit:
+                with self._lock:
+                    self.hits[tool] = self.hits.get(tool, 0) + 1
+                if neighbour != text:
+                    self.remember(tool, zipcode, text, vector, neighbour_key, expires_at)
+                return True, value
+        return False, None
+
+    def remember(self, tool: str, zipcode: str, text: str, vector: np.ndarray, key: str, expires_at: float = None):
+        """
+        Records a query with the tool cache key of its result; it expires with the tool's cache TTL unless expires_at is given.
+        """
+        expires_at = time.time() + toolCache.ttl(tool) if expires_at is None else expires_at
+        vector = vector.astype(np.float16)
+        with self._lock:
+            self._load()
+            self.scope(tool, zipcode).add(text, vector, key, expires_at)
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO queries (tool, zipcode, text, model, vector, key, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?)", (tool, zipcode, text, self.embedder.name, vector.tobytes(), key, expires_at))
+            conn.commit()
+
+    def remember_safely(self, tool: str, zipcode: str, text: str, vector: np.ndarray, key: str):
+        try:
+            self.remember(tool, zipcode, text, vector, key)
+        except Exception:
+            self.count_error()
+
+    def clear(self, tool: str = None):
+        with self._lock:
+            conn = self._connection()
+            if tool is None:
+                conn.execute("DELETE FROM queries")
+            else:
+                conn.execute("DELETE FROM queries WHERE tool = ?", (tool,))
+            conn.commit()
+            self.scopes = None
+
+    def stats(self):
+        """
+        Returns lookups, semantic hits and the hit rate per tool and in total, plus the number of cached queries.
+        """
+        with self._lock:
+            tools = sorted(set(self.lookups) | set(self.hits))
+            per_tool = {tool: {"lookups": self.lookups.get(tool, 0), "hits": self.hits.get(tool, 0)} for tool in tools}
+            queries = sum(len(scope.keys) for scope in (self.scopes or {}).values())
+            scopes = len(self.scopes or {})
+            errors = self.errors
+        lookups = sum(counts["lookups"] for counts in per_tool.values())
+        hits = sum(counts["hits"] for counts in per_tool.values())
+        return {
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "queries": queries,
+            "scopes": scopes,
+            "errors": errors,
+            "tools": per_tool,
+        }
+
+    def count_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def prepare(self, tool: str, func, args: tuple, kwargs: dict, query_arg: str, zipcode_arg: str):
+        arguments = bind_arguments(func, args, kwargs)
+        text, zipcode = split_zipcode(arguments.get(query_arg) or "", arguments.get(zipcode_arg) if zipcode_arg else None)
+        return ToolCache.make_key(tool, arguments), text, zipcode
+
+    def cached(self, tool: str, query_arg: str = "query", zipcode_arg: str = None):
+        """
+        Decorator that answers near-duplicate queries of a sync or async tool from the tool cache, and records the query of every call it passes through.
+        Place it above toolCache.cached with the same tool name. Exact repeats and queries without a zipcode go straight to the tool cache
+        without an embedding; embedding and storage failures fall through to the tool, so the cache can never fail a call.
+        """
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    key, text, zipcode = self.prepare(tool, func, args, kwargs, query_arg, zipcode_arg)
+                    if not zipcode or toolCache.contains(key):
+                        return await func(*args, **kwargs)
+                    loop = asyncio.get_running_loop()
+                    try:
+                        vector = await loop.run_in_executor(None, self.query_vector, tool, zipcode, text)
+                        hit, value = self.lookup(tool, zipcode, text, vector, key)
+                        if hit:
+                            return value
+                    except Exception:
+                        self.count_error()
+                        return await func(*args, **kwargs)
+                    value = await func(*args, **kwargs)
+                    self.remember_safely(tool, zipcode, text, vector, key)
+                    return value
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key, text, zipcode = self.prepare(tool, func, args, kwargs, query_arg, zipcode_arg)
+                if not zipcode or toolCache.contains(key):
+                    return func(*args, **kwargs)
+                try:
+                    vector = self.query_vector(tool, zipcode, text)
+                    hit, value = self.lookup(tool, zipcode, text, vector, key)
+                    if hit:
+                        return value
+                except Exception:
+                    self.count_error()
+                    return func(*args, **kwargs)
+                value = func(*args, **kwargs)
+                self.remember_safely(tool, zipcode, text, vector, key)
+                return value
+            return wrapper
+        return decorator
+
+
+##### SET CACHE
+semanticCache = SemanticCache()
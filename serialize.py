@@ -0,0 +1,304 @@
+import json
+import random
+import threading
+from urllib.parse import urlsplit, urlunsplit
+from entities import resolve_responses
+from extract import get_encoding
+
+##### SET VARIABLES
+RAW_CONTENT_TOKEN_BUDGET = 3000
+CONTENT_TOKEN_LIMIT = 120
+MEASURE_SAMPLE_RATE = 0.05
+
+
+###### FUNCTIONS
+def count_tokens(text: str):
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int):
+    """
+    Cuts text down to at most max_tokens tokens, marking the cut with an ellipsis.
+    """
+    if not text or max_tokens <= 0:
+        return ""
+    tokens = get_encoding().encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return get_encoding().decode(tokens[:max_tokens]).rstrip() + " …"
+
+
+def normalize_url(url: str):
+    """
+    Normalizes a URL for de-duplication: lowercase scheme and host, no fragment, no trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/")
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme, parts.netloc.lower().removeprefix("www."), path, parts.query, ""))
+
+
+def strip_query(url: str):
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+
+def drop_empty(record: dict):
+    return {key: value for key, value in record.items() if value not in (None, "", [], {})}
+
+
+def is_status(response):
+    return isinstance(response, dict) and response.get("status") in ("timed_out", "failed")
+
+
+def compact_research(response: dict, token_budget: int):
+    """
+    Keeps the Tavily answer and each result's title, url and content. Responses that already carry extracted passages keep those;
+    otherwise raw_content is cut to share token_budget across the results in score order.
+    """
+    results = response.get("results", [])
+    if "passages" in response:
+        compact_results = [drop_empty({"title": result.get("title"), "url": result.get("url"), "content": truncate_tokens(result.get("content") or "", CONTENT_TOKEN_LIMIT)}) for result in results]
+        passages = [{"url": passage["url"], "text": passage["text"]} for passage in response["passages"]]
+        return drop_empty({"answer": response.get("answer"), "results": compact_results, "passages": passages})
+    compact_results = []
+    remaining_budget = token_budget
+    for index, result in enumerate(results):
+        page_budget = remaining_budget // (len(results) - index)
+        raw_content = truncate_tokens(result.get("raw_content") or "", page_budget)
+        if raw_content:
+            remaining_budget -= count_tokens(raw_content)
+        compact_results.append(drop_empty({
+            "title": result.get("title"),
+            "url": result.get("url"),
+            "content": truncate_tokens(result.get("content") or "", CONTENT_TOKEN_LIMIT),
+            "raw_content": raw_content,
+        }))
+    return drop_empty({"answer": response.get("answer"), "results": compact_results})
+
+
+def search_result_field(result, field: str):
+    if isinstance(result, dict):
+        return result.get(field)
+    return getattr(result, field, None)
+
+
+def search_result_record(result):
+    """
+    A googlesearch result as a plain url/title/description dict, so it can be cached, spilled and stored as JSON. Plain URLs are kept as they are.
+    """
+    if isinstance(result, str):
+        return result
+    return {"url": search_result_field(result, "url"), "title": search_result_field(result, "title"), "description": search_result_field(result, "description")}
+
+
+def compact_search(response: list, seen_urls: set):
+    """
+    Keeps url, title and description for each googlesearch result whose URL was not already returned by internet_research.
+    """
+    compact_results = []
+    for result in response:
+        url = result if isinstance(result, str) else search_result_field(result, "url")
+        if not url or normalize_url(url) in seen_urls:
+            continue
+        seen_urls.add(normalize_url(url))
+        if isinstance(result, str):
+            compact_results.append({"url": url})
+        else:
+            compact_results.append(drop_empty({"url": url, "title": search_result_field(result, "title"), "description": search_result_field(result, "description")}))
+    return compact_results
+
+
+def compact_places(response: dict):
+    """
+    Keeps the Google Places fields used for underwriting: name, address, location, rating, status and types.
+    """
+    compact_results = []
+    for place in response.get("results", []):
+        location = place.get("geometry", {}).get("location", {})
+        compact_results.append(drop_empty({
+            "place_id": place.get("place_id"),
+            "name": place.get("name"),
+            "address": place.get("formatted_address"),
+            "lat": location.get("lat"),
+            "lng": location.get("lng"),
+            "rating": place.get("rating"),
+            "ratings": place.get("user_ratings_total"),
+            "business_status": place.get("business_status"),
+            "types": place.get("types"),
+        }))
+    return compact_results
+
+
+def compact_yelp(response: list):
+    """
+    Keeps the Yelp business fields used for underwriting, with tracking parameters stripped from the URL.
+    """
+    compact_results = []
+    for business in response:
+        location = business.get("location") or {}
+        coordinates = business.get("coordinates") or {}
+        compact_results.append(drop_empty({
+            "id": business.get("id"),
+            "name": business.get("name"),
+            "address": ", ".join(location.get("display_address", [])),
+            "lat": coordinates.get("latitude"),
+            "lng": coordinates.get("longitude"),
+            "phone": business.get("display_phone"),
+            "rating": business.get("rating"),
+            "reviews": business.get("review_count"),
+            "categories": [category.get("title") for category in business.get("categories", [])],
+            "is_closed": business.get("is_closed") or None,
+            "url": strip_query(business["url"]) if business.get("url") else None,
+        }))
+    return compact_results
+
+
+def compact_entities(entities):
+    """
+    Converts the resolved entity frame into compact records, keeping each source's id, rating and review count for provenance.
+    """
+    compact_results = []
+    for entity in entities.astype(object).where(entities.notna(), None).to_dict("records"):
+        compact_results.append(drop_empty({
+            "name": entity["name"],
+            "address": entity["address"],
+            "lat": None if entity["lat"] is None else round(entity["lat"], 6),
+            "lng": None if entity["lng"] is None else round(entity["lng"], 6),
+            "phone": entity["phone"],
+            "sources": entity["sources"],
+            "place_id": entity["place_id"],
+            "yelp_id": entity["yelp_id"],
+            "google_rating": entity["google_rating"],
+            "google_ratings": entity["google_ratings"],
+            "yelp_rating": entity["yelp_rating"],
+            "yelp_reviews": entity["yelp_reviews"],
+            "business_status": entity["business_status"],
+            "is_closed": entity["is_closed"] or None,
+            "types": entity["types"],
+            "categories": entity["categories"],
+            "url": strip_query(entity["url"]) if entity["url"] else None,
+        }))
+    return compact_results
+
+
+def compact_search_results(responses: dict, token_budget: int = RAW_CONTENT_TOKEN_BUDGET, merge_entities: bool = True, page_passages: list = None):
+    """
+    Serializes the execute_all_tasks responses as compact JSON for the assistant.
+
+    Fields the assistant never uses are dropped, URLs already returned by internet_research are removed from internet_search,
+    and Tavily raw content is truncated to share token_budget tokens. Sources reported as timed out or failed are passed through.
+    With merge_entities, Google Places and Yelp listings of the same business are merged into one "businesses" list with source provenance
+    instead of two separate lists.
+
+    Args:
+        responses (dict): The responses keyed by source, as returned by AsyncTools.execute_all_tasks.
+        token_budget (int): The total number of tokens of raw page content to keep.
+        merge_entities (bool): Whether to resolve Places and Yelp results into one deduplicated business list.
+        page_passages (list): Relevant passages extracted from the internet_search pages, added as "page_passages".
+
+    Returns:
+        str: The compact JSON string.
+    """
+    compact = {}
+    seen_urls = set()
+
+    research = responses.get("internet_research")
+    if research is not None:
+        compact["internet_research"] = research if is_status(research) else compact_research(research, token_budget)
+        for result in compact["internet_research"].get("results", []):
+            if result.get("url"):
+                seen_urls.add(normalize_url(result["url"]))
+
+    search = responses.get("internet_search")
+    if search is not None:
+        compact["internet_search"] = search if is_status(search) else compact_search(search, seen_urls)
+
+    places = responses.get("google_places_search")
+    yelp = responses.get("yelp_search")
+    if merge_entities:
+        for name, response in (("google_places_search", places), ("yelp_search", yelp)):
+            if is_status(response):
+                compact[name] = response
+        if any(response is not None and not is_status(response) for response in (places, yelp)):
+            compact["businesses"] = compact_entities(resolve_responses(responses))
+    else:
+        if places is not None:
+            compact["google_places_search"] = places if is_status(places) else compact_places(places)
+        if yelp is not None:
+            compact["yelp_search"] = yelp if is_status(yelp) else compact_yelp(yelp)
+
+    if page_passages:
+        compact["page_passages"] = [{"url": passage["url"], "text": passage["text"]} for passage in page_passages]
+
+    return json.dumps(compact, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def measure_serialization(responses: dict, compact_output: str):
+    """
+    Compares the old repr-based tool output with the compact serialization in characters and tokens.
+    """
+    legacy_output = f"All Search Results: {responses}"
+    legacy_tokens = count_tokens(legacy_output)
+    compact_tokens = count_tokens(compact_output)
+    return {
+        "legacy_chars": len(legacy_output),
+        "compact_chars": len(compact_output),
+        "legacy_tokens": legacy_tokens,
+        "compact_tokens": compact_tokens,
+        "token_reduction": 1 - compact_tokens / legacy_tokens if legacy_tokens else 0.0,
+    }
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Serialization Stats
+class SerializationStats:
+    """
+    Running totals of legacy vs compact output size across calls.
+    """
+    def __init__(self, sample_rate: float = MEASURE_SAMPLE_RATE):
+        self._lock = threading.Lock()
+        self.sample_rate = sample_rate
+        self.errors = 0
+        self.calls = 0
+        self.totals = {"legacy_chars": 0, "compact_chars": 0, "legacy_tokens": 0, "compact_tokens": 0}
+        self.last = None
+
+    def record(self, metrics: dict):
+        with self._lock:
+            self.calls += 1
+            for key in self.totals:
+                self.totals[key] += metrics[key]
+            self.last = metrics
+
+    def sample(self, responses: dict, compact_output: str):
+        """
+        Measures a sample_rate share of calls. Re-serializing and tokenizing both outputs costs more than the search bundle's own
+        serialization, and a tokenizer failure must never fail the search, so errors are only counted.
+        """
+        if random.random() >= self.sample_rate:
+            return
+        try:
+            metrics = measure_serialization(responses, compact_output)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            return
+        self.record(metrics)
+
+    def summary(self):
+        with self._lock:
+            totals = dict(self.totals)
+            calls = self.calls
+            last = self.last
+        return {
+            "calls": calls,
+            "errors": self.errors,
+            **totals,
+            "token_reduction": 1 - totals["compact_tokens"] / totals["legacy_tokens"] if totals["legacy_tokens"] else 0.0,
+            "last": last,
+        }
+
+
+##### SET STATS
+serializationStats = SerializationStats()
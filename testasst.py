@@ -1,28 +1,197 @@
 import streamlit as st
-from openai import OpenAI as openai_client
-from tavily import TavilyClient as tavily_client
-from supabase import create_client as supabase_client
-from googlemaps import places, geocoding, addressvalidation, Client as google_client
+from googlemaps import places, geocoding, addressvalidation
 from googlesearch import search
-from yelpapi import YelpAPI as yelp_client
 import time
 import json
 import datetime
 from typing import Literal
 import pandas as pd
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from cache import toolCache
+from coalesce import singleFlight
+from semantic_cache import semanticCache
+from resilience import resiliencePolicies
+from metrics import metricsRegistry, add_payload_bytes
+from clients import clientRegistry
+from background import backgroundLoop, currentChannel
+from toolspec import tool, ToolRegistry
+from yelp_frame import YelpFrameBuilder
+from serialize import compact_search_results, serializationStats, search_result_field, search_result_record, normalize_url
+from extract import extractionPool, research_passages, research_passages_async, select_passages
+import async_clients
+from search_index import searchIndex
 
 ##### SET CLIENTS
-oaiClient = openai_client(api_key=st.secrets.openai.api_key)
-supaClient = supabase_client(supabase_key=st.secrets.supabase.api_key_admin, supabase_url=st.secrets.supabase.url)
-yelpClient = yelp_client(api_key=st.secrets.yelp.api_key)
-googClient = google_client(key=st.secrets.google.maps_api_key)
-tavClient = tavily_client(api_key=st.secrets.tavily.api_key)
+# Clients are built by the registry on first use, so importing this module does no network work
+oaiClient = clientRegistry.proxy("openai")
+asyncOaiClient = clientRegistry.proxy("openai_async")
+supaClient = clientRegistry.proxy("supabase")
+yelpClient = clientRegistry.proxy("yelp")
+googClient = clientRegistry.proxy("google")
+tavClient = clientRegistry.proxy("tavily")
+# Async-native transports for AsyncTools: one pooled HTTP/2 client on the event loop instead of a thread per request
+asyncTavClient = clientRegistry.proxy("tavily_async")
+asyncGoogClient = clientRegistry.proxy("google_async")
+asyncYelpClient = clientRegistry.proxy("yelp_async")
+asyncHttpClient = clientRegistry.proxy("http_async")
 
 ##### SET VARIABLES
-assistantid = st.secrets.openai.assistant_id
-thread = oaiClient.beta.threads.create()
-threadid = thread.id
+def get_assistant_id():
+    return st.secrets.openai.assistant_id
+
+def start_thread():
+    """
+    Creates the assistant thread for a new conversation. Call it when the first message is sent, not at import.
+    """
+    with metricsRegistry.span("openai", "threads.create"):
+        thread = oaiClient.beta.threads.create()
+    return thread.id
+
+
+##### HELPERS
+SEARCH_DEADLINE = 20.0
+SOURCE_TIMEOUTS = {
+    "internet_search": 10.0,
+    "internet_research": 18.0,
+    "google_places_search": 8.0,
+    "yelp_search": 8.0
+}
+
+PAGE_FETCH_LIMIT = 4
+PAGE_FETCH_TIMEOUT = 6.0
+PAGE_MAX_BYTES = 2_000_000
+PAGE_PASSAGE_TOKEN_BUDGET = 1500
+PAGE_CONTENT_TYPES = ("text/html", "text/plain", "application/xhtml+xml")
+
+SUGGEST_PROMPTS_MODEL = "gpt-4o-mini"
+# Built once and sent unchanged as the leading messages of every request, so provider-side prompt caching can match the prefix
+SUGGEST_PROMPTS_PREFIX = tuple([{"role":"system","content":[{"type":"text","text":"Return 4 suggested prompts based on the provided user prompt and assistant response and return them in a json output. \n\nOUTPUT: \n {\"suggestedprompt1\": \"prompt1\", \"suggestedprompt2\": \"prompt2\", \"suggestedprompt3\": \"prompt3\", \"suggestedprompt4\": \"prompt4\"}"}]},{"role":"user","content":[{"type":"text","text":"{\"prompt\": \"Research about calling someone a \\\"chad\\\" means. Then explain why you are a chad\", \"response\": \"Calling someone a \\\"Chad\\\" typically refers to a stereotypical alpha male characterized as attractive, successful, muscular, cocky, and popular among women. The term originated as a pejorative for an airheaded alpha male who excelled with women. In online communities like incel forums, a Chad is viewed as a sexually active, genetically superior man, often representing the pinnacle of genetic fitness. The term can carry both positive and negative connotations in internet culture, symbolizing confidence, charisma, and social prowess.\nWhy I am a \\\"Chad\\\":\nAs your research assistant, I embody the positive aspects of a \\\"Chad\\\" by being confident, knowledgeable, and efficient in providing you with the information you need. My capabilities allow me to navigate the vast expanse of the internet with ease, ensuring that I deliver accurate and relevant results, much like how a \\\"Chad\\\" would confidently handle any situation.\"}"}]},{"role":"assistant","content":[{"type":"text","text":"{\"suggestedprompt1\": \"Can you provide more examples of popular Chad memes?\", \"suggestedprompt2\": \"What are some other internet slang terms similar to 'Chad'?\", \"suggestedprompt3\": \"How has the term 'Chad' evolved over time in internet culture?\", \"suggestedprompt4\": \"Can you explain the 'Virgin vs. Chad' meme in more detail?\"}"}]}])
+
+def get_suggest_prompts_model():
+    return st.secrets.openai.get("suggest_prompts_model", SUGGEST_PROMPTS_MODEL)
+
+def suggest_prompts_request(user_prompt: str, assistant_response: str, model: str = None):
+    """
+    Returns the chat.completions.create keyword arguments for suggest_prompts; only the final user message varies between calls.
+    """
+    content = f"User Prompt: {user_prompt} \n\nAssistant Response: {assistant_response}"
+    return {
+        "messages": [*SUGGEST_PROMPTS_PREFIX, {"role": "user", "content": content}],
+        "model": model or get_suggest_prompts_model(),
+        "temperature": 0,
+        "max_tokens": 400,
+        "response_format": {"type": "json_object"}
+    }
+
+async def fetch_page(url: str):
+    """
+    Downloads one internet_search result page, returning its decoded text, or None for non-text content.
+    """
+    with metricsRegistry.span("tool", "fetch_page"):
+        return await asyncHttpClient.fetch_text(url, PAGE_CONTENT_TYPES, PAGE_MAX_BYTES, PAGE_FETCH_TIMEOUT)
+
+def research_urls(responses: dict):
+    """
+    The normalized URLs of the pages internet_research returned, or an empty set if it has not finished or failed.
+    """
+    research = responses.get("internet_research")
+    if not isinstance(research, dict):
+        return set()
+    return {normalize_url(result["url"]) for result in research.get("results", []) if result.get("url")}
+
+def search_page_urls(responses: dict, limit: int = PAGE_FETCH_LIMIT):
+    """
+    The first internet_search result URLs whose pages internet_research did not already return.
+    """
+    search_results = responses.get("internet_search")
+    if not isinstance(search_results, list):
+        return []
+    seen = research_urls(responses)
+    urls = []
+    for result in search_results:
+        url = result if isinstance(result, str) else search_result_field(result, "url")
+        if url and normalize_url(url) not in seen:
+            seen.add(normalize_url(url))
+            urls.append(url)
+    return urls[:limit]
+
+YELP_PAGE_LIMIT = 50
+YELP_MAX_RESULTS = 1000  # Yelp Fusion rejects any offset + limit above 1000
+
+def yelp_search_businesses(executor: ThreadPoolExecutor, query: str, zipcode: str, all_pages: bool = False):
+    """
+    Runs the Yelp search and, when all_pages is set, fetches every remaining page concurrently on the executor.
+    Pages are concatenated in offset order and businesses repeated across pages are dropped.
+    """
+    if not all_pages:
+        return resiliencePolicies.call("yelp_query_search", lambda: yelpClient.search_query(term=query, location=zipcode))['businesses']
+
+    first_page = resiliencePolicies.call("yelp_query_search", lambda: yelpClient.search_query(term=query, location=zipcode, limit=YELP_PAGE_LIMIT, offset=0))
+    total = min(first_page.get('total', 0), YELP_MAX_RESULTS)
+    offsets = range(YELP_PAGE_LIMIT, total, YELP_PAGE_LIMIT)
+    pages = executor.map(lambda offset: resiliencePolicies.call("yelp_query_search", lambda: yelpClient.search_query(term=query, location=zipcode, limit=min(YELP_PAGE_LIMIT, total - offset), offset=offset))['businesses'], offsets)
+
+    businesses = []
+    seen_ids = set()
+    for page in [first_page['businesses'], *pages]:
+        for business in page:
+            if business.get('id') in seen_ids:
+                continue
+            seen_ids.add(business.get('id'))
+            businesses.append(business)
+    return businesses
+
+def yelp_business_details(business: dict):
+    """
+    Looks up the Yelp details for one business and returns (detailed_info, error) so one failed lookup does not fail the whole search.
+    """
+    try:
+        return Tools.yelp_business_search(business.get('id')), None
+    except Exception as e:
+        return {}, f"{type(e).__name__}: {e}"
+
+def yelp_business_record(business: dict, detailed_info: dict):
+    """
+    Flattens a Yelp search result and its detail lookup into one DataFrame row.
+    """
+    business_record = {
+        'id': business.get('id'),
+        'alias': business.get('alias'),
+        'name': business.get('name'),
+        'image_url': business.get('image_url'),
+        'is_closed': business.get('is_closed'),
+        'url': business.get('url'),
+        'review_count': business.get('review_count'),
+        'rating': business.get('rating'),
+        'latitude': business['coordinates'].get('latitude') if business.get('coordinates') else None,
+        'longitude': business['coordinates'].get('longitude') if business.get('coordinates') else None,
+        'phone': business.get('phone'),
+        'display_phone': business.get('display_phone'),
+        'distance': business.get('distance'),
+        'address1': business['location'].get('address1') if business.get('location') else None,
+        'address2': business['location'].get('address2') if business.get('location') else None,
+        'address3': business['location'].get('address3') if business.get('location') else None,
+        'city': business['location'].get('city') if business.get('location') else None,
+        'zip_code': business['location'].get('zip_code') if business.get('location') else None,
+        'country': business['location'].get('country') if business.get('location') else None,
+        'state': business['location'].get('state') if business.get('location') else None,
+        'display_address': ", ".join(business['location'].get('display_address', [])) if business.get('location') else None,
+        'is_claimed': detailed_info.get('is_claimed'),
+        'cross_streets': detailed_info['location'].get('cross_streets') if detailed_info.get('location') else None,
+        'photos': ", ".join(detailed_info.get('photos', [])),
+        'hours': detailed_info.get('hours', [{}])[0].get('open', []),
+        'is_open_now': detailed_info.get('hours', [{}])[0].get('is_open_now'),
+        'transactions': ", ".join(detailed_info.get('transactions', []))
+    }
+    
+    # Add categories to the record
+    categories = business.get('categories', [])
+    category_aliases = [cat['alias'] for cat in categories]
+    category_titles = [cat['title'] for cat in categories]
+    business_record['categories_alias'] = ", ".join(category_aliases)
+    business_record['categories_title'] = ", ".join(category_titles)
+    return business_record
 
 
 
@@ -31,39 +200,76 @@ threadid = thread.id
 # 1. Tools
 class Tools:
     @staticmethod
+    @tool(concurrent_safe=True)
+    @metricsRegistry.timed("execute_all_searches")
     def execute_all_searches(query: str, zipcode: str):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        responses = loop.run_until_complete(AsyncTools.execute_all_tasks(query, zipcode))
-        responses_content = f"All Search Results: {responses}"
+        """
+        Executes internet_search, internet_research, google_places_search, and yelp_search asynchronously and returns all the responses, with the Google Places and Yelp listings merged into one deduplicated list of businesses
+        and the most relevant passages of the top internet_search pages.
+
+        Args:
+            query (str): The search query.
+            zipcode (str): The zipcode for the Yelp search.
+
+        Returns:
+            str: The compact JSON results keyed by source.
+        """
+        # Inside an assistant run that wants progress, each source is published as it finishes and the searches can be cancelled from the page
+        channel = currentChannel.get()
+        if channel is None:
+            responses, page_passages = backgroundLoop.run(AsyncTools.search_with_passages(query, zipcode))
+        else:
+            responses, page_passages = channel.run(AsyncTools.search_with_passages(query, zipcode, on_result=channel.publish))
+        responses_content = compact_search_results(responses, page_passages=page_passages)
+        serializationStats.sample(responses, responses_content)
         return responses_content
     
     @staticmethod
-    def suggest_prompts(user_prompt: str, assistant_response: str):
+    @tool(concurrent_safe=True)
+    @metricsRegistry.timed("search_past_results")
+    def search_past_results(query: str):
+        """
+        Searches earlier conversations and previously retrieved internet research, Google Places and Yelp results. Use it before running new searches on a business that may have been looked up already.
+
+        Args:
+            query (str): The business name, address or question to look up.
+
+        Returns:
+            str: JSON list of matching past results with their kind, title, snippet, reference and when they were indexed.
+        """
+        results = searchIndex.search(query)
+        for result in results:
+            result["indexed_at"] = datetime.datetime.fromtimestamp(result.pop("updated_at")).isoformat(timespec="seconds")
+        return json.dumps(results, separators=(",", ":"))
+    
+    @staticmethod
+    @tool(concurrent_safe=True, exclude=("model",))
+    @metricsRegistry.timed("suggest_prompts")
+    @resiliencePolicies.resilient("suggest_prompts")
+    def suggest_prompts(user_prompt: str, assistant_response: str, model: str = None):
         """
         Suggests four follow-up prompts based on the provided user prompt and assistant response.
 
         Args:
             user_prompt (str): The initial prompt provided by the user.
             assistant_response (str): The response provided by the assistant.
+            model (str): The chat model to use; defaults to the configured suggest_prompts model.
 
         Returns:
             dict: A dictionary containing four suggested prompts.
         """
-        messages = [{"role":"system","content":[{"type":"text","text":"Return 4 suggested prompts based on the provided user prompt and assistant response and return them in a json output. \n\nOUTPUT: \n {\"suggestedprompt1\": \"prompt1\", \"suggestedprompt2\": \"prompt2\", \"suggestedprompt3\": \"prompt3\", \"suggestedprompt4\": \"prompt4\"}"}]},{"role":"user","content":[{"type":"text","text":"{\"prompt\": \"Research about calling someone a \\\"chad\\\" means. Then explain why you are a chad\", \"response\": \"Calling someone a \\\"Chad\\\" typically refers to a stereotypical alpha male characterized as attractive, successful, muscular, cocky, and popular among women. The term originated as a pejorative for an airheaded alpha male who excelled with women. In online communities like incel forums, a Chad is viewed as a sexually active, genetically superior man, often representing the pinnacle of genetic fitness. The term can carry both positive and negative connotations in internet culture, symbolizing confidence, charisma, and social prowess.\nWhy I am a \\\"Chad\\\":\nAs your research assistant, I embody the positive aspects of a \\\"Chad\\\" by being confident, knowledgeable, and efficient in providing you with the information you need. My capabilities allow me to navigate the vast expanse of the internet with ease, ensuring that I deliver accurate and relevant results, much like how a \\\"Chad\\\" would confidently handle any situation.\"}"}]},{"role":"assistant","content":[{"type":"text","text":"{\"suggestedprompt1\": \"Can you provide more examples of popular Chad memes?\", \"suggestedprompt2\": \"What are some other internet slang terms similar to 'Chad'?\", \"suggestedprompt3\": \"How has the term 'Chad' evolved over time in internet culture?\", \"suggestedprompt4\": \"Can you explain the 'Virgin vs. Chad' meme in more detail?\"}"}]}]
-        model = "gpt-4o"
-        temperature = 0
-        max_tokens = 400
-        response_format = {"type": "json_object"}
-        content = f"User Prompt: {user_prompt} \n\nAssistant Response: {assistant_response}"
-        user_message = {"role": "user", "content": content}
-        messages.append(user_message)
-        response = oaiClient.chat.completions.create(messages=messages, model=model, temperature=temperature, max_tokens=max_tokens, response_format=response_format)
+        request = suggest_prompts_request(user_prompt, assistant_response, model)
+        with metricsRegistry.span("openai", "chat.completions"):
+            response = oaiClient.chat.completions.create(**request)
         response_content = response.choices[0].message.content
+        add_payload_bytes(len(response_content))
         response_json = json.loads(response_content)
         return response_json
     
     @staticmethod
+    @tool(concurrent_safe=True)
+    @metricsRegistry.timed("internet_search")
+    @resiliencePolicies.resilient("internet_search")
     def internet_search(query: str):
         """
         Performs an internet search using the provided query and returns a list of search results.
@@ -72,13 +278,20 @@ class Tools:
             query (str): The search query.
 
         Returns:
-            list: A list of URLs corresponding to the search results.
+            list: A list of search results, each a dict with url, title and description.
         """
         response = search(term = query, advanced=True)
-        responselist = list(response)
+        responselist = [search_result_record(result) for result in response]
         return responselist
     
     @staticmethod
+    @tool(concurrent_safe=True, cacheable=True)
+    @metricsRegistry.timed("internet_research")
+    @singleFlight.coalesced("internet_research")
+    @semanticCache.cached("internet_research")
+    @toolCache.cached("internet_research")
+    @searchIndex.indexed("internet_research")
+    @resiliencePolicies.resilient("internet_research")
     def internet_research(query: str):
         """
         Performs advanced internet research using the provided query and returns the results.
@@ -87,12 +300,19 @@ class Tools:
             query (str): The research query.
 
         Returns:
-            dict: The research results, including answers and raw content.
+            dict: The research results, including the answer and the page passages most relevant to the query.
         """
         response = tavClient.search(query=query, search_depth="advanced", max_results=7, include_answer=True, include_raw_content=True)
-        return response
+        return research_passages(query, response)
     
     @staticmethod
+    @tool(concurrent_safe=True, cacheable=True)
+    @metricsRegistry.timed("google_places_search")
+    @singleFlight.coalesced("google_places_search")
+    @semanticCache.cached("google_places_search")
+    @toolCache.cached("google_places_search")
+    @searchIndex.indexed("google_places_search")
+    @resiliencePolicies.resilient("google_places_search")
     def google_places_search(query: str):
         """
         Searches for business information using Google Places to gather details on location, ratings, and more.
@@ -107,6 +327,11 @@ class Tools:
         return response
     
     @staticmethod
+    @tool(concurrent_safe=True, cacheable=True)
+    @metricsRegistry.timed("google_address_validation")
+    @singleFlight.coalesced("google_address_validation")
+    @toolCache.cached("google_address_validation")
+    @resiliencePolicies.resilient("google_address_validation")
     def google_address_validation(address_lines: list):
         """
         Validates business addresses using Google Address Validation to ensure accuracy for insurance documentation.
@@ -121,6 +346,11 @@ class Tools:
         return response
     
     @staticmethod
+    @tool(concurrent_safe=True, cacheable=True)
+    @metricsRegistry.timed("google_geocode")
+    @singleFlight.coalesced("google_geocode")
+    @toolCache.cached("google_geocode")
+    @resiliencePolicies.resilient("google_geocode")
     def google_geocode(address_lines: list):
         """
         Geocodes business addresses using Google Geocoding to obtain latitude and longitude for location verification.
@@ -135,6 +365,11 @@ class Tools:
         return response
     
     @staticmethod
+    @tool(concurrent_safe=True, cacheable=True)
+    @metricsRegistry.timed("yelp_query_search")
+    @singleFlight.coalesced("yelp_query_search")
+    @toolCache.cached("yelp_query_search")
+    @resiliencePolicies.resilient("yelp_query_search")
     def yelp_query_search(query: str, zipcode: str):
         """
         Performs a search query using Yelp to find businesses based on term and location, useful for insurance research.
@@ -151,6 +386,11 @@ class Tools:
         return businesses
 
     @staticmethod
+    @tool(concurrent_safe=True, cacheable=True)
+    @metricsRegistry.timed("yelp_business_search")
+    @singleFlight.coalesced("yelp_business_search")
+    @toolCache.cached("yelp_business_search")
+    @resiliencePolicies.resilient("yelp_business_search")
     def yelp_business_search(business_id: str):
         """
         Searches for detailed information about a business using its Yelp ID to gather in-depth data for insurance purposes.
@@ -165,298 +405,217 @@ class Tools:
         return response
     
     @staticmethod
-    def yelp_search(query: str, zipcode: str):
+    @tool(concurrent_safe=True, exclude=("max_concurrency", "all_pages", "output"))
+    @metricsRegistry.timed("yelp_search")
+    @singleFlight.coalesced("yelp_search")
+    @searchIndex.indexed("yelp_search")
+    def yelp_search(query: str, zipcode: str, max_concurrency: int = 8, all_pages: bool = False, output: Literal["legacy", "typed", "arrow"] = "legacy"):
         """
         Performs a search query using Yelp and retrieves detailed information for each business, aggregating useful data for insurance analysis.
         
         Parameters:
             query (str): The search query describing the type of business.
             zipcode (str): The zipcode of the business location.
+            max_concurrency (int): The maximum number of Yelp requests in flight at once.
+            all_pages (bool): Whether to page through every result with offset/limit instead of only the first page.
+            output (str): "legacy" for the string-joined columns, "typed" for typed columns with real lists, or "arrow" for the Arrow-backed typed frame.
         
         Returns:
-            pd.DataFrame: A DataFrame containing detailed information about the businesses.
+            pd.DataFrame: A DataFrame containing detailed information about the businesses. Business ids whose detail lookup failed are listed in `df.attrs['detail_errors']`.
         """
-        business_records = []
-        businesses = yelpClient.search_query(term=query, location=zipcode)['businesses']
-        
-        for business in businesses:
-            business_id = business.get('id')
-            detailed_info = yelpClient.business_query(id=business_id)
-            business_record = {
-                'id': business.get('id'),
-                'alias': business.get('alias'),
-                'name': business.get('name'),
-                'image_url': business.get('image_url'),
-                'is_closed': business.get('is_closed'),
-                'url': business.get('url'),
-                'review_count': business.get('review_count'),
-                'rating': business.get('rating'),
-                'latitude': business['coordinates'].get('latitude') if business.get('coordinates') else None,
-                'longitude': business['coordinates'].get('longitude') if business.get('coordinates') else None,
-                'phone': business.get('phone'),
-                'display_phone': business.get('display_phone'),
-                'distance': business.get('distance'),
-                'address1': business['location'].get('address1') if business.get('location') else None,
-                'address2': business['location'].get('address2') if business.get('location') else None,
-                'address3': business['location'].get('address3') if business.get('location') else None,
-                'city': business['location'].get('city') if business.get('location') else None,
-                'zip_code': business['location'].get('zip_code') if business.get('location') else None,
-                'country': business['location'].get('country') if business.get('location') else None,
-                'state': business['location'].get('state') if business.get('location') else None,
-                'display_address': ", ".join(business['location'].get('display_address', [])) if business.get('location') else None,
-                'is_claimed': detailed_info.get('is_claimed'),
-                'cross_streets': detailed_info['location'].get('cross_streets') if detailed_info.get('location') else None,
-                'photos': ", ".join(detailed_info.get('photos', [])),
-                'hours': detailed_info.get('hours', [{}])[0].get('open', []),
-                'is_open_now': detailed_info.get('hours', [{}])[0].get('is_open_now'),
-                'transactions': ", ".join(detailed_info.get('transactions', []))
-            }
-            
-            # Add categories to the record
-            categories = business.get('categories', [])
-            category_aliases = [cat['alias'] for cat in categories]
-            category_titles = [cat['title'] for cat in categories]
-            business_record['categories_alias'] = ", ".join(category_aliases)
-            business_record['categories_title'] = ", ".join(category_titles)
-
-            business_records.append(business_record)
-        yelp_business_records_df = pd.DataFrame(business_records)
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            businesses = yelp_search_businesses(executor, query, zipcode, all_pages)
+            detail_results = list(executor.map(yelp_business_details, businesses))
+
+        detail_errors = {business.get('id'): error for business, (detailed_info, error) in zip(businesses, detail_results) if error is not None}
+        if output == "legacy":
+            business_records = [yelp_business_record(business, detailed_info) for business, (detailed_info, error) in zip(businesses, detail_results)]
+            yelp_business_records_df = pd.DataFrame(business_records)
+        else:
+            builder = YelpFrameBuilder(len(businesses))
+            for business, (detailed_info, error) in zip(businesses, detail_results):
+                builder.add(business, detailed_info)
+            yelp_business_records_df = builder.to_frame(arrow=output == "arrow")
+        yelp_business_records_df.attrs['detail_errors'] = detail_errors
         return yelp_business_records_df
-    
-    
-    
-    @staticmethod
-    def function():
-        return
 
-    @staticmethod
-    def function():
-        return
-    
-    @staticmethod
-    def function():
-        return
+# Dispatch table built once from the @tool-marked Tools methods
+toolRegistry = ToolRegistry.from_class(Tools)
 
 #__________________________________________________________________________________________
 # 2. Tool Schemas
 class ToolSchemas:
-    suggest_prompts = {
-        "name": "suggest_prompts",
-        "description": "Suggests four follow-up prompts based on the provided user prompt and assistant response.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-            "user_prompt": {
-                "type": "string",
-                "description": "The initial prompt provided by the user."
-            },
-            "assistant_response": {
-                "type": "string",
-                "description": "The response provided by the assistant."
-            }
-            },
-            "required": ["user_prompt", "assistant_response"]
-        }
-        }
+    """
+    Function schemas generated from the Tools signatures and docstrings at registration; one attribute per tool plus `all` for the assistant definition.
+    """
+    all = toolRegistry.schemas
 
-
-    internet_search = {
-        "name": "internet_search",
-        "description": "Performs an internet search using the provided query and returns a list of search results.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-            "query": {
-                "type": "string",
-                "description": "The search query."
-            }
-            },
-            "required": ["query"]
-        }
-        }
-
-    internet_research = {
-        "name": "internet_research",
-        "description": "Performs advanced internet research using the provided query and returns the results.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-            "query": {
-                "type": "string",
-                "description": "The research query."
-            }
-            },
-            "required": ["query"]
-        }
-        }
-
-    google_places_search = {
-        "name": "google_places_search",
-        "description": "Searches for business information using Google Places to gather details on location, ratings, and more.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-            "query": {
-                "type": "string",
-                "description": "The search query describing the business."
-            }
-            },
-            "required": ["query"]
-        }
-        }
-
-    google_address_validation = {
-        "name": "google_address_validation",
-        "description": "Validates business addresses using Google Address Validation to ensure accuracy for insurance documentation.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-            "address_lines": {
-                "type": "array",
-                "items": {
-                "type": "string"
-                },
-                "description": "The address lines to be validated."
-            }
-            },
-            "required": ["address_lines"]
-        }
-        }
-
-    google_geocode = {
-        "name": "google_geocode",
-        "description": "Geocodes business addresses using Google Geocoding to obtain latitude and longitude for location verification.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-            "address_lines": {
-                "type": "array",
-                "items": {
-                "type": "string"
-                },
-                "description": "The address lines to be geocoded."
-            }
-            },
-            "required": ["address_lines"]
-        }
-        }
-
-    yelp_query_search = {
-        "name": "yelp_query_search",
-        "description": "Performs a search query using Yelp to find businesses based on term and location, useful for insurance research.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-            "query": {
-                "type": "string",
-                "description": "The search query describing the type of business."
-            },
-            "zipcode": {
-                "type": "string",
-                "description": "The zipcode of the business location."
-            }
-            },
-            "required": ["query", "zipcode"]
-        }
-        }
-
-    yelp_business_search = {
-        "name": "yelp_business_search",
-        "description": "Searches for detailed information about a business using its Yelp ID to gather in-depth data for insurance purposes.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-            "business_id": {
-                "type": "string",
-                "description": "The Yelp ID of the business."
-            }
-            },
-            "required": ["business_id"]
-        }
-        }
-
-    yelp_search = {
-        "name": "yelp_search",
-        "description": "Performs a search query using Yelp and retrieves detailed information for each business, aggregating useful data for insurance analysis.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-            "query": {
-                "type": "string",
-                "description": "The search query describing the type of business."
-            },
-            "zipcode": {
-                "type": "string",
-                "description": "The zipcode of the business location."
-            }
-            },
-            "required": ["query", "zipcode"]
-        }
-        }
-
-    execute_all_searches = {
-        "name": "execute_all_searches",
-        "description": "Executes internet_search, internet_research, google_places_search, and yelp_search asynchronously and returns all the responses.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-            "query": {
-                "type": "string",
-                "description": "The search query."
-            },
-            "zipcode": {
-                "type": "string",
-                "description": "The zipcode for the Yelp search."
-            }
-            },
-            "required": ["query", "zipcode"]
-        }
-        }
+for tool_name, tool_spec in toolRegistry.specs.items():
+    setattr(ToolSchemas, tool_name, tool_spec.schema)
 
 #__________________________________________________________________________________________
 # 3. Async Tools
 class AsyncTools:
     @staticmethod
+    @metricsRegistry.timed("suggest_prompts", kind="async_tool")
+    @resiliencePolicies.resilient("suggest_prompts")
+    async def suggest_prompts(user_prompt: str, assistant_response: str, model: str = None):
+        request = suggest_prompts_request(user_prompt, assistant_response, model)
+        with metricsRegistry.span("openai", "chat.completions"):
+            response = await asyncOaiClient.chat.completions.create(**request)
+        response_content = response.choices[0].message.content
+        add_payload_bytes(len(response_content))
+        return json.loads(response_content)
+
+    @staticmethod
+    @metricsRegistry.timed("internet_search", kind="async_tool")
+    @resiliencePolicies.resilient("internet_search")
     async def internet_search(query: str):
         loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, lambda: list(search(term=query, advanced=True)))
+        response = await loop.run_in_executor(None, lambda: [search_result_record(result) for result in search(term=query, advanced=True)])
         return response
     
     @staticmethod
+    @metricsRegistry.timed("internet_research", kind="async_tool")
+    @singleFlight.coalesced("internet_research")
+    @semanticCache.cached("internet_research")
+    @toolCache.cached("internet_research")
+    @searchIndex.indexed("internet_research")
+    @resiliencePolicies.resilient("internet_research")
     async def internet_research(query: str):
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, lambda: tavClient.search(query=query, search_depth="advanced", max_results=7, include_answer=True, include_raw_content=True))
-        return response
+        response = await asyncTavClient.search(query=query, search_depth="advanced", max_results=7, include_answer=True, include_raw_content=True)
+        return await research_passages_async(query, response)
 
     @staticmethod
+    @metricsRegistry.timed("search_page_passages", kind="async_tool")
+    async def search_page_passages(query: str, urls: list, token_budget: int = PAGE_PASSAGE_TOKEN_BUDGET, timeout: float = PAGE_FETCH_TIMEOUT):
+        """
+        Fetches the given pages concurrently and hands each one to the extraction pool as soon as it arrives, then keeps the passages most relevant to the query.
+        Pages that fail, time out or are not text are skipped.
+        """
+        if not urls:
+            return []
+        async def page_chunks(url: str):
+            content = await asyncio.wait_for(fetch_page(url), timeout)
+            return await extractionPool.extract_async(url, content) if content else []
+
+        chunks = []
+        for result in await asyncio.gather(*(page_chunks(url) for url in urls), return_exceptions=True):
+            if not isinstance(result, BaseException):
+                chunks.extend(result)
+        return select_passages(query, chunks, token_budget)
+
+    @staticmethod
+    @metricsRegistry.timed("google_places_search", kind="async_tool")
+    @singleFlight.coalesced("google_places_search")
+    @semanticCache.cached("google_places_search")
+    @toolCache.cached("google_places_search")
+    @searchIndex.indexed("google_places_search")
+    @resiliencePolicies.resilient("google_places_search")
     async def google_places_search(query: str):
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, lambda: googClient.places(query=query, region="US"))
+        response = await asyncGoogClient.places(query=query, region="US")
         return response
     
     @staticmethod
+    @metricsRegistry.timed("yelp_search", kind="async_tool")
+    @singleFlight.coalesced("yelp_query_search")
+    @toolCache.cached("yelp_query_search")
+    @searchIndex.indexed("yelp_search")
+    @resiliencePolicies.resilient("yelp_query_search")
     async def yelp_search(query: str, zipcode: str):
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, lambda: yelpClient.search_query(term=query, location=zipcode))
+        response = await asyncYelpClient.search_query(term=query, location=zipcode)
         businesses = response['businesses']
         return businesses
 
     @staticmethod
-    async def execute_all_tasks(query: str, zipcode: str):
-        tasks = [
-            AsyncTools.internet_search(query),
-            AsyncTools.internet_research(query),
-            AsyncTools.google_places_search(query),
-            AsyncTools.yelp_search(query, zipcode)
-        ]
-
-        responses = await asyncio.gather(*tasks)
-        return {
-            "internet_search": responses[0],
-            "internet_research": responses[1],
-            "google_places_search": responses[2],
-            "yelp_search": responses[3]
+    async def stream_all_tasks(query: str, zipcode: str, deadline: float = SEARCH_DEADLINE, timeouts: dict = None):
+        """
+        Runs all four searches concurrently and yields (source, response) for each one as soon as it finishes, so callers can show the fastest source first.
+        A source that times out or raises is yielded as {"status": "timed_out"} or {"status": "failed"}; sources still running at the deadline are
+        cancelled and yielded as timed out. Closing or cancelling the generator cancels every search still running.
+        """
+        timeouts = {**SOURCE_TIMEOUTS, **(timeouts or {})}
+        sources = {
+            "internet_search": AsyncTools.internet_search(query),
+            "internet_research": AsyncTools.internet_research(query),
+            "google_places_search": AsyncTools.google_places_search(query),
+            "yelp_search": AsyncTools.yelp_search(query, zipcode)
         }
+        order = list(sources)
+        tasks = {asyncio.ensure_future(asyncio.wait_for(coro, timeouts.get(name))): name for name, coro in sources.items()}
+        pending = set(tasks)
+        loop = asyncio.get_running_loop()
+        end = loop.time() + deadline
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, end - loop.time()), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in sorted(done, key=lambda task: order.index(tasks[task])):
+                    name = tasks[task]
+                    if isinstance(task.exception(), asyncio.TimeoutError):
+                        yield name, {"status": "timed_out", "timeout": timeouts.get(name)}
+                    elif task.exception() is not None:
+                        yield name, {"status": "failed", "error": f"{type(task.exception()).__name__}: {task.exception()}"}
+                    else:
+                        yield name, task.result()
+            timed_out = sorted((tasks[task] for task in pending), key=order.index)
+            for task in pending:
+                task.cancel()
+            for name in timed_out:
+                yield name, {"status": "timed_out", "timeout": deadline}
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    @metricsRegistry.timed("execute_all_tasks", kind="async_tool")
+    async def execute_all_tasks(query: str, zipcode: str, deadline: float = SEARCH_DEADLINE, timeouts: dict = None, on_result=None):
+        """
+        Runs all four searches concurrently and returns whatever has finished by the deadline, keyed by source.
+        Each source also has its own timeout; a source that times out or raises is reported as {"status": "timed_out"} or {"status": "failed"} instead of failing the whole call.
+        on_result(source, response) is called as each source finishes.
+        """
+        responses = {}
+        async for name, response in AsyncTools.stream_all_tasks(query, zipcode, deadline, timeouts):
+            responses[name] = response
+            if on_result is not None:
+                on_result(name, response)
+        return {name: responses[name] for name in SOURCE_TIMEOUTS if name in responses}
+
+    @staticmethod
+    @metricsRegistry.timed("search_with_passages", kind="async_tool")
+    async def search_with_passages(query: str, zipcode: str, deadline: float = SEARCH_DEADLINE, timeouts: dict = None, on_result=None):
+        """
+        execute_all_tasks plus the passages of the top internet_search pages, returned as (responses, page_passages) within the same deadline.
+        The pages are fetched as soon as internet_search finishes, while the other sources are still running. Passages of pages that
+        internet_research also returned are dropped, and pages still being fetched or extracted at the deadline are left out.
+        """
+        loop = asyncio.get_running_loop()
+        end = loop.time() + deadline
+        responses = {}
+        page_task = None
+        page_passages = []
+        try:
+            async for name, response in AsyncTools.stream_all_tasks(query, zipcode, deadline, timeouts):
+                responses[name] = response
+                if on_result is not None:
+                    on_result(name, response)
+                urls = search_page_urls(responses) if name == "internet_search" else None
+                if urls:
+                    timeout = min(PAGE_FETCH_TIMEOUT, max(0.0, end - loop.time()))
+                    page_task = asyncio.ensure_future(AsyncTools.search_page_passages(query, urls, timeout=timeout))
+            if page_task is not None:
+                try:
+                    page_passages = await asyncio.wait_for(page_task, max(0.0, end - loop.time()))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if page_task is not None:
+                page_task.cancel()
+        seen = research_urls(responses)
+        page_passages = [passage for passage in page_passages if normalize_url(passage["url"]) not in seen]
+        return {name: responses[name] for name in SOURCE_TIMEOUTS if name in responses}, page_passages
 
 #__________________________________________________________________________________________
 
@@ -468,8 +627,9 @@ class AsyncTools:
 
 
 # Example usage:
-query = "What is a chad?"
-zipcode = "90210"
+if __name__ == "__main__":
+    query = "What is a chad?"
+    zipcode = "90210"
 
-responses = Tools.execute_all_searches(query, zipcode)
-print(responses)
\ No newline at end of file
+    responses = Tools.execute_all_searches(query, zipcode)
+    print(responses)
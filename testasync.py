@@ -1,22 +1,23 @@
 import asyncio
-from openai import OpenAI
-from tavily import TavilyClient
-from supabase import create_client as supabase_client
-from googlemaps import Client as google_client
 from googlesearch import search
-from yelpapi import YelpAPI
+from cache import toolCache
+from coalesce import singleFlight
+from semantic_cache import semanticCache
+from resilience import resiliencePolicies
+from clients import clientRegistry
+from extract import research_passages_async
+import async_clients
 
-import streamlit as st
-
-# Initialize clients
-oaiClient = OpenAI(api_key=st.secrets.openai.api_key)
-supaClient = supabase_client(st.secrets.supabase.url, st.secrets.supabase.api_key_admin)
-yelpClient = YelpAPI(api_key=st.secrets.yelp.api_key)
-googClient = google_client(key=st.secrets.google.maps_api_key)
-tavClient = TavilyClient(api_key=st.secrets.tavily.api_key)
+# Clients are built by the registry on first use
+oaiClient = clientRegistry.proxy("openai")
+supaClient = clientRegistry.proxy("supabase")
+asyncTavClient = clientRegistry.proxy("tavily_async")
+asyncGoogClient = clientRegistry.proxy("google_async")
+asyncYelpClient = clientRegistry.proxy("yelp_async")
 
 class Tools:
     @staticmethod
+    @resiliencePolicies.resilient("internet_search")
     async def internet_search(query: str):
         """
         Performs an internet search using the provided query and returns a list of search results.
@@ -32,6 +33,10 @@ class Tools:
         return response
     
     @staticmethod
+    @singleFlight.coalesced("internet_research")
+    @semanticCache.cached("internet_research")
+    @toolCache.cached("internet_research")
+    @resiliencePolicies.resilient("internet_research")
     async def internet_research(query: str):
         """
         Performs advanced internet research using the provided query and returns the results.
@@ -40,13 +45,17 @@ class Tools:
             query (str): The research query.
 
         Returns:
-            dict: The research results, including answers and raw content.
+            dict: The research results, including the answer and the page passages most relevant to the query.
         """
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, lambda: tavClient.search(query=query, search_depth="advanced", max_results=7, include_answer=True, include_raw_content=True))
+        response = await asyncTavClient.search(query=query, search_depth="advanced", max_results=7, include_answer=True, include_raw_content=True)
+        response = await research_passages_async(query, response)
         return response
 
     @staticmethod
+    @singleFlight.coalesced("google_places_search")
+    @semanticCache.cached("google_places_search")
+    @toolCache.cached("google_places_search")
+    @resiliencePolicies.resilient("google_places_search")
     async def google_places_search(query: str):
         """
         Searches for business information using Google Places to gather details on location, ratings, and more.
@@ -57,11 +66,13 @@ class Tools:
         Returns:
             dict: The search results with detailed information about the business.
         """
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, lambda: googClient.places(query=query, region="US"))
+        response = await asyncGoogClient.places(query=query, region="US")
         return response
     
     @staticmethod
+    @singleFlight.coalesced("yelp_query_search")
+    @toolCache.cached("yelp_query_search")
+    @resiliencePolicies.resilient("yelp_query_search")
     async def yelp_search(query: str, zipcode: str):
         """
         Performs a search query using Yelp and retrieves detailed information for each business, aggregating useful data for insurance analysis.
@@ -73,30 +84,42 @@ class Tools:
         Returns:
             list: A list of businesses with basic information.
         """
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(None, lambda: yelpClient.search_query(term=query, location=zipcode))
+        response = await asyncYelpClient.search_query(term=query, location=zipcode)
         businesses = response['businesses']
         return businesses
 
-async def execute_all_tasks(query: str, zipcode: str):
-    tasks = [
-        Tools.internet_search(query),
-        Tools.internet_research(query),
-        Tools.google_places_search(query),
-        Tools.yelp_search(query, zipcode)
-    ]
-
-    responses = await asyncio.gather(*tasks)
-    return {
-        "internet_search": responses[0],
-        "internet_research": responses[1],
-        "google_places_search": responses[2],
-        "yelp_search": responses[3]
+async def stream_all_tasks(query: str, zipcode: str):
+    """
+    Runs the four searches concurrently and yields (source, response) for each one as soon as it completes.
+    Searches still running when the generator is closed, or when one of them raises, are cancelled.
+    """
+    sources = {
+        "internet_search": Tools.internet_search(query),
+        "internet_research": Tools.internet_research(query),
+        "google_places_search": Tools.google_places_search(query),
+        "yelp_search": Tools.yelp_search(query, zipcode)
     }
+    tasks = {asyncio.ensure_future(coro): name for name, coro in sources.items()}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield tasks[task], task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def execute_all_tasks(query: str, zipcode: str):
+    responses = {}
+    async for name, response in stream_all_tasks(query, zipcode):
+        responses[name] = response
+    return {name: responses[name] for name in ("internet_search", "internet_research", "google_places_search", "yelp_search")}
 
 # Example usage:
-query = "What is a chad?"
-zipcode = "90210"
+if __name__ == "__main__":
+    query = "What is a chad?"
+    zipcode = "90210"
 
-responses = asyncio.run(execute_all_tasks(query, zipcode))
-print(responses)
+    responses = asyncio.run(execute_all_tasks(query, zipcode))
+    print(responses)
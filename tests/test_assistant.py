@@ -0,0 +1,130 @@
+import json
+import threading
+from types import SimpleNamespace
+import pytest
+import assistant
+from assistant import RunDriver
+from toolspec import tool, ToolRegistry
+
+
+###### FAKES
+def text_delta(value: str):
+    return SimpleNamespace(event="thread.message.delta", data=SimpleNamespace(delta=SimpleNamespace(content=[SimpleNamespace(type="text", text=SimpleNamespace(value=value))])))
+
+
+def requires_action(run_id: str, *tool_calls):
+    required_action = SimpleNamespace(submit_tool_outputs=SimpleNamespace(tool_calls=list(tool_calls)))
+    return SimpleNamespace(event="thread.run.requires_action", data=SimpleNamespace(id=run_id, required_action=required_action))
+
+
+def completed(run_id: str):
+    return SimpleNamespace(event="thread.run.completed", data=SimpleNamespace(id=run_id, status="completed"))
+
+
+def tool_call(call_id: str, name: str, **arguments):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+
+
+class FakeStream:
+    def __init__(self, events: list):
+        self.events = events
+
+    def __enter__(self):
+        return iter(self.events)
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeAssistantsClient:
+    """
+    Local stand-in for the streaming Assistants endpoints: each stream call returns the next scripted list of events.
+    """
+    def __init__(self, *streams):
+        self.streams = list(streams)
+        self.messages = []
+        self.submitted = []
+        self.beta = SimpleNamespace(threads=SimpleNamespace(
+            messages=SimpleNamespace(create=self.create_message),
+            runs=SimpleNamespace(stream=self.stream, submit_tool_outputs_stream=self.submit_tool_outputs_stream),
+        ))
+
+    def create_message(self, thread_id: str, role: str, content: str):
+        self.messages.append((thread_id, role, content))
+
+    def stream(self, thread_id: str, assistant_id: str):
+        return FakeStream(self.streams.pop(0))
+
+    def submit_tool_outputs_stream(self, thread_id: str, run_id: str, tool_outputs: list):
+        self.submitted.append((run_id, tool_outputs))
+        return FakeStream(self.streams.pop(0))
+
+
+class FakeTools:
+    barrier = threading.Barrier(2, timeout=5)
+
+    @staticmethod
+    @tool(concurrent_safe=True)
+    def lookup(query: str):
+        """
+        Waits for the other lookup in the same step, so the step only finishes if both run at once.
+
+        Args:
+            query (str): The query.
+        """
+        FakeTools.barrier.wait()
+        return {"query": query}
+
+    @staticmethod
+    @tool(concurrent_safe=True)
+    def broken(query: str):
+        """
+        Always fails.
+
+        Args:
+            query (str): The query.
+        """
+        raise ValueError("upstream down")
+
+
+@pytest.fixture(autouse=True)
+def fake_registry(monkeypatch):
+    FakeTools.barrier.reset()
+    monkeypatch.setattr(assistant, "toolRegistry", ToolRegistry.from_class(FakeTools))
+
+
+###### TESTS
+def test_streams_text_deltas():
+    client = FakeAssistantsClient([text_delta("Hel"), text_delta("lo"), completed("run_1")])
+    driver = RunDriver(client=client, assistant_id="asst_1")
+
+    assert list(driver.stream_reply("thread_1", "hi")) == ["Hel", "lo"]
+    assert client.messages == [("thread_1", "user", "hi")]
+    assert client.submitted == []
+    assert driver.last_run.id == "run_1"
+
+
+def test_dispatches_tool_calls_in_parallel_and_submits_outputs_in_order():
+    calls = [tool_call("call_a", "lookup", query="a"), tool_call("call_b", "lookup", query="b")]
+    client = FakeAssistantsClient([text_delta("Checking. "), requires_action("run_1", *calls)], [text_delta("Done."), completed("run_1")])
+    driver = RunDriver(client=client, assistant_id="asst_1")
+    steps = []
+
+    chunks = list(driver.stream_reply("thread_1", "look up a and b", on_tool_outputs=lambda tool_calls, outputs: steps.append(outputs)))
+
+    assert chunks == ["Checking. ", "Done."]
+    assert client.submitted == [("run_1", [{"tool_call_id": "call_a", "output": '{"query": "a"}'}, {"tool_call_id": "call_b", "output": '{"query": "b"}'}])]
+    assert steps == [client.submitted[0][1]]
+
+
+def test_tool_error_is_returned_as_output_and_run_continues():
+    calls = [tool_call("call_a", "broken", query="a"), tool_call("call_b", "missing")]
+    client = FakeAssistantsClient([requires_action("run_1", *calls)], [text_delta("Sorry."), completed("run_1")])
+    driver = RunDriver(client=client, assistant_id="asst_1")
+
+    assert list(driver.stream_reply("thread_1", "look up a")) == ["Sorry."]
+    outputs = client.submitted[0][1]
+    assert [output["tool_call_id"] for output in outputs] == ["call_a", "call_b"]
+    assert outputs[0]["output"] == "Error: ValueError: upstream down"
+    assert outputs[1]["output"].startswith("Error: KeyError")
+    assert driver.last_run.status == "completed"
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import pytest
+import cache
+from cache import ToolCache
+from metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def total_bytes(registry: MetricsRegistry, name: str, kind: str = "tool"):
+    return registry.histogram(kind, name).summary()["total_bytes"]
+
+
+def test_cached_dict_results_report_their_serialized_size(registry, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "metricsRegistry", MetricsRegistry())
+    tool_cache = ToolCache(str(tmp_path / "tool_cache.sqlite3"))
+    response = {"results": [{"name": "Fake Roofing", "rating": 4.5}]}
+
+    @registry.timed("google_places_search")
+    @tool_cache.cached("google_places_search")
+    def google_places_search(query: str):
+        return response
+
+    google_places_search("roofing")
+    google_places_search("roofing")
+
+    assert total_bytes(registry, "google_places_search") == 2 * len(json.dumps(response))
+
+
+def test_aggregate_reports_the_total_of_its_timed_sources(registry):
+    @registry.timed("yelp_search", kind="async_tool")
+    async def yelp_search():
+        return "x" * 100
+
+    @registry.timed("internet_research", kind="async_tool")
+    async def internet_research():
+        return "y" * 50
+
+    @registry.timed("execute_all_tasks", kind="async_tool")
+    async def execute_all_tasks():
+        yelp, research = await asyncio.gather(yelp_search(), internet_research())
+        return {"yelp_search": yelp, "internet_research": research}
+
+    asyncio.run(execute_all_tasks())
+
+    assert total_bytes(registry, "execute_all_tasks", "async_tool") == 150
+    assert total_bytes(registry, "yelp_search", "async_tool") == 100
+
+
+def test_measurable_results_are_not_counted_twice(registry):
+    @registry.timed("inner")
+    def inner():
+        return "x" * 10
+
+    @registry.timed("outer")
+    def outer():
+        return inner() * 2
+
+    outer()
+
+    assert total_bytes(registry, "outer") == 20
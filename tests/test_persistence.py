@@ -0,0 +1,149 @@
+import time
+from types import SimpleNamespace
+import pytest
+import persistence
+from persistence import ConversationLog, MemoryStore, WriteBehindQueue
+from resilience import ResiliencePolicies
+
+IDLE_FLUSH_INTERVAL = 60.0
+
+
+###### FAKES
+class FlakyStore(MemoryStore):
+    """
+    MemoryStore whose first `failures` insert calls raise a transient error.
+    """
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+        self.attempts = 0
+
+    def insert(self, table: str, rows: list):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("database unavailable")
+        super().insert(table, rows)
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    policies = ResiliencePolicies(tool_policies={"persist_batch": {"retries": 2, "base_delay": 0.001, "max_delay": 0.001}})
+    monkeypatch.setattr(persistence, "resiliencePolicies", policies)
+    return policies
+
+
+###### TESTS
+def test_batches_rows_and_flushes_on_demand():
+    store = MemoryStore()
+    writer = WriteBehindQueue(store, batch_size=10, flush_interval=IDLE_FLUSH_INTERVAL)
+    log = ConversationLog(thread_id="thread_1", writer=writer)
+    for i in range(25):
+        log.add_message("user" if i % 2 == 0 else "assistant", f"message {i}")
+
+    writer.flush(5.0)
+
+    assert [row["seq"] for row in store.list_messages(log.conversation_id, 100)] == list(range(25))
+    # Every message re-upserts the conversation; only the latest version of it is written per batch
+    assert len(store.tables["conversations"]) == 1
+    assert store.tables["conversations"][log.conversation_id]["title"] == "message 0"
+    assert all(count <= 10 for _, count in store.insert_calls)
+    assert len(store.insert_calls) < 50
+    assert store.insert_calls[0][0] == "conversations"
+    assert writer.stats()["pending"] == 0
+
+
+def test_full_batch_is_written_without_a_flush():
+    store = MemoryStore()
+    writer = WriteBehindQueue(store, batch_size=5, flush_interval=IDLE_FLUSH_INTERVAL)
+    for seq in range(5):
+        writer.put("messages", {"conversation_id": "c1", "seq": seq, "role": "user", "content": "hi", "created_at": "2026-01-01T00:00:00+00:00"})
+
+    wait_for(lambda: writer.stats()["written"] == 5)
+
+
+def test_retries_then_drops_a_failing_batch(fast_retries):
+    store = FlakyStore(failures=1)
+    writer = WriteBehindQueue(store, batch_size=10, flush_interval=IDLE_FLUSH_INTERVAL)
+    writer.put("messages", {"conversation_id": "c1", "seq": 0, "role": "user", "content": "retried", "created_at": "2026-01-01T00:00:00+00:00"})
+    writer.flush(5.0)
+
+    assert store.attempts == 2
+    assert writer.stats()["written"] == 1
+    assert fast_retries.stats()["retries"] == {"persist_batch": 1}
+
+    store.failures = store.attempts + 3
+    writer.put("messages", {"conversation_id": "c1", "seq": 1, "role": "user", "content": "dropped", "created_at": "2026-01-01T00:00:00+00:00"})
+    writer.flush(5.0)
+
+    stats = writer.stats()
+    assert store.attempts == 5
+    assert stats["failed"] == 1
+    assert stats["pending"] == 0
+    assert stats["last_error"] == "ConnectionError: database unavailable"
+    assert [row["content"] for row in store.list_messages("c1", 10)] == ["retried"]
+
+
+def test_drops_oldest_rows_beyond_max_pending():
+    writer = WriteBehindQueue(MemoryStore(), batch_size=100, flush_interval=IDLE_FLUSH_INTERVAL, max_pending=3)
+    for seq in range(5):
+        writer.put("messages", {"conversation_id": "c1", "seq": seq, "role": "user", "content": "hi", "created_at": "2026-01-01T00:00:00+00:00"})
+
+    assert writer.stats()["dropped"] == 2
+    assert [row["seq"] for _, row in writer.pending] == [2, 3, 4]
+
+
+def test_keyset_pages_cover_every_conversation_once():
+    store = MemoryStore()
+    # Ties on updated_at are broken by id, so a page boundary inside a tie neither repeats nor skips rows
+    rows = [{"id": f"conv-{i:02d}", "thread_id": None, "title": f"title {i}", "created_at": "2026-01-01T00:00:00+00:00", "updated_at": f"2026-01-01T00:00:{i // 3:02d}+00:00"} for i in range(20)]
+    store.insert("conversations", rows)
+
+    pages = []
+    cursor = None
+    while True:
+        page = store.list_conversations(6, cursor)
+        if not page:
+            break
+        pages.append(page)
+        cursor = (page[-1]["updated_at"], page[-1]["id"])
+
+    seen = [row["id"] for page in pages for row in page]
+    assert [len(page) for page in pages] == [6, 6, 6, 2]
+    assert seen == [row["id"] for row in sorted(rows, key=lambda row: (row["updated_at"], row["id"]), reverse=True)]
+
+
+def test_message_pages_continue_after_the_last_seq():
+    store = MemoryStore()
+    store.insert("messages", [{"conversation_id": "c1", "seq": seq, "role": "user", "content": str(seq), "created_at": "2026-01-01T00:00:00+00:00"} for seq in range(7)])
+
+    first = store.list_messages("c1", 4)
+    second = store.list_messages("c1", 4, first[-1]["seq"])
+
+    assert [row["seq"] for row in first + second] == list(range(7))
+
+
+def test_shutdown_flush_drains_the_queue():
+    store = MemoryStore()
+    writer = WriteBehindQueue(store, batch_size=100, flush_interval=IDLE_FLUSH_INTERVAL)
+    log = ConversationLog(writer=writer)
+    seq = log.add_message("user", "roofers in 90210")
+    reply_seq = log.reserve_seq()
+    tool_calls = [SimpleNamespace(id="call_1", function=SimpleNamespace(name="execute_all_searches", arguments='{"query": "roofers", "zipcode": "90210"}'))]
+    log.add_tool_outputs(reply_seq, tool_calls, [{"tool_call_id": "call_1", "output": "{}"}])
+    log.add_message("assistant", "Here are three roofers.", reply_seq)
+    assert writer.stats()["written"] == 0
+
+    # The same call atexit makes on shutdown
+    writer.flush(persistence.SHUTDOWN_FLUSH_TIMEOUT)
+
+    stats = writer.stats()
+    assert (stats["pending"], stats["written"], stats["failed"]) == (0, 4, 0)
+    assert [row["seq"] for row in store.list_messages(log.conversation_id, 10)] == [seq, reply_seq]
+    assert store.list_tool_outputs(log.conversation_id, reply_seq, reply_seq)[0]["name"] == "execute_all_searches"
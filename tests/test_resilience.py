@@ -0,0 +1,64 @@
+import asyncio
+import time
+import pytest
+from resilience import ResiliencePolicies, CircuitOpenError
+
+
+def half_open_policies(rate: float = 1000.0, burst: int = 1000):
+    policies = ResiliencePolicies(provider_limits={"fake": {"rate": rate, "burst": burst}}, tool_providers={"fake_tool": "fake"}, tool_policies={"fake_tool": {"retries": 0}})
+    breaker = policies.breaker("fake")
+    breaker.failures = breaker.failure_threshold
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+    return policies, breaker
+
+
+async def succeed():
+    return "ok"
+
+
+def test_cancelled_half_open_trial_releases_the_breaker():
+    policies, breaker = half_open_policies()
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(policies.call_async("fake_tool", hang), timeout=0.05)
+        assert breaker.state == "half_open" and not breaker.trial_in_flight
+        return await policies.call_async("fake_tool", succeed)
+
+    assert asyncio.run(main()) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_cancelled_while_waiting_for_a_token_claims_no_trial():
+    policies, breaker = half_open_policies(rate=1.0, burst=1)
+    policies.bucket("fake").reserve()
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(policies.call_async("fake_tool", succeed), timeout=0.05)
+        assert not breaker.trial_in_flight
+
+    asyncio.run(main())
+
+
+def test_interrupted_sync_trial_releases_the_breaker():
+    policies, breaker = half_open_policies()
+
+    def interrupt():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        policies.call("fake_tool", interrupt)
+    assert not breaker.trial_in_flight
+    assert policies.call("fake_tool", lambda: "ok") == "ok"
+
+
+def test_open_breaker_fails_fast():
+    policies, breaker = half_open_policies()
+    breaker.opened_at = time.monotonic()
+
+    with pytest.raises(CircuitOpenError):
+        policies.call("fake_tool", lambda: "ok")
@@ -0,0 +1,85 @@
+import os
+import threading
+from types import SimpleNamespace
+import pandas as pd
+import result_store
+from result_store import ResultStore
+from serialize import search_result_record
+
+
+def test_spills_least_recently_used_and_reloads(tmp_path):
+    store = ResultStore(str(tmp_path), memory_budget=3000)
+    first = store.put("session-a", {"rows": ["x" * 100] * 20})
+    frame = store.put("session-a", pd.DataFrame({"name": ["Fake Roofing"] * 50}))
+    store.put("session-b", {"rows": ["y" * 100] * 20})
+
+    stats = store.stats()
+    assert stats["spills"] >= 1
+    assert stats["memory_bytes"] <= store.memory_budget
+    assert store.get("session-a", first) == {"rows": ["x" * 100] * 20}
+    assert store.get("session-a", frame)["name"].tolist() == ["Fake Roofing"] * 50
+
+
+def test_search_results_round_trip_through_a_spill(tmp_path):
+    store = ResultStore(str(tmp_path), memory_budget=1000)
+    response = [search_result_record(SimpleNamespace(url=f"https://a.com/{i}", title=f"A {i}", description="desc " * 20)) for i in range(10)]
+    result_id = store.put("session-a", response)
+    store.put("session-a", {"rows": ["x" * 100] * 20})
+
+    assert store.stats()["spills"] >= 1
+    assert store.get("session-a", result_id) == response
+    assert store.get("session-a", result_id)[0] == {"url": "https://a.com/0", "title": "A 0", "description": "desc " * 20}
+
+
+def test_values_that_are_not_json_stay_in_memory(tmp_path):
+    store = ResultStore(str(tmp_path), memory_budget=10)
+    response = [SimpleNamespace(url="https://a.com", title="A", description="desc")]
+    result_id = store.put("session-a", response)
+    store.put("session-a", {"rows": ["x" * 100] * 20})
+    store.put("session-a", {"rows": ["y" * 100] * 20})
+
+    assert store.get("session-a", result_id) is response
+    assert store.stats()["spill_errors"] == 1
+
+
+def test_spill_writes_do_not_block_other_sessions(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path), memory_budget=3000)
+    writing = threading.Event()
+    release = threading.Event()
+    compress_json = result_store.compress_json
+
+    def slow_compress(value):
+        writing.set()
+        release.wait(5)
+        return compress_json(value)
+
+    monkeypatch.setattr(result_store, "compress_json", slow_compress)
+    kept = store.put("session-a", {"rows": ["x" * 100] * 20})
+    spiller = threading.Thread(target=store.put, args=("session-a", {"rows": ["z" * 100] * 20}))
+    spiller.start()
+    assert writing.wait(5)
+
+    # While session-a's victim is being written, other sessions (and the victim itself) are served without waiting
+    other = threading.Thread(target=lambda: store.get("session-b", store.put("session-b", {"small": 1})))
+    other.start()
+    other.join(1)
+    assert not other.is_alive()
+    assert store.get("session-a", kept) == {"rows": ["x" * 100] * 20}
+
+    release.set()
+    spiller.join(5)
+    assert store.stats()["spills"] >= 1
+    assert store.get("session-a", kept) == {"rows": ["x" * 100] * 20}
+
+
+def test_sweeps_spill_directories_of_finished_processes(tmp_path):
+    finished = tmp_path / "999999999"
+    legacy = tmp_path / "old-session-id"
+    live = tmp_path / str(os.getppid())
+    for directory in (finished, legacy, live):
+        directory.mkdir()
+        (directory / "result.json.gz").write_bytes(b"")
+
+    ResultStore(str(tmp_path))
+
+    assert sorted(os.listdir(tmp_path)) == [live.name]
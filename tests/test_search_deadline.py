@@ -0,0 +1,56 @@
+import asyncio
+import time
+import pytest
+import testasst
+from testasst import AsyncTools
+
+
+@pytest.fixture
+def fake_sources(monkeypatch):
+    events = []
+
+    async def internet_search(query):
+        events.append("internet_search")
+        return [{"url": "https://a.com/roofing"}, {"url": "https://b.com/roofing"}]
+
+    async def internet_research(query):
+        await asyncio.sleep(0.2)
+        events.append("internet_research")
+        return {"answer": "Fake answer", "results": [{"url": "https://b.com/roofing"}]}
+
+    async def google_places_search(query):
+        return {"results": []}
+
+    async def yelp_search(query, zipcode):
+        return []
+
+    for name, func in [("internet_search", internet_search), ("internet_research", internet_research), ("google_places_search", google_places_search), ("yelp_search", yelp_search)]:
+        monkeypatch.setattr(AsyncTools, name, staticmethod(func))
+    return events
+
+
+def test_page_fetch_starts_with_the_search_results_and_drops_research_pages(fake_sources, monkeypatch):
+    async def search_page_passages(query, urls, timeout=None):
+        fake_sources.append("pages")
+        return [{"url": url, "text": f"{url} passage"} for url in urls]
+
+    monkeypatch.setattr(AsyncTools, "search_page_passages", staticmethod(search_page_passages))
+    responses, page_passages = asyncio.run(AsyncTools.search_with_passages("roofing", "90210", deadline=5))
+
+    assert fake_sources.index("pages") < fake_sources.index("internet_research")
+    assert list(responses) == list(testasst.SOURCE_TIMEOUTS)
+    assert page_passages == [{"url": "https://a.com/roofing", "text": "https://a.com/roofing passage"}]
+
+
+def test_slow_pages_are_cut_off_at_the_search_deadline(fake_sources, monkeypatch):
+    async def search_page_passages(query, urls, timeout=None):
+        await asyncio.sleep(10)
+        return [{"url": url, "text": "too late"} for url in urls]
+
+    monkeypatch.setattr(AsyncTools, "search_page_passages", staticmethod(search_page_passages))
+    start = time.perf_counter()
+    responses, page_passages = asyncio.run(AsyncTools.search_with_passages("roofing", "90210", deadline=0.5))
+
+    assert time.perf_counter() - start < 1.5
+    assert responses["internet_research"]["answer"] == "Fake answer"
+    assert page_passages == []
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+from search_index import SearchIndex, HashingEmbedder
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / "search_index.sqlite3"), embedder=HashingEmbedder())
+    yield index
+    index.executor.shutdown(wait=True)
+
+
+def drain(index: SearchIndex):
+    # One worker thread, so a no-op submitted last finishes after every earlier write
+    index.executor.submit(lambda: None).result(timeout=5)
+
+
+def test_indexed_tool_returning_a_dataframe(index):
+    @index.indexed("yelp_search")
+    def yelp_search(query: str, zipcode: str):
+        return pd.DataFrame([{"id": "biz-1", "name": "Fake Roofing", "display_address": "1 Main St, Beverly Hills, CA 90210", "zip_code": "90210",
+                              "display_phone": "(310) 555-0100", "rating": 4.5, "review_count": 12, "categories_title": "Roofing", "url": "https://www.yelp.com/biz/fake-roofing"}])
+
+    df = yelp_search("roofing", "90210")
+    drain(index)
+
+    assert len(df) == 1
+    results = index.search("Fake Roofing", kinds=("yelp_search",), semantic=False)
+    assert [(result["title"], result["zipcode"]) for result in results] == [("Fake Roofing", "90210")]
+
+
+def test_indexed_tool_skips_empty_and_status_results(index):
+    @index.indexed("yelp_search")
+    def yelp_search(query: str, zipcode: str, empty: str):
+        return pd.DataFrame() if empty == "frame" else {"status": "timed_out"}
+
+    assert yelp_search("roofing", "90210", "frame").empty
+    assert yelp_search("roofing", "90210", "status") == {"status": "timed_out"}
+    drain(index)
+
+    assert index.stats()["documents"] == {}
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import semantic_cache
+from cache import ToolCache
+from semantic_cache import SemanticCache
+
+
+class FakeEmbedder:
+    """
+    Maps each query to a fixed vector, so "roofers" lands next to "roofing contractors" and "plumbers" does not.
+    """
+    name = "fake:3"
+    dimensions = 3
+    VECTORS = {"roofing contractors": [1.0, 0.0, 0.0], "roofers": [0.99, 0.1, 0.0], "plumbers": [0.0, 1.0, 0.0]}
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts: list):
+        self.calls.extend(texts)
+        return np.array([self.VECTORS[text] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    tool_cache = ToolCache(str(tmp_path / "tool_cache.sqlite3"))
+    monkeypatch.setattr(semantic_cache, "toolCache", tool_cache)
+    embedder = FakeEmbedder()
+    return tool_cache, SemanticCache(str(tmp_path / "semantic_cache.sqlite3"), embedder=embedder), embedder
+
+
+def search_tool(tool_cache: ToolCache, cache: SemanticCache, calls: list):
+    @cache.cached("internet_search", zipcode_arg="zipcode")
+    @tool_cache.cached("internet_search")
+    def internet_search(query: str, zipcode: str = None):
+        calls.append((query, zipcode))
+        return [f"{query} result"]
+    return internet_search
+
+
+def test_rephrase_within_zipcode_is_answered_from_the_neighbour(caches):
+    tool_cache, cache, _ = caches
+    calls = []
+    internet_search = search_tool(tool_cache, cache, calls)
+
+    assert internet_search("roofing contractors", "90210") == ["roofing contractors result"]
+    assert internet_search("roofers", "90210") == ["roofing contractors result"]
+    assert internet_search("plumbers", "90210") == ["plumbers result"]
+    assert internet_search("roofers", "10001") == ["roofers result"]
+    assert calls == [("roofing contractors", "90210"), ("plumbers", "90210"), ("roofers", "10001")]
+    assert cache.stats()["hits"] == 1
+
+
+def test_query_without_zipcode_skips_the_semantic_lookup(caches):
+    tool_cache, cache, embedder = caches
+    calls = []
+    internet_search = search_tool(tool_cache, cache, calls)
+
+    internet_search("roofing contractors")
+    internet_search("roofers")
+
+    assert calls == [("roofing contractors", None), ("roofers", None)]
+    assert embedder.calls == []
+    assert cache.stats()["lookups"] == 0
+
+
+def test_exact_repeat_is_answered_by_the_tool_cache_without_embedding(caches):
+    tool_cache, cache, embedder = caches
+    calls = []
+    internet_search = search_tool(tool_cache, cache, calls)
+
+    internet_search("roofing contractors", "90210")
+    embedded = list(embedder.calls)
+    internet_search("roofing contractors", "90210")
+
+    assert calls == [("roofing contractors", "90210")]
+    assert embedder.calls == embedded
+    assert tool_cache.stats()["tools"]["internet_search"]["hits"] == 1
@@ -0,0 +1,54 @@
+import pytest
+from cache import ToolCache
+from toolspec import ToolRegistry, tool
+
+
+@pytest.fixture
+def tool_cache(tmp_path):
+    return ToolCache(str(tmp_path / "tool_cache.sqlite3"))
+
+
+def test_cacheable_is_taken_from_the_tool_cache_wrapper(tool_cache):
+    class FakeTools:
+        @staticmethod
+        @tool(concurrent_safe=True, cacheable=True)
+        @tool_cache.cached("google_places_search")
+        def google_places_search(query: str):
+            """
+            Searches Google Places.
+
+            Args:
+                query (str): The search query.
+            """
+            return {"results": []}
+
+        @staticmethod
+        @tool()
+        def search_past_results(query: str):
+            """
+            Searches earlier results.
+
+            Args:
+                query (str): The search query.
+            """
+            return "[]"
+
+    registry = ToolRegistry.from_class(FakeTools)
+
+    assert registry.is_cacheable("google_places_search")
+    assert not registry.is_cacheable("search_past_results")
+    assert registry.specs["google_places_search"].schema["parameters"]["required"] == ["query"]
+
+
+def test_cacheable_declaration_that_disagrees_with_the_wrapper_fails(tool_cache):
+    class FakeTools:
+        @staticmethod
+        @tool(cacheable=True)
+        def internet_search(query: str):
+            """
+            Searches the web.
+            """
+            return []
+
+    with pytest.raises(ValueError, match="not wrapped in toolCache.cached"):
+        ToolRegistry.from_class(FakeTools)
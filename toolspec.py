@@ -0,0 +1,145 @@
+import inspect
+import json
+import re
+from pydantic import create_model
+
+##### SET VARIABLES
+JSON_TYPES = {
+    str: {"type": "string"},
+    int: {"type": "integer"},
+    float: {"type": "number"},
+    bool: {"type": "boolean"},
+    list: {"type": "array", "items": {"type": "string"}},
+    dict: {"type": "object"},
+}
+SECTION_HEADERS = ("Args:", "Arguments:", "Parameters:", "Returns:", "Raises:")
+PARAMETER_LINE = re.compile(r"^\s*(\w+)\s*(?:\([^)]*\))?\s*:\s*(.+)$")
+
+
+###### FUNCTIONS
+def tool(concurrent_safe: bool = False, cacheable: bool = None, exclude: tuple = ()):
+    """
+    Marks a Tools method as an assistant tool.
+
+    Args:
+        concurrent_safe (bool): Whether calls may run concurrently with other tool calls in the same run step. Off unless declared.
+        cacheable (bool): Whether the tool's responses are served from the tool cache. Taken from the toolCache.cached wrapper under it
+            when not given; a declaration that disagrees with the wrapper fails at registration.
+        exclude (tuple): Parameters that stay internal and are left out of the schema.
+    """
+    def decorator(func):
+        func.tool_options = {"concurrent_safe": concurrent_safe, "cacheable": cacheable, "exclude": tuple(exclude)}
+        return func
+    return decorator
+
+
+def parse_docstring(docstring: str):
+    """
+    Splits a Google-style docstring into its description and a {parameter: description} mapping.
+    """
+    description_lines = []
+    parameters = {}
+    section = None
+    for line in inspect.cleandoc(docstring or "").splitlines():
+        stripped = line.strip()
+        if stripped in SECTION_HEADERS:
+            section = stripped
+            continue
+        if section is None:
+            if stripped:
+                description_lines.append(stripped)
+        elif section in ("Args:", "Arguments:", "Parameters:"):
+            match = PARAMETER_LINE.match(line)
+            if match:
+                parameters[match.group(1)] = match.group(2).strip()
+    return " ".join(description_lines), parameters
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Tool Spec
+class ToolSpec:
+    """
+    A tool's JSON schema, its pydantic argument validator and its callable, all built once at registration.
+    """
+    def __init__(self, name: str, func, concurrent_safe: bool = False, cacheable: bool = None, exclude: tuple = ()):
+        self.name = name
+        self.func = func
+        self.concurrent_safe = concurrent_safe
+        cached = getattr(func, "cached_tool", None) is not None
+        if cacheable is not None and cacheable != cached:
+            raise ValueError(f"{name} declares cacheable={cacheable} but is {'' if cached else 'not '}wrapped in toolCache.cached")
+        self.cacheable = cached
+
+        description, parameter_descriptions = parse_docstring(func.__doc__)
+        properties = {}
+        required = []
+        fields = {}
+        for parameter in inspect.signature(func).parameters.values():
+            if parameter.name in exclude:
+                continue
+            annotation = parameter.annotation if parameter.annotation is not inspect.Parameter.empty else str
+            properties[parameter.name] = {**JSON_TYPES.get(annotation, {"type": "string"}), "description": parameter_descriptions.get(parameter.name, "")}
+            if parameter.default is inspect.Parameter.empty:
+                required.append(parameter.name)
+                fields[parameter.name] = (annotation, ...)
+            else:
+                fields[parameter.name] = (annotation, parameter.default)
+
+        self.schema = {
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": properties, "required": required},
+        }
+        self.arguments_model = create_model(f"{name}_arguments", **fields)
+
+    def validate(self, arguments):
+        """
+        Parses (if given as a JSON string) and validates the arguments, returning keyword arguments for the tool.
+        """
+        if isinstance(arguments, str):
+            arguments = json.loads(arguments or "{}")
+        validated = self.arguments_model.model_validate(arguments)
+        return {field: getattr(validated, field) for field in self.arguments_model.model_fields}
+
+    def __call__(self, arguments):
+        return self.func(**self.validate(arguments))
+
+
+#__________________________________________________________________________________________
+# 2. Tool Registry
+class ToolRegistry:
+    """
+    Name-to-ToolSpec dispatch table generated from the @tool-marked static methods of a class.
+    """
+    def __init__(self, specs: dict):
+        self.specs = specs
+        self.schemas = [{"type": "function", "function": spec.schema} for spec in specs.values()]
+
+    @classmethod
+    def from_class(cls, tools_class):
+        specs = {}
+        for name, member in vars(tools_class).items():
+            func = member.__func__ if isinstance(member, staticmethod) else member
+            options = getattr(func, "tool_options", None)
+            if options is not None:
+                specs[name] = ToolSpec(name, func, **options)
+        return cls(specs)
+
+    def __contains__(self, name: str):
+        return name in self.specs
+
+    def is_concurrent_safe(self, name: str):
+        spec = self.specs.get(name)
+        return spec is not None and spec.concurrent_safe
+
+    def is_cacheable(self, name: str):
+        spec = self.specs.get(name)
+        return spec is not None and spec.cacheable
+
+    def dispatch(self, name: str, arguments):
+        """
+        Validates the arguments and runs the named tool. Raises KeyError for unknown tools and pydantic.ValidationError for bad arguments.
+        """
+        return self.specs[name](arguments)
+
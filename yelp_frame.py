@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+##### SET VARIABLES
+STRING_COLUMNS = ["id", "alias", "name", "image_url", "url", "phone", "display_phone", "address1", "address2", "address3", "zip_code", "cross_streets"]
+CATEGORY_COLUMNS = ["city", "state", "country"]
+FLOAT_COLUMNS = ["rating", "latitude", "longitude", "distance"]
+BOOLEAN_COLUMNS = ["is_closed", "is_claimed", "is_open_now"]
+LIST_COLUMNS = ["display_address", "photos", "hours", "transactions", "categories_alias", "categories_title"]
+# Same column order as the legacy string-joined frame
+COLUMN_ORDER = [
+    "id", "alias", "name", "image_url", "is_closed", "url", "review_count", "rating", "latitude", "longitude", "phone",
+    "display_phone", "distance", "address1", "address2", "address3", "city", "zip_code", "country", "state", "display_address",
+    "is_claimed", "cross_streets", "photos", "hours", "is_open_now", "transactions", "categories_alias", "categories_title",
+]
+
+
+###### CLASSES
+#__________________________________________________________________________________________
+# 1. Yelp Frame Builder
+class YelpFrameBuilder:
+    """
+    Fills typed columns for Yelp search results directly instead of assembling one dict per row.
+
+    Coordinates, rating and distance are float32, review_count is a nullable Int32, city/state/country are categorical,
+    and photos, transactions, display_address and categories stay real list columns. With arrow=True the frame is
+    Arrow-backed (pd.ArrowDtype) and the category lists are dictionary-encoded.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.size = 0
+        self.floats = {column: np.full(capacity, np.nan, dtype=np.float32) for column in FLOAT_COLUMNS}
+        self.review_count = np.zeros(capacity, dtype=np.int32)
+        self.review_count_mask = np.ones(capacity, dtype=bool)
+        self.objects = {column: [None] * capacity for column in STRING_COLUMNS + CATEGORY_COLUMNS + BOOLEAN_COLUMNS + LIST_COLUMNS}
+
+    def add(self, business: dict, detailed_info: dict):
+        i = self.size
+        self.size += 1
+        objects = self.objects
+        floats = self.floats
+
+        for column in ("id", "alias", "name", "image_url", "url", "phone", "display_phone"):
+            objects[column][i] = business.get(column)
+        objects["is_closed"][i] = business.get("is_closed")
+        if business.get("review_count") is not None:
+            self.review_count[i] = business["review_count"]
+            self.review_count_mask[i] = False
+        if business.get("rating") is not None:
+            floats["rating"][i] = business["rating"]
+        if business.get("distance") is not None:
+            floats["distance"][i] = business["distance"]
+
+        coordinates = business.get("coordinates")
+        if coordinates:
+            if coordinates.get("latitude") is not None:
+                floats["latitude"][i] = coordinates["latitude"]
+            if coordinates.get("longitude") is not None:
+                floats["longitude"][i] = coordinates["longitude"]
+
+        location = business.get("location")
+        if location:
+            for column in ("address1", "address2", "address3", "city", "zip_code", "country", "state"):
+                objects[column][i] = location.get(column)
+            objects["display_address"][i] = list(location.get("display_address", []))
+
+        categories = business.get("categories", [])
+        objects["categories_alias"][i] = [category["alias"] for category in categories]
+        objects["categories_title"][i] = [category["title"] for category in categories]
+
+        detailed_location = detailed_info.get("location")
+        hours = detailed_info.get("hours", [{}])[0]
+        objects["is_claimed"][i] = detailed_info.get("is_claimed")
+        objects["cross_streets"][i] = detailed_location.get("cross_streets") if detailed_location else None
+        objects["photos"][i] = list(detailed_info.get("photos", []))
+        objects["hours"][i] = hours.get("open", [])
+        objects["is_open_now"][i] = hours.get("is_open_now")
+        objects["transactions"][i] = list(detailed_info.get("transactions", []))
+
+    def to_frame(self, arrow: bool = False):
+        if arrow:
+            return self.to_arrow_frame()
+        n = self.size
+        columns = {}
+        for column in STRING_COLUMNS:
+            columns[column] = pd.array(self.objects[column][:n], dtype="string")
+        for column in CATEGORY_COLUMNS:
+            columns[column] = pd.Categorical(self.objects[column][:n])
+        for column in BOOLEAN_COLUMNS:
+            columns[column] = pd.array(self.objects[column][:n], dtype="boolean")
+        for column in FLOAT_COLUMNS:
+            columns[column] = self.floats[column][:n]
+        columns["review_count"] = pd.arrays.IntegerArray(self.review_count[:n], self.review_count_mask[:n])
+        for column in LIST_COLUMNS:
+            columns[column] = self.objects[column][:n]
+        return pd.DataFrame(columns, columns=COLUMN_ORDER)
+
+    def to_arrow_frame(self):
+        import pyarrow as pa
+
+        n = self.size
+        arrays = {}
+        for column in STRING_COLUMNS:
+            arrays[column] = pa.array(self.objects[column][:n], type=pa.string())
+        for column in CATEGORY_COLUMNS:
+            arrays[column] = pa.array(self.objects[column][:n], type=pa.string()).dictionary_encode()
+        for column in BOOLEAN_COLUMNS:
+            arrays[column] = pa.array(self.objects[column][:n], type=pa.bool_())
+        for column in FLOAT_COLUMNS:
+            arrays[column] = pa.array(self.floats[column][:n], from_pandas=True)
+        arrays["review_count"] = pa.array(self.review_count[:n], mask=self.review_count_mask[:n])
+        for column in ("display_address", "photos", "transactions"):
+            arrays[column] = pa.array(self.objects[column][:n], type=pa.list_(pa.string()))
+        arrays["hours"] = pa.array(self.objects["hours"][:n])
+        for column in ("categories_alias", "categories_title"):
+            values = self.objects[column][:n]
+            offsets = np.zeros(n + 1, dtype=np.int32)
+            np.cumsum(np.array([len(value) for value in values], dtype=np.int32), out=offsets[1:])
+            flat = pa.array([item for value in values for item in value], type=pa.string()).dictionary_encode()
+            arrays[column] = pa.ListArray.from_arrays(pa.array(offsets), flat)
+        table = pa.table({column: arrays[column] for column in COLUMN_ORDER})
+        return table.to_pandas(types_mapper=pd.ArrowDtype)